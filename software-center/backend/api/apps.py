@@ -1,22 +1,53 @@
+import logging
 import os
+import threading
 
 from api.i18n import I18nProvider
 from api.profiles import ProfileSwitcher
 from providers.appstream import AppStreamProvider
 from providers.apt import AptProvider
+from providers.asset_cache import AssetCache
 from providers.branding import BrandingProvider
+from providers.catalog_search import CatalogSearch
+from providers.catalog_snapshot import CatalogSnapshot
+from providers.category_index import CATEGORIES
+from providers.dep11 import Dep11Index
+from providers.dependency_graph import DependencyGraph
+from providers.dependency_resolver import DependencyResolver
 from providers.flatpak import FlatpakProvider
+from providers.footprint import FootprintCalculator
+from providers.fs_watcher import CatalogWatcher
 from providers.hardware import HardwareProvider
 from providers.meta import MetaProvider
+from providers.suggest import Suggester
+from providers.transaction_planner import TransactionPlanner
+
+logger = logging.getLogger("ctxos.apps")
 
 
 class AppManager:
-    def __init__(self):
+    # Snapshot sections derived from the sources behind each watcher topic
+    SNAPSHOT_SECTIONS_BY_TOPIC = {
+        CatalogWatcher.DPKG: ["dpkg"],
+        CatalogWatcher.APT_LISTS: ["packages", "appstream", "dep11"],
+        CatalogWatcher.FLATPAK: ["flatpak", "appstream"],
+    }
+
+    def __init__(self, snapshot_path=None, watcher=None, prefetch_assets=False):
         self.apt = AptProvider()
-        self.meta = MetaProvider(self.apt)
+        self.resolver = DependencyResolver(self.apt, graph=DependencyGraph(self.apt.catalog))
+        self.planner = TransactionPlanner(self.resolver)
+        self.footprints = FootprintCalculator(self.resolver)
+        self.meta = MetaProvider(self.apt, self.footprints)
         self.flatpak = FlatpakProvider()
-        self.appstream = AppStreamProvider()
-        self.profiles = ProfileSwitcher(self.apt, self.meta)
+        self.dep11 = Dep11Index()
+        self.appstream = AppStreamProvider(self.flatpak.appstream, self.dep11)
+        self.assets = AssetCache()
+        self.catalog_search = CatalogSearch(self.apt, self.flatpak, self.meta, self.dep11)
+        self.suggester = Suggester(
+            self.catalog_search.index, self.apt, self.flatpak, graph=self.resolver.graph
+        )
+        self.profiles = ProfileSwitcher(self.apt, self.meta, self.planner)
         self.hardware = HardwareProvider()
         self.branding = BrandingProvider()
 
@@ -24,6 +55,83 @@ class AppManager:
         locales_dir = os.path.join(os.path.dirname(__file__), "..", "locales")
         self.i18n = I18nProvider(locales_dir)
 
+        # Warm start from the on-disk catalog snapshot
+        self.snapshot = CatalogSnapshot(snapshot_path)
+        self._warm_start()
+
+        # Invalidate provider caches when packages change outside the software center
+        self.watcher = watcher or CatalogWatcher()
+        self.watcher.subscribe(CatalogWatcher.APT_LISTS, self.appstream.invalidate)
+        self.watcher.subscribe(CatalogWatcher.FLATPAK, self.appstream.invalidate)
+        self.watcher.subscribe(CatalogWatcher.FLATPAK, self.flatpak.invalidate)
+        self.watcher.subscribe(CatalogWatcher.BRANDING, self.branding.reload)
+        # Patch the shared dependency graph when the apt lists change
+        self.watcher.subscribe(CatalogWatcher.APT_LISTS, self.resolver.graph.update)
+        # Desktop files come and go with package installs, so dpkg changes are relevant too
+        for topic in (CatalogWatcher.APT_LISTS, CatalogWatcher.FLATPAK, CatalogWatcher.DPKG):
+            self.watcher.subscribe(topic, self.catalog_search.update)
+            self.watcher.subscribe(topic, self.suggester.update)
+        for topic in self.SNAPSHOT_SECTIONS_BY_TOPIC:
+            self.watcher.subscribe(topic, self._on_catalog_changed)
+        if not self.watcher.is_alive():
+            self.watcher.start()
+        threading.Thread(target=self.resolver.graph.update, daemon=True).start()
+        threading.Thread(target=self._build_search, daemon=True).start()
+        if prefetch_assets:
+            threading.Thread(target=self.prefetch_featured_assets, daemon=True).start()
+
+    def _snapshot_sections(self):
+        """Maps each snapshot section to (current source stamp, export, restore)."""
+        lists_stamp = self.apt.catalog.current_stamp()
+        flatpak_stamp = self.flatpak.installation_stamp()
+        appstream_stamp = (lists_stamp, flatpak_stamp)
+
+        def export_appstream():
+            return appstream_stamp, dict(self.appstream.cache.items())
+
+        def restore_appstream(stamp, cache):
+            self.appstream.cache.update(cache)
+            return True
+
+        return {
+            "packages": (
+                lists_stamp,
+                self.apt.catalog.export_index,
+                self.apt.catalog.restore_index,
+            ),
+            "dpkg": (self.apt.dpkg.current_stamp(), self.apt.dpkg.export, self.apt.dpkg.restore),
+            "appstream": (appstream_stamp, export_appstream, restore_appstream),
+            "flatpak": (flatpak_stamp, self.flatpak.export_apps, self.flatpak.restore_apps),
+            "dep11": (self.dep11.current_stamp(), self.dep11.export, self.dep11.restore),
+        }
+
+    def _warm_start(self):
+        """Seeds provider state from the snapshot; stale sections are rebuilt in the background."""
+        stale = []
+        for name, (stamp, _, restore) in self._snapshot_sections().items():
+            payload = self.snapshot.get(name, stamp)
+            if payload is None or not restore(stamp, payload):
+                stale.append(name)
+
+        if stale:
+            logger.info(f"Catalog snapshot stale for {stale}, rebuilding")
+            threading.Thread(target=self.refresh_catalog, args=(stale,), daemon=True).start()
+
+    def refresh_catalog(self, sections=None):
+        """Rebuilds provider state and atomically writes a fresh catalog snapshot."""
+        for name, (_, export, _) in self._snapshot_sections().items():
+            if sections is None or name in sections:
+                try:
+                    stamp, payload = export()
+                    self.snapshot.put(name, stamp, payload)
+                except Exception as e:
+                    logger.warning(f"Could not rebuild snapshot section {name}: {e}")
+        return self.snapshot.save()
+
+    def _on_catalog_changed(self, event):
+        """Rewrites the snapshot sections affected by a change event."""
+        self.refresh_catalog(self.SNAPSHOT_SECTIONS_BY_TOPIC[event["topic"]])
+
     def get_translations(self):
         """Returns the current translations for the frontend."""
         return self.i18n.get_translations()
@@ -51,51 +159,45 @@ class AppManager:
 
         return apps
 
+    def _build_search(self):
+        # Suggestions are built from the search index, so it has to exist first
+        self.catalog_search.update()
+        self.suggester.update()
+
+    def prefetch_featured_assets(self):
+        """Downloads screenshots and remote icons of the featured apps in the background."""
+        urls = []
+        for app in self.get_featured_apps():
+            meta = self.appstream.get_metadata(app["id"])
+            urls += meta.get("screenshots", [])
+            if meta.get("icon", "").startswith(("http://", "https://")):
+                urls.append(meta["icon"])
+        return self.assets.prefetch(
+            [url for url in urls if url.startswith(("http://", "https://"))]
+        )
+
     def get_categories(self):
         """Returns the list of available categories."""
-        return [
-            {"id": "system", "name": "System", "icon": "emblem-system-symbolic"},
-            {
-                "id": "development",
-                "name": "Development",
-                "icon": "applications-engineering-symbolic",
-            },
-            {"id": "media", "name": "Media", "icon": "applications-multimedia-symbolic"},
-            {"id": "server", "name": "Server", "icon": "network-server-symbolic"},
-            {"id": "security", "name": "Security", "icon": "security-high-symbolic"},
-        ]
+        return [dict(category) for category in CATEGORIES]
 
     def get_all_apps(self, category=None):
-        """Returns all apps, optionally filtered by category."""
+        """Returns all apps, or the apps filed under a category."""
+        if category:
+            return self._mark_installed(self.catalog_search.list_category(category))
+
         # Start with Meta-packages and Profiles
         all_apps = self.meta.get_meta_packages() + self.meta.list_profiles()
 
         # Add Flatpaks
         all_apps += self.flatpak.list_apps()
+        return all_apps
+
+    def get_app_details(self, app_id, asset_base_url=None):
+        """Gets full details for a specific app/package (APT or Flatpak).
 
-        if not category:
-            return all_apps
-
-        filtered = []
-        for app in all_apps:
-            # Check if categorizable
-            app_id = app.get("id", "").lower()
-
-            if category == "security":
-                if "security" in app_id or "tools" in app_id or app_id.startswith("ctxos-tools-"):
-                    filtered.append(app)
-            elif category == "system":
-                if "core" in app_id or "desktop" in app_id or "system" in app_id:
-                    filtered.append(app)
-            elif category == "development":
-                if "dev" in app_id or "build" in app_id:
-                    filtered.append(app)
-            # Default to showing everything else if no match, or implement specific logic
-
-        return filtered if filtered else all_apps
-
-    def get_app_details(self, app_id):
-        """Gets full details for a specific app/package (APT or Flatpak)."""
+        Cached screenshots are linked under ``asset_base_url`` when given
+        (frontends served over HTTP), else as local ``file://`` URIs.
+        """
         # Fetch rich metadata first
         rich_meta = self.appstream.get_metadata(app_id)
 
@@ -111,7 +213,9 @@ class AppManager:
                     "repo": info.get("Origin", "flathub"),
                     "type": "flatpak",
                     "installed": self.flatpak.is_installed(app_id),
-                    "screenshots": rich_meta.get("screenshots", []),
+                    "screenshots": self.assets.localize(
+                        rich_meta.get("screenshots", []), base_url=asset_base_url
+                    ),
                     "license": rich_meta.get("license", ""),
                 }
 
@@ -122,7 +226,9 @@ class AppManager:
             for p in self.meta.PROFILES.values():
                 if p["id"] == app_id:
                     p_details = p.copy()
-                    p_details["screenshots"] = rich_meta.get("screenshots", [])
+                    p_details["screenshots"] = self.assets.localize(
+                        rich_meta.get("screenshots", []), base_url=asset_base_url
+                    )
                     # Add migration info
                     active = self.profiles.get_active_profile()
                     if active and active["id"] != app_id:
@@ -143,21 +249,45 @@ class AppManager:
             "repo": info.get("Origin", "Debian"),
             "section": info.get("Section", ""),
             "installed": self.apt.is_installed(app_id),
-            "screenshots": rich_meta.get("screenshots", []),
+            "screenshots": self.assets.localize(
+                rich_meta.get("screenshots", []), base_url=asset_base_url
+            ),
             "license": rich_meta.get("license", ""),
         }
 
+    def get_app_transaction(self, app_id):
+        """Returns what apt would do when the install/remove button of a package is pressed.
+
+        This runs ``apt-get -s`` on a cache miss, so it is requested apart from
+        the details rather than holding them up.
+        """
+        if self.apt.is_installed(app_id):
+            return self.apt.simulator.simulate(remove=[app_id])
+        return self.apt.simulator.simulate(install=[app_id])
+
     def search_apps(self, query):
-        """Searches for apps in the repo."""
-        # Search in meta-packages/APT first
-        results = []
-        all_local = self.get_all_apps()
-        for app in all_local:
-            if query.lower() in app["name"].lower() or query.lower() in app["id"].lower():
-                results.append(app)
-
-        # Then search in Flatpaks (remotes)
-        flatpak_results = self.flatpak.search(query)
-        results += flatpak_results
+        """Searches packages, profiles and flatpaks, best matches first."""
+        results = self._mark_installed(self.catalog_search.search(query))
+
+        # Without local appstream data the remotes can only be searched through flatpak
+        if not self.flatpak.appstream.available():
+            found = {app["id"] for app in results}
+            results += [app for app in self.flatpak.search(query) if app["id"] not in found]
 
         return results
+
+    def _mark_installed(self, apps):
+        installed = self.apt.is_installed_many(
+            [app["id"] for app in apps if app["type"] != "flatpak"]
+        )
+        flatpaks = self.flatpak.installed_ids()
+        for app in apps:
+            if app["type"] == "flatpak":
+                app["installed"] = app["id"] in flatpaks
+            else:
+                app["installed"] = installed.get(app["id"], False)
+        return apps
+
+    def suggest(self, query, limit=10):
+        """Returns completions for partial input, tolerant of small typos."""
+        return self.suggester.suggest(query, limit=limit)
@@ -2,6 +2,7 @@ import logging
 
 from api.actions import ActionManager
 from api.health import HealthChecker
+from common.deb822 import parse_relations
 from providers.snapshot import SnapshotProvider
 
 logger = logging.getLogger("ctxos.profiles")
@@ -10,9 +11,10 @@ logger = logging.getLogger("ctxos.profiles")
 class ProfileSwitcher:
     """Handles migration and switching between system profiles."""
 
-    def __init__(self, apt_provider, meta_provider):
+    def __init__(self, apt_provider, meta_provider, planner=None):
         self.apt = apt_provider
         self.meta = meta_provider
+        self.planner = planner
         self.actions = ActionManager()
         self.snapshots = SnapshotProvider()
         self.health = HealthChecker()
@@ -31,6 +33,22 @@ class ProfileSwitcher:
         This often involves removing conflicting packages.
         """
         current = self.get_active_profile()
+        to_remove = [current["id"]] if current and current["id"] != target_profile_id else []
+
+        # 0. Plan the whole switch before touching the system
+        if self.planner:
+            plan = self.planner.plan(install=[target_profile_id], remove=to_remove)
+            if plan["missing"] or plan["conflicts"]:
+                logger.error(
+                    f"Profile switch to {target_profile_id} cannot be satisfied: "
+                    f"missing={plan['missing']} conflicts={len(plan['conflicts'])}"
+                )
+                return {
+                    "success": False,
+                    "error": "Profile switch cannot be satisfied.",
+                    "plan": plan,
+                    "stage": "plan",
+                }
 
         # 1. Create Restore Point
         snapshot_res = self.snapshots.create_snapshot(f"Switching to {target_profile_id}")
@@ -42,10 +60,10 @@ class ProfileSwitcher:
             }
 
         operations = []
-        if current and current["id"] != target_profile_id:
+        for profile_id in to_remove:
             # We have a conflict, need to remove current first
             # In a real distro, we might want to keep user data
-            operations.append({"action": "remove", "id": current["id"]})
+            operations.append({"action": "remove", "id": profile_id})
 
         operations.append({"action": "install", "id": target_profile_id})
 
@@ -78,12 +96,42 @@ class ProfileSwitcher:
     def get_migration_impact(self, target_profile_id):
         """Calculates what will be added/removed during a switch."""
         current = self.get_active_profile()
+        to_remove = [current["id"]] if current else []
         impact = {
-            "to_remove": [current["name"]] if current else [],
+            "to_remove": [],
+            "to_autoremove": [],
             "to_install": [target_profile_id],
             "risk": "low",
         }
 
+        if self.planner:
+            # The planner reads removals from the same reverse-dependency index
+            plan = self.planner.plan(install=[target_profile_id], remove=to_remove)
+            impact["to_install"] = [p["name"] for p in plan["install"]] or [target_profile_id]
+            impact["to_remove"] = plan["remove"]
+            impact["to_autoremove"] = plan["autoremovable"]
+            impact["download_size"] = plan["download_size"]
+            impact["installed_size_delta"] = plan["installed_size_delta"]
+            impact["conflicts"] = plan["conflicts"]
+        elif current:
+            # Dependencies of the target profile stay even if the current one pulled them in
+            target = self.apt.get_package_info(target_profile_id) or {}
+            keep = [
+                alt["name"]
+                for field in ("Pre-Depends", "Depends", "Recommends")
+                for group in parse_relations(target.get(field, ""))
+                for alt in group
+            ]
+            removal = self.apt.get_removal_impact(to_remove, keep=keep)
+            impact["to_remove"] = removal["removed"] or to_remove
+            impact["to_autoremove"] = removal["autoremovable"]
+        # Exactly what apt will do, cached until dpkg or the apt lists change
+        impact["transaction"] = self.apt.simulator.simulate(
+            install=[target_profile_id], remove=to_remove
+        )
+        if len(impact["to_remove"]) > 1:
+            impact["risk"] = "medium"
+
         if current and "server" in current["id"] and "desktop" in target_profile_id:
             impact["message"] = "Migrating from Server to Desktop. This will install a GUI stack."
             impact["risk"] = "high"
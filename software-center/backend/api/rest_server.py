@@ -2,7 +2,7 @@ import os
 import sys
 
 import structlog
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, send_file
 
 # Add parent directory to path to allow imports from sibling modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -15,10 +15,10 @@ from common.errors import (  # noqa: E402
     DependencyError,
     InstallationError,
     NotFoundError,
+    ValidationError,
     handle_error,
 )
 from common.logger import configure_logging  # noqa: E402
-from providers.dependency_resolver import DependencyResolver  # noqa: E402
 from providers.health_monitor import HealthMonitor  # noqa: E402
 from providers.offline_mirror import OfflineMirrorManager  # noqa: E402
 
@@ -28,14 +28,18 @@ logger = structlog.get_logger("ctxos.api")
 
 app = Flask(__name__)
 
-# Managers
-apps = AppManager()
-actions = ActionManager()
-health = HealthChecker()
-resolver = DependencyResolver()
-monitor = HealthMonitor()
-mirror = OfflineMirrorManager()
-recommender = ProfileRecommender()
+# Cached assets are stored under their content hash, so they never change
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Managers; not when a thumbnail worker re-imports this script as __mp_main__
+if __name__ != "__mp_main__":
+    apps = AppManager()
+    actions = ActionManager()
+    health = HealthChecker()
+    resolver = apps.resolver
+    monitor = HealthMonitor()
+    mirror = OfflineMirrorManager()
+    recommender = ProfileRecommender()
 
 
 @app.errorhandler(404)
@@ -55,21 +59,43 @@ def root():
 
 @app.route("/api/v1/packages", methods=["GET"])
 def list_packages():
-    """Lists available packages, optionally filtered by category."""
+    """Lists available packages, optionally filtered by category or a search query."""
     try:
         category = request.args.get("category")
-        logger.info("listing_packages", category=category)
+        query = request.args.get("search", "").strip()
+        logger.info("listing_packages", category=category, search=query)
+        if query:
+            return jsonify(apps.search_apps(query))
+        if category and category not in {c["id"] for c in apps.get_categories()}:
+            raise NotFoundError("Category", category)
         return jsonify(apps.get_all_apps(category=category))
     except Exception as e:
         return handle_error(e)
 
 
+@app.route("/api/v1/suggest", methods=["GET"])
+def suggest():
+    """Returns search-as-you-type completions for partial input."""
+    try:
+        try:
+            limit = int(request.args.get("limit", 10))
+        except ValueError:
+            raise ValidationError("'limit' must be an integer")
+        if not 1 <= limit <= 50:
+            raise ValidationError("'limit' must be between 1 and 50")
+        return jsonify(apps.suggest(request.args.get("q", ""), limit=limit))
+    except Exception as e:
+        return handle_error(e)
+
+
 @app.route("/api/v1/packages/<package_id>", methods=["GET"])
 def get_package_details(package_id):
     """Gets detailed info for a package."""
     try:
         logger.info("getting_details", package_id=package_id)
-        details = apps.get_app_details(package_id)
+        details = apps.get_app_details(
+            package_id, asset_base_url=request.host_url + "api/v1/assets"
+        )
         if not details:
             raise NotFoundError("Package", package_id)
         return jsonify(details)
@@ -77,6 +103,31 @@ def get_package_details(package_id):
         return handle_error(e)
 
 
+@app.route("/api/v1/packages/<package_id>/transaction", methods=["GET"])
+def get_package_transaction(package_id):
+    """Previews what apt would do to install or remove a package."""
+    try:
+        logger.info("simulating_transaction", package_id=package_id)
+        if not apps.apt.get_package_info(package_id):
+            raise NotFoundError("Package", package_id)
+        return jsonify(apps.get_app_transaction(package_id))
+    except Exception as e:
+        return handle_error(e)
+
+
+@app.route("/api/v1/assets/<name>", methods=["GET"])
+def get_asset(name):
+    """Serves a cached screenshot or thumbnail linked from package details."""
+    try:
+        asset = apps.assets.resolve(name)
+        if not asset:
+            raise NotFoundError("Asset", name)
+        path, mimetype = asset
+        return send_file(path, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    except Exception as e:
+        return handle_error(e)
+
+
 @app.route("/api/v1/packages/<package_id>/install", methods=["POST"])
 def install_package(package_id):
     """Installs a package."""
@@ -86,11 +137,17 @@ def install_package(package_id):
 
         # Pre-check dependencies
         resolution = resolver.resolve(package_id)
+        logger.info("dependency_check", package_id=package_id, **resolution["stats"])
         if resolution.get("missing"):
             logger.warning("dependency_check_failed", missing=resolution["missing"])
             raise DependencyError(
                 "Missing dependencies", context={"missing": resolution["missing"]}
             )
+        if resolution.get("conflicts"):
+            logger.warning("conflict_check_failed", conflicts=resolution["conflicts"])
+            raise DependencyError(
+                "Conflicting packages", context={"conflicts": resolution["conflicts"]}
+            )
 
         result = actions.install(package_id, use_snapshot=use_snapshot)
         if not result["success"]:
@@ -105,12 +162,56 @@ def install_package(package_id):
         return handle_error(e)
 
 
+@app.route("/api/v1/packages/<package_id>/removal-impact", methods=["GET"])
+def get_removal_impact(package_id):
+    """Previews which packages removing a package would remove or leave auto-removable."""
+    try:
+        return jsonify(apps.apt.get_removal_impact([package_id]))
+    except Exception as e:
+        return handle_error(e)
+
+
+@app.route("/api/v1/packages/<package_id>/footprint", methods=["GET"])
+def get_package_footprint(package_id):
+    """Download and installed size of a package together with everything it pulls in."""
+    try:
+        return jsonify(apps.footprints.footprint(package_id))
+    except Exception as e:
+        return handle_error(e)
+
+
+@app.route("/api/v1/transactions/plan", methods=["POST"])
+def plan_transaction():
+    """Plans installing and removing a set of packages together, without changing anything."""
+    try:
+        body = request.get_json(silent=True) or {}
+        install, remove = body.get("install", []), body.get("remove", [])
+        if not isinstance(install, list) or not isinstance(remove, list):
+            raise ValidationError("'install' and 'remove' must be lists of package names")
+        plan = apps.planner.plan(install=install, remove=remove)
+        logger.info("transaction_plan", **plan["stats"])
+        return jsonify(plan)
+    except Exception as e:
+        return handle_error(e)
+
+
 @app.route("/api/v1/system/health", methods=["GET"])
 def get_system_health():
     """Returns system health status."""
     return jsonify(monitor.calculate_health_score())
 
 
+@app.route("/api/v1/system/caches", methods=["GET"])
+def get_cache_stats():
+    """Returns hit/miss counters and sizes of the metadata caches."""
+    return jsonify(
+        {
+            "appstream": apps.appstream.cache.stats(),
+            "simulations": apps.apt.simulator.cache.stats(),
+        }
+    )
+
+
 @app.route("/api/v1/profiles", methods=["GET"])
 def list_profiles():
     """Lists available system profiles."""
@@ -134,11 +235,14 @@ def get_mirror_status():
 
 @app.route("/api/v1/system/mirror/sync", methods=["POST"])
 def sync_mirror():
-    """Triggers mirror sync."""
+    """Triggers mirror sync; {"prune": true, "keep": n} also drops older package versions."""
     try:
         data = request.json if request.is_json else {}
         packages = data.get("packages")
-        result = mirror.sync(package_list=packages)
+        keep = data.get("keep", 1)
+        if not isinstance(keep, int) or keep < 1:
+            raise ValidationError("'keep' must be a positive integer")
+        result = mirror.sync(package_list=packages, prune=bool(data.get("prune")), keep=keep)
         return jsonify(result)
     except Exception as e:
         return handle_error(e)
@@ -1,24 +1,26 @@
-import subprocess
 import threading
 import time
 
 from providers.apt import AptProvider
 from providers.flatpak import FlatpakProvider
+from providers.flatpak_updates import FlatpakUpdateChecker
 
 
 class UpdateMonitor(threading.Thread):
     """
     Background thread that checks for updates periodically.
+    Pass the owner's ``apt`` and ``flatpak`` providers so their indexes are shared.
     """
 
-    def __init__(self, callback, interval=3600):
+    def __init__(self, callback, interval=3600, apt=None, flatpak=None):
         super().__init__()
         self.callback = callback
         self.interval = interval
         self.daemon = True
         self.running = False
-        self.apt = AptProvider()
-        self.flatpak = FlatpakProvider()
+        self.apt = apt or AptProvider()
+        self.flatpak = flatpak or FlatpakProvider()
+        self.flatpak_updates = FlatpakUpdateChecker(self.flatpak)
 
     def run(self):
         self.running = True
@@ -45,19 +47,11 @@ class UpdateMonitor(threading.Thread):
         except Exception as e:
             print(f"[UpdateMonitor] APT Error: {e}")
 
-        # Check Flatpak updates
-        if self.flatpak.has_flatpak:
-            try:
-                result = subprocess.run(
-                    ["flatpak", "update", "--appstream"], capture_output=True, text=True
-                )
-                result = subprocess.run(
-                    ["flatpak", "remote-ls", "--updates"], capture_output=True, text=True
-                )
-                # Count lines of output (each line is an update)
-                count += len(result.stdout.strip().splitlines())
-            except Exception as e:
-                print(f"[UpdateMonitor] Flatpak Error: {e}")
+        # Check Flatpak updates against the remotes' cached summaries
+        try:
+            count += len(self.flatpak_updates.check())
+        except Exception as e:
+            print(f"[UpdateMonitor] Flatpak Error: {e}")
 
         return count
 
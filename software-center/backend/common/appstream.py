@@ -0,0 +1,192 @@
+"""Streaming parsers for AppStream collections: XML (Flatpak remotes, app-info) and DEP-11 YAML."""
+
+import gzip
+import lzma
+import re
+import xml.etree.ElementTree as ET
+
+try:
+    import yaml
+
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+# Component types that are shown as applications
+APP_TYPES = frozenset(["desktop", "desktop-application", "console-application", "web-application"])
+
+
+def open_collection(path):
+    """Opens a collection file, transparently decompressing .gz files."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".xz"):
+        return lzma.open(path, "rb")
+    return open(path, "rb")
+
+
+def _untranslated(element, tag):
+    for child in element.iterfind(tag):
+        if child.get(_LANG) is None:
+            return (child.text or "").strip()
+    return ""
+
+
+def description_text(element):
+    """Flattens an untranslated <description> into paragraphs and "- " list items."""
+    paragraphs = []
+    for child in element:
+        if child.get(_LANG) is not None:
+            continue
+        if child.tag == "p":
+            paragraphs.append(" ".join("".join(child.itertext()).split()))
+        elif child.tag in ("ul", "ol"):
+            paragraphs.append(
+                "\n".join(
+                    "- " + " ".join("".join(item.itertext()).split())
+                    for item in child
+                    if item.get(_LANG) is None
+                )
+            )
+    return "\n\n".join(p for p in paragraphs if p)
+
+
+def _component(element):
+    component_id = _untranslated(element, "id")
+    description = element.find("description")
+    releases = element.find("releases")
+    release = releases.find("release") if releases is not None else None
+
+    screenshots = []
+    for screenshot in element.iterfind("screenshots/screenshot"):
+        images = {
+            image.get("type"): (image.text or "").strip() for image in screenshot.iter("image")
+        }
+        url = images.get("source") or next(iter(images.values()), "")
+        if url:
+            screenshots.append(url)
+
+    icons = {}
+    for icon in element.iterfind("icon"):
+        value = (icon.text or "").strip()
+        if icon.get("type") == "cached" and icon.get("width") and icon.get("height"):
+            # Cached icons live in per-size directories next to the collection
+            value = f"{icon.get('width')}x{icon.get('height')}/{value}"
+        icons.setdefault(icon.get("type", "stock"), value)
+
+    return {
+        "id": component_id[:-8] if component_id.endswith(".desktop") else component_id,
+        "type": element.get("type", ""),
+        "package": _untranslated(element, "pkgname"),
+        "name": _untranslated(element, "name"),
+        "summary": _untranslated(element, "summary"),
+        "description": description_text(description) if description is not None else "",
+        "categories": [c.text.strip() for c in element.iterfind("categories/category") if c.text],
+        "keywords": [
+            k.text.strip()
+            for k in element.iterfind("keywords/keyword")
+            if k.text and k.get(_LANG) is None
+        ],
+        "screenshots": screenshots,
+        "icons": icons,
+        "version": release.get("version", "") if release is not None else "",
+        "license": _untranslated(element, "project_license"),
+        "developer": _untranslated(element, "developer_name"),
+    }
+
+
+def iter_components(source):
+    """Yields component dicts from a collection file object or path.
+
+    Parsed with iterparse and each component is discarded once read, so memory
+    stays flat regardless of the size of the collection.
+    """
+    root = None
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        if root is None:
+            root = element
+        elif event == "end" and element.tag == "component":
+            component = _component(element)
+            component["origin"] = root.get("origin", "")
+            del root[:]
+            if component["id"]:
+                yield component
+
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def markup_text(markup):
+    """Flattens DEP-11 description markup ("<p>...</p><ul>...") like description_text."""
+    if not markup:
+        return ""
+    try:
+        return description_text(ET.fromstring(f"<description>{markup}</description>"))
+    except ET.ParseError:
+        return " ".join(_TAG_RE.sub(" ", markup).split())
+
+
+def _untranslated_yaml(value):
+    return value.get("C", "") if isinstance(value, dict) else (value or "")
+
+
+def _yaml_component(doc, media_base):
+    def media(url):
+        if not url or "://" in url or not media_base:
+            return url or ""
+        return media_base.rstrip("/") + "/" + url.lstrip("/")
+
+    screenshots = []
+    for screenshot in doc.get("Screenshots") or []:
+        image = screenshot.get("source-image") or next(iter(screenshot.get("thumbnails") or []), {})
+        if image.get("url"):
+            screenshots.append(media(image["url"]))
+
+    icons = {}
+    icon = doc.get("Icon") or {}
+    if icon.get("stock"):
+        icons["stock"] = icon["stock"]
+    for cached in icon.get("cached") or []:
+        icons.setdefault("cached", f"{cached.get('width')}x{cached.get('height')}/{cached['name']}")
+    for remote in icon.get("remote") or []:
+        icons.setdefault("remote", media(remote.get("url")))
+
+    releases = doc.get("Releases") or []
+    component_id = doc.get("ID", "")
+    return {
+        "id": component_id[:-8] if component_id.endswith(".desktop") else component_id,
+        "type": doc.get("Type", ""),
+        "package": doc.get("Package", ""),
+        "name": _untranslated_yaml(doc.get("Name")),
+        "summary": _untranslated_yaml(doc.get("Summary")),
+        "description": markup_text(_untranslated_yaml(doc.get("Description"))),
+        "categories": list(doc.get("Categories") or []),
+        "keywords": list(_untranslated_yaml(doc.get("Keywords")) or []),
+        "screenshots": screenshots,
+        "icons": icons,
+        "version": str(releases[0].get("version", "")) if releases else "",
+        "license": doc.get("ProjectLicense", ""),
+        "developer": _untranslated_yaml(doc.get("DeveloperName")),
+    }
+
+
+def iter_yaml_components(source):
+    """Yields component dicts from a DEP-11 YAML file object, one document at a time.
+
+    The first document is the DEP-11 header carrying Origin and MediaBaseUrl.
+    Requires PyYAML.
+    """
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    header = None
+    for doc in yaml.load_all(source, Loader=loader):
+        if not isinstance(doc, dict):
+            continue
+        if header is None and doc.get("File") == "DEP-11":
+            header = doc
+            continue
+        component = _yaml_component(doc, (header or {}).get("MediaBaseUrl", ""))
+        component["origin"] = (header or {}).get("Origin", "")
+        if component["id"]:
+            yield component
@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import psutil
+
+logger = logging.getLogger("ctxos.cache")
+
+_MISSING = object()
+
+
+class MetadataCache:
+    """Bounded, thread-safe LRU cache with per-entry TTL and negative caching.
+
+    Keys are spread over independently locked stripes so concurrent request
+    threads rarely contend. Misses can be cached for a shorter ``negative_ttl``
+    so unknown names don't repeat the expensive lookup. While the system is
+    under memory pressure the bound is halved (down to ``min_entries``) and
+    grows back once the pressure is gone.
+    """
+
+    PRESSURE_INTERVAL = 5.0  # seconds between memory checks
+    COUNTERS = ("hits", "misses", "negative_hits", "evictions")
+
+    def __init__(
+        self,
+        max_entries=2048,
+        ttl=3600,
+        negative_ttl=300,
+        stripes=8,
+        min_entries=64,
+        memory_percent=90,
+    ):
+        self.max_entries = max_entries
+        self.min_entries = min(min_entries, max_entries)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory_percent = memory_percent
+        # (lock, {key: (value, expires, negative)}, counters) per stripe
+        self._stripes = [
+            (threading.Lock(), OrderedDict(), dict.fromkeys(self.COUNTERS, 0))
+            for _ in range(max(1, stripes))
+        ]
+        self._limit = max_entries
+        self._next_pressure_check = 0.0
+        self._pressure_lock = threading.Lock()  # one thread checks and resizes at a time
+
+    def get(self, key, default=None):
+        """Returns the cached value, or ``default`` on a miss or a cached ``None``."""
+        value = self._lookup(key)
+        return default if value is _MISSING or value is None else value
+
+    def __contains__(self, key):
+        return self._lookup(key, count=False) is not _MISSING
+
+    def __len__(self):
+        return sum(len(entries) for _, entries, _ in self._stripes)
+
+    def set(self, key, value, negative=None):
+        """Stores a value; negative entries (``None`` by default) expire after ``negative_ttl``."""
+        if negative is None:
+            negative = value is None
+        ttl = self.negative_ttl if negative else self.ttl
+        expires = time.monotonic() + ttl if ttl else None
+        lock, entries, counters = self._stripe(key)
+        with lock:
+            entries[key] = (value, expires, negative)
+            entries.move_to_end(key)
+            self._trim(entries, counters)
+        self._check_pressure()
+
+    def get_or_load(self, key, loader, negative=lambda value: not value):
+        """Returns the cached value or stores ``loader(key)``.
+
+        Results for which ``negative(result)`` is true are cached with the
+        negative TTL, and a cached negative returns the result without calling
+        the loader again.
+        """
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+        value = loader(key)
+        self.set(key, value, negative=bool(negative(value)))
+        return value
+
+    def invalidate(self, key):
+        lock, entries, _ = self._stripe(key)
+        with lock:
+            entries.pop(key, None)
+
+    def clear(self):
+        for lock, entries, _ in self._stripes:
+            with lock:
+                entries.clear()
+
+    def items(self):
+        """Returns the live positive entries as (key, value) pairs, e.g. for a snapshot."""
+        now = time.monotonic()
+        items = []
+        for lock, entries, _ in self._stripes:
+            with lock:
+                items.extend(
+                    (key, value)
+                    for key, (value, expires, negative) in entries.items()
+                    if not negative and (expires is None or expires > now)
+                )
+        return items
+
+    def update(self, mapping):
+        for key, value in dict(mapping).items():
+            self.set(key, value)
+
+    def stats(self):
+        """Returns the hit/miss/eviction counters with the current size and bound."""
+        totals = dict.fromkeys(self.COUNTERS, 0)
+        for lock, _, counters in self._stripes:
+            with lock:
+                for name, count in counters.items():
+                    totals[name] += count
+        return dict(totals, entries=len(self), limit=self._limit)
+
+    def _stripe(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def _lookup(self, key, count=True):
+        lock, entries, counters = self._stripe(key)
+        with lock:
+            entry = entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                del entries[key]
+                entry = None
+            if entry is None:
+                if count:
+                    counters["misses"] += 1
+                return _MISSING
+            entries.move_to_end(key)
+            if count:
+                counters["negative_hits" if entry[2] else "hits"] += 1
+            return entry[0]
+
+    def _trim(self, entries, counters):
+        # Called with the stripe lock held; each stripe gets an even share of the bound
+        limit = max(1, self._limit // len(self._stripes))
+        while len(entries) > limit:
+            entries.popitem(last=False)
+            counters["evictions"] += 1
+
+    def _check_pressure(self):
+        if time.monotonic() < self._next_pressure_check:
+            return
+        # Another thread already checking is as good as checking now
+        if not self._pressure_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            if now < self._next_pressure_check:
+                return
+            self._next_pressure_check = now + self.PRESSURE_INTERVAL
+            try:
+                pressure = psutil.virtual_memory().percent >= self.memory_percent
+            except Exception:
+                return
+
+            if pressure:
+                limit = max(self.min_entries, self._limit // 2)
+            else:
+                limit = min(self.max_entries, self._limit * 2)
+            if limit == self._limit:
+                return
+            # Stripes read the bound without this lock, so it is published in one store
+            self._limit = limit
+            if pressure:
+                logger.info(f"Memory pressure, shrinking metadata cache to {limit} entries")
+                for lock, entries, counters in self._stripes:
+                    with lock:
+                        self._trim(entries, counters)
+        finally:
+            self._pressure_lock.release()
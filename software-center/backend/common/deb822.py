@@ -0,0 +1,63 @@
+"""Helpers for Debian control-file (deb822) data such as dpkg status and Packages lists."""
+
+import re
+
+
+def parse_stanza(text, fields=None):
+    """Parses a single control-file stanza into a dict.
+
+    If ``fields`` is given, only those keys are kept; continuation lines of
+    skipped fields are ignored without being joined.
+    """
+    info = {}
+    current_key = None
+    for line in text.splitlines():
+        if not line:
+            continue
+        if line[0] in " \t":
+            if current_key:
+                info[current_key] += "\n" + line.strip()
+        elif ":" in line:
+            key, value = line.split(":", 1)
+            key = key.strip()
+            if fields is not None and key not in fields:
+                current_key = None
+                continue
+            current_key = key
+            info[key] = value.strip()
+    return info
+
+
+def iter_stanzas(text, fields=None):
+    """Yields parsed stanzas from a control file with blank-line separated entries."""
+    for chunk in text.split("\n\n"):
+        if chunk.strip():
+            yield parse_stanza(chunk, fields)
+
+
+_RELATION_RE = re.compile(
+    r"^\s*(?P<name>[A-Za-z0-9][A-Za-z0-9+.\-]*)(?::(?P<arch>[A-Za-z0-9\-]+))?\s*"
+    r"(?:\(\s*(?P<op><<|<=|>=|>>|=|<|>)\s*(?P<version>[^)\s]+)\s*\))?"
+    r"\s*(?:\[[^\]]*\])?\s*(?:<[^>]*>\s*)*$"
+)
+
+
+def parse_relations(value):
+    """Parses a relationship field (Depends, Breaks, ...) into alternative groups.
+
+    "liba (>= 1.0), libb | libc" becomes
+    [[{"name": "liba", "op": ">=", "version": "1.0", "arch": None}], [libb, libc]].
+    Architecture restrictions and build profiles are accepted and dropped.
+    """
+    groups = []
+    if not value:
+        return groups
+    for part in value.split(","):
+        group = []
+        for alternative in part.split("|"):
+            match = _RELATION_RE.match(alternative)
+            if match:
+                group.append(match.groupdict())
+        if group:
+            groups.append(group)
+    return groups
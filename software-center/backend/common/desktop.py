@@ -0,0 +1,63 @@
+import glob
+import logging
+import os
+
+logger = logging.getLogger("ctxos.desktop")
+
+# Where installed applications register their .desktop files
+DESKTOP_DIRS = ("/usr/share/applications", "/usr/local/share/applications")
+
+
+def desktop_files(directories=DESKTOP_DIRS):
+    """Returns the .desktop files in the given directories, sorted."""
+    files = []
+    for directory in directories:
+        files.extend(glob.glob(os.path.join(directory, "*.desktop")))
+    return sorted(files)
+
+
+def _split_list(value):
+    return [item.strip() for item in value.split(";") if item.strip()]
+
+
+def read_desktop_entry(path):
+    """Reads the [Desktop Entry] group of a desktop file.
+
+    Returns {"id", "name", "comment", "keywords", "categories", "package",
+    "icon"} with untranslated values, or None for files that aren't visible
+    applications. "package" is the X-Ctxos-Package key the CtxOS menu sets.
+    """
+    values = {}
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            in_entry = False
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("["):
+                    if in_entry:
+                        break
+                    in_entry = line == "[Desktop Entry]"
+                    continue
+                if in_entry and "=" in line:
+                    key, value = line.split("=", 1)
+                    # Localized keys (Name[de]) are stored under their own names and unused
+                    values.setdefault(key.strip(), value.strip())
+    except OSError as e:
+        logger.debug(f"Could not read desktop file {path}: {e}")
+        return None
+
+    if values.get("Type", "Application") != "Application":
+        return None
+    if values.get("NoDisplay") == "true" or values.get("Hidden") == "true":
+        return None
+    return {
+        "id": os.path.basename(path)[: -len(".desktop")],
+        "name": values.get("Name", ""),
+        "comment": values.get("Comment", ""),
+        "keywords": _split_list(values.get("Keywords", "")),
+        "categories": _split_list(values.get("Categories", "")),
+        "package": values.get("X-Ctxos-Package", ""),
+        "icon": values.get("Icon", ""),
+    }
@@ -0,0 +1,15 @@
+import os
+
+
+def file_stamp(path):
+    """Returns a cheap change marker for a file: (mtime_ns, inode, size), or None if missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+
+def tree_stamp(paths):
+    """Returns a combined change marker for a set of files, keyed by path."""
+    return tuple((path, file_stamp(path)) for path in sorted(paths))
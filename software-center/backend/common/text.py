@@ -0,0 +1,8 @@
+import re
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Splits text into lowercase alphanumeric search terms."""
+    return _TOKEN_RE.findall(text.lower())
@@ -22,6 +22,8 @@ class SoftwareCenterDaemon:
             return self.apps.get_all_apps()
         elif action == "get_details":
             return self.apps.get_app_details(params.get("id"))
+        elif action == "get_transaction":
+            return self.apps.get_app_transaction(params.get("id"))
         elif action == "install":
             return self.actions.install(params.get("id"))
         elif action == "remove":
@@ -37,7 +39,7 @@ def cli_interface():
     parser = argparse.ArgumentParser(description="Software Center Backend CLI")
     parser.add_argument(
         "action",
-        help="Action to perform (list_featured, list_all, get_details, install, remove, search)",
+        help="Action to perform (list_featured, list_all, get_details, get_transaction, install, remove, search)",
     )
     parser.add_argument("--id", help="Package ID for details/install/remove")
     parser.add_argument("--query", help="Search query")
@@ -35,12 +35,16 @@ class SoftwareCenterService:
     dbus = open(os.path.join(os.path.dirname(__file__), "interface.xml")).read()
 
     def __init__(self):
-        self.app_manager = AppManager()
+        # Only the long-running daemon prefetches featured screenshots
+        self.app_manager = AppManager(prefetch_assets=True)
         self.action_manager = ActionManager()
-        # Start background update monitor
+        # Start background update monitor, checking every 30 mins with the app manager's providers
         self.monitor = UpdateMonitor(
-            self._on_updates_detected, interval=1800
-        )  # Check every 30 mins
+            self._on_updates_detected,
+            interval=1800,
+            apt=self.app_manager.apt,
+            flatpak=self.app_manager.flatpak,
+        )
         self.monitor.start()
 
     def _on_updates_detected(self, count):
@@ -61,9 +65,15 @@ class SoftwareCenterService:
     def GetAppDetails(self, app_id):
         return json.dumps(self.app_manager.get_app_details(app_id))
 
+    def GetAppTransaction(self, app_id):
+        return json.dumps(self.app_manager.get_app_transaction(app_id))
+
     def SearchApps(self, query):
         return json.dumps(self.app_manager.search_apps(query))
 
+    def Suggest(self, query, limit):
+        return json.dumps(self.app_manager.suggest(query, limit=limit or 10))
+
     def Install(self, app_id):
         # In production, this would be wrapped in a polkit check
         # For this prototype, we call the installer directly
@@ -78,6 +88,9 @@ class SoftwareCenterService:
         result = self.action_manager.remove(app_id)
         return json.dumps(result)
 
+    def PreviewRemove(self, app_id):
+        return json.dumps(self.app_manager.apt.get_removal_impact([app_id]))
+
     def SwitchProfile(self, app_id):
         logger.info(f"Switching system to profile: {app_id}")
         result = self.app_manager.profiles.switch_profile(app_id)
@@ -89,6 +102,11 @@ class SoftwareCenterService:
     def Update(self):
         logger.info("Updating system cache...")
         result = self.action_manager.update_cache()
+        self.app_manager.refresh_catalog()
+        # Upgrade detection runs in-process now, so check right after the refresh
+        update_count = self.monitor.check_updates()
+        if update_count > 0:
+            self._on_updates_detected(update_count)
         return json.dumps(result)
 
 
@@ -1,19 +1,23 @@
 import subprocess
 
+from common.cache import MetadataCache
+
 
 class AppStreamProvider:
     """Parses AppStream metadata for rich app descriptions and screenshots."""
 
-    DEBIAN_APPSTREAM_PATH = "/usr/share/app-info/xmls/"
-
-    def __init__(self):
-        self.cache = {}
+    def __init__(self, flatpak_index=None, debian_index=None):
+        # Shared by the request threads; bounded so long-running daemons don't grow
+        self.cache = MetadataCache(max_entries=2048, ttl=3600, negative_ttl=300)
+        self.flatpak_index = flatpak_index
+        self.debian_index = debian_index
 
     def get_metadata(self, app_id):
         """Fetches metadata for a given app_id (APT or Flatpak)."""
-        if app_id in self.cache:
-            return self.cache[app_id]
+        # Apps without metadata are cached too, for the shorter negative TTL
+        return self.cache.get_or_load(app_id, self._load_metadata)
 
+    def _load_metadata(self, app_id):
         metadata = {}
 
         # Try Flatpak first (built-in command for appstream)
@@ -26,11 +30,23 @@ class AppStreamProvider:
             if debian_meta:
                 metadata.update(debian_meta)
 
-        self.cache[app_id] = metadata
         return metadata
 
     def _get_flatpak_metadata(self, app_id):
-        """Uses flatpak info to get appstream details."""
+        """Reads appstream details from the local remote index, or flatpak info."""
+        if self.flatpak_index is not None and self.flatpak_index.available():
+            entry = self.flatpak_index.get(app_id)
+            if entry:
+                return {
+                    "description": entry["description"] or entry["summary"],
+                    "version": entry["version"],
+                    "license": entry["license"],
+                    "screenshots": entry["screenshots"],
+                    "categories": entry["categories"],
+                    "icon": entry["icon"],
+                    "developer": entry["developer"],
+                }
+
         try:
             # flatpak info --show-metadata is raw, but we want the description
             result = subprocess.run(
@@ -56,16 +72,26 @@ class AppStreamProvider:
             return {}
 
     def _get_debian_metadata(self, app_id):
-        """Searches /usr/share/app-info/xmls/ for the app_id."""
-        # This is a broad search, in a real system we'd use a pre-indexed DB or libappstream
-        # For our toolkit, we'll mock the extraction logic
+        """Looks a package name or component id up in the DEP-11 catalog index."""
+        entry = self.debian_index.get(app_id) if self.debian_index is not None else None
+        if not entry:
+            return {}
         return {
-            "description": f"Rich AppStream description for {app_id}. This package is part of the Debian stable repository.",
-            "screenshots": ["https://www.debian.org/logos/openlogo-nd-100.png"],
-            "license": "GPL-3.0+",
-            "developer": "Debian Project",
+            "name": entry["name"],
+            "summary": entry["summary"],
+            "description": entry["description"] or entry["summary"],
+            "screenshots": entry["screenshots"],
+            "categories": entry["categories"],
+            "keywords": entry["keywords"],
+            "icon": entry["icon"],
+            "license": entry["license"],
+            "developer": entry["developer"],
         }
 
+    def invalidate(self, event=None):
+        """Drops cached metadata; subscribed to catalog change events."""
+        self.cache.clear()
+
     def get_screenshots(self, app_id):
         meta = self.get_metadata(app_id)
         return meta.get("screenshots", [])
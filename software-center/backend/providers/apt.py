@@ -1,33 +1,87 @@
 import subprocess
 
+from common.deb822 import iter_stanzas
+from providers.apt_catalog import PackageCatalog
+from providers.apt_policy import AptPolicy
+from providers.apt_simulator import AptSimulator
+from providers.debversion import version_sort_key
+from providers.dpkg_status import DpkgStatusIndex
+from providers.relations import Relations
+from providers.removal_impact import RemovalImpactIndex
+
+
+def _version_key(stanza):
+    return version_sort_key(stanza.get("Version", ""))
+
 
 class AptProvider:
     """Provides access to APT and dpkg for package management."""
 
-    def __init__(self):
-        pass
+    def __init__(self, dpkg_status=None, catalog=None):
+        self.dpkg = dpkg_status or DpkgStatusIndex()
+        self.catalog = catalog if catalog is not None else PackageCatalog()
+        self.policy = AptPolicy(self.catalog)
+        self.catalog.policy = self.policy
+        self.removal = RemovalImpactIndex(self.dpkg)
+        self.simulator = AptSimulator(self)
+        self._installed_relations = (None, Relations())
 
     def get_package_info(self, package_name):
         """Gets detailed info about a package."""
+        if self.catalog.available():
+            return self._get_catalog_info(package_name)
+
         try:
             result = subprocess.run(
                 ["apt-cache", "show", package_name], capture_output=True, text=True, check=True
             )
             return self._parse_apt_show(result.stdout)
         except (subprocess.CalledProcessError, FileNotFoundError):
-            # Mock data for development
-            if "ctxos" in package_name:
-                return {
-                    "Package": package_name,
-                    "Version": "1.0.0",
-                    "Description": f"This is a mock description for {package_name}",
-                    "Installed-Size": "1024",
-                    "Origin": "ctxos",
-                }
-            return None
+            return self._mock_package_info(package_name)
+
+    def get_package_info_many(self, package_names):
+        """Gets info for a set of packages in a single backend pass.
+
+        Returns {name: info} for every requested name; names APT does not know
+        map to None.
+        """
+        names = list(dict.fromkeys(package_names))
+        if not names:
+            return {}
+        if self.catalog.available():
+            return {name: self._get_catalog_info(name) for name in names}
+
+        results = dict.fromkeys(names)
+        try:
+            # apt-cache exits non-zero if any name is unknown but still prints the rest
+            result = subprocess.run(["apt-cache", "show"] + names, capture_output=True, text=True)
+        except FileNotFoundError:
+            return {name: self._mock_package_info(name) for name in names}
+
+        stanzas = {}
+        for stanza in iter_stanzas(result.stdout):
+            if stanza.get("Package") in results:
+                stanzas.setdefault(stanza["Package"], []).append(stanza)
+
+        # apt-cache prints every available version in no particular order; ask the
+        # policy which one apt would install when there is more than one
+        ambiguous = [
+            n for n, found in stanzas.items() if len({s.get("Version") for s in found}) > 1
+        ]
+        candidates = self._cli_candidates(ambiguous) if ambiguous else {}
+        for name, found in stanzas.items():
+            chosen = [s for s in found if s.get("Version") == candidates.get(name)]
+            results[name] = (chosen or sorted(found, key=_version_key, reverse=True))[0]
+        return results
 
     def list_packages(self, search_term=None):
         """Lists available packages, optionally filtered by search_term."""
+        if self.catalog.available():
+            names = self.catalog.names()
+            if search_term:
+                return sorted(n for n in names if n.startswith(search_term))
+            return sorted(names)
+
         try:
             cmd = ["apt-cache", "pkgnames"]
             if search_term:
@@ -40,6 +94,9 @@ class AptProvider:
 
     def is_installed(self, package_name):
         """Checks if a package is installed."""
+        if self.dpkg.available():
+            return self.dpkg.is_installed(package_name)
+
         try:
             result = subprocess.run(
                 ["dpkg-query", "-W", "-f='${Status}'", package_name], capture_output=True, text=True
@@ -49,6 +106,118 @@ class AptProvider:
             # Mock some packages as installed
             return package_name in ["ctxos-core"]
 
+    def is_installed_many(self, package_names):
+        """Checks the installed state of a set of packages, returning {name: bool}."""
+        names = list(dict.fromkeys(package_names))
+        if not names:
+            return {}
+        if self.dpkg.available():
+            return self.dpkg.installed_states(names)
+
+        states = dict.fromkeys(names, False)
+        try:
+            result = subprocess.run(
+                ["dpkg-query", "-W", "-f=${Package}\t${Status}\n"] + names,
+                capture_output=True,
+                text=True,
+            )
+        except FileNotFoundError:
+            return {name: name in ["ctxos-core"] for name in names}
+
+        for line in result.stdout.splitlines():
+            name, _, status = line.partition("\t")
+            if name in states and status == "install ok installed":
+                states[name] = True
+        return states
+
+    def installed_relations(self):
+        """Returns Provides/Conflicts indexes over installed packages, rebuilt when dpkg changes."""
+        if not self.dpkg.available():
+            return Relations()
+        stamp = self.dpkg.stamp
+        cached_stamp, relations = self._installed_relations
+        if cached_stamp != stamp:
+            relations = Relations(self.dpkg.installed_packages())
+            self._installed_relations = (stamp, relations)
+        return relations
+
+    def get_removal_impact(self, package_names, keep=()):
+        """Previews what removing packages takes with it, without running apt.
+
+        ``keep`` names packages that stay or get installed alongside the removal.
+        Returns {"requested", "removed", "autoremovable", "not_installed"}.
+        """
+        names = list(dict.fromkeys(package_names))
+        if self.dpkg.available():
+            return self.removal.impact(names, keep)
+
+        try:
+            result = subprocess.run(
+                ["apt-get", "-s", "remove"] + names, capture_output=True, text=True
+            )
+        except FileNotFoundError:
+            return {"requested": names, "removed": names, "autoremovable": [], "not_installed": []}
+
+        removed, autoremovable = [], []
+        in_autoremove_block = False
+        for line in result.stdout.splitlines():
+            if line.startswith("Remv "):
+                removed.append(line.split()[1])
+            elif "no longer required" in line:
+                in_autoremove_block = True
+            elif in_autoremove_block and line.startswith(" "):
+                autoremovable.extend(line.split())
+            else:
+                in_autoremove_block = False
+        return {
+            "requested": [name for name in names if name in removed],
+            "removed": sorted(removed),
+            "autoremovable": sorted(autoremovable),
+            "not_installed": [name for name in names if name not in removed],
+        }
+
+    def _get_catalog_info(self, package_name):
+        """Serves package metadata from the Packages-list catalog."""
+        info = self.catalog.get(package_name)
+        if info:
+            return info
+
+        # Locally installed packages (e.g. from a .deb) only exist in the dpkg database
+        record = self.dpkg.get(package_name)
+        if record and record["installed"]:
+            return {k: v for k, v in record.items() if k[0].isupper()}
+        return None
+
+    def _cli_candidates(self, package_names):
+        """Returns {name: candidate version} from ``apt-cache policy``; empty if it can't run."""
+        try:
+            result = subprocess.run(
+                ["apt-cache", "policy"] + package_names, capture_output=True, text=True
+            )
+        except FileNotFoundError:
+            return {}
+        candidates, name = {}, None
+        for line in result.stdout.splitlines():
+            if line and not line[0].isspace():
+                name = line.rstrip(":")
+            elif name and line.strip().startswith("Candidate:"):
+                version = line.split(":", 1)[1].strip()
+                if version != "(none)":
+                    candidates[name] = version
+        return candidates
+
+    def _mock_package_info(self, package_name):
+        """Mock data for development machines without APT."""
+        if "ctxos" in package_name:
+            return {
+                "Package": package_name,
+                "Version": "1.0.0",
+                "Description": f"This is a mock description for {package_name}",
+                "Installed-Size": "1024",
+                "Origin": "ctxos",
+            }
+        return None
+
     def _parse_apt_show(self, output):
         """Parses the output of apt-cache show."""
         info = {}
@@ -65,14 +234,34 @@ class AptProvider:
         return info
 
     def get_updates(self):
-        """Check for available updates."""
+        """Check for available updates.
+
+        Returns a list of {"name", "current_version", "candidate_version", "origin"}.
+        """
+        if self.catalog.available() and self.dpkg.available():
+            return self.policy.upgradable(self.dpkg.installed_packages())
+
         try:
             # We don't run update here, just list-upgradable
             result = subprocess.run(["apt", "list", "--upgradable"], capture_output=True, text=True)
             updates = []
             for line in result.stdout.splitlines()[1:]:  # Skip 'Listing...'
-                if "/" in line:
-                    updates.append(line.split("/")[0])
+                # name/suite candidate arch [upgradable from: current]
+                if "/" not in line:
+                    continue
+                name, _, rest = line.partition("/")
+                fields = rest.split()
+                current = (
+                    line.rsplit("upgradable from:", 1)[-1].strip(" ]") if "from:" in line else ""
+                )
+                updates.append(
+                    {
+                        "name": name,
+                        "current_version": current,
+                        "candidate_version": fields[1] if len(fields) > 1 else "",
+                        "origin": fields[0].split(",")[0] if fields else "",
+                    }
+                )
             return updates
         except Exception:
             return []
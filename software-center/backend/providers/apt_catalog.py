@@ -0,0 +1,270 @@
+import bz2
+import glob
+import gzip
+import logging
+import lzma
+import mmap
+import os
+import platform
+import re
+import threading
+
+from common.deb822 import parse_stanza
+from common.stamps import file_stamp, tree_stamp
+from providers.debversion import version_sort_key
+
+logger = logging.getLogger("ctxos.apt_catalog")
+
+try:
+    import lz4.frame
+
+    HAS_LZ4 = True
+except ImportError:
+    HAS_LZ4 = False
+
+try:
+    import zstandard
+
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+
+# Debian architecture names for the machine types we ship images for
+MACHINE_ARCHITECTURES = {
+    "x86_64": "amd64",
+    "amd64": "amd64",
+    "aarch64": "arm64",
+    "arm64": "arm64",
+    "armv7l": "armhf",
+    "armv6l": "armel",
+    "i386": "i386",
+    "i686": "i386",
+    "riscv64": "riscv64",
+    "ppc64le": "ppc64el",
+    "s390x": "s390x",
+}
+
+
+def native_architecture():
+    """Returns the dpkg architecture name of the running machine."""
+    machine = platform.machine().lower()
+    return MACHINE_ARCHITECTURES.get(machine, machine)
+
+
+class PackageCatalog:
+    """Memory-mapped index over the APT Packages lists.
+
+    Every *_Packages file under /var/lib/apt/lists is mapped (compressed
+    variants are decompressed once into memory) and scanned for stanza
+    offsets. Stanzas are only parsed when a package is looked up.
+    """
+
+    LISTS_DIR = "/var/lib/apt/lists"
+    SUFFIXES = (
+        "_Packages",
+        "_Packages.gz",
+        "_Packages.xz",
+        "_Packages.bz2",
+        "_Packages.lz4",
+        "_Packages.zst",
+    )
+
+    _PACKAGE_RE = re.compile(rb"^Package:[ \t]*(\S+)", re.MULTILINE)
+
+    def __init__(self, lists_dir=None):
+        self.lists_dir = lists_dir or self.LISTS_DIR
+        self.architecture = native_architecture()
+        self._lock = threading.Lock()
+        # (stamp, [(list_file, buffer)], {name: [(source_idx, start, end)]}) swapped atomically
+        self._state = (None, [], {})
+        self._dir_stamp = None
+        # AptPolicy picking candidates among several versions; set by AptProvider
+        self.policy = None
+
+    def list_files(self):
+        """Returns the Packages list files currently present in the lists directory."""
+        files = []
+        for suffix in self.SUFFIXES:
+            files.extend(glob.glob(os.path.join(self.lists_dir, f"*{suffix}")))
+        return sorted(files)
+
+    def available(self):
+        return bool(self._current()[2])
+
+    @property
+    def stamp(self):
+        """Change marker of the list files the index was last built from."""
+        return self._current()[0]
+
+    def current_stamp(self):
+        """Change marker of the list files on disk, without rebuilding the index."""
+        return tree_stamp(self.list_files())
+
+    def export_index(self):
+        """Returns (stamp, payload) describing the offset index for a catalog snapshot."""
+        stamp, sources, offsets = self._current()
+        payload = {
+            "files": [path for path, _ in sources],
+            "offsets": {
+                name: [v for entry in entries for v in entry] for name, entries in offsets.items()
+            },
+        }
+        return stamp, payload
+
+    def restore_index(self, stamp, payload):
+        """Installs an offset index exported from list files matching ``stamp``."""
+        sources = []
+        for path in payload["files"]:
+            buf = self._open(path)
+            if buf is None:
+                return False
+            sources.append((path, buf))
+
+        offsets = {}
+        for name, flat in payload["offsets"].items():
+            offsets[name] = list(zip(flat[0::3], flat[1::3], flat[2::3]))
+
+        with self._lock:
+            self._state = (stamp, sources, offsets)
+            self._dir_stamp = file_stamp(self.lists_dir)
+        return True
+
+    def names(self):
+        """Returns all package names known to the catalog."""
+        return self._current()[2].keys()
+
+    def __contains__(self, package_name):
+        return package_name in self._current()[2]
+
+    def __len__(self):
+        return len(self._current()[2])
+
+    def lookup(self, package_name, architecture=None, fields=None):
+        """Returns every stanza for a package, one per version/architecture.
+
+        Each record carries a "List-File" key naming the list it came from.
+        ``fields`` restricts parsing to the given keys.
+        """
+        _, sources, offsets = self._current()
+        return self._records(sources, offsets.get(package_name, ()), architecture, fields)
+
+    def lookup_many(self, package_names, fields=None):
+        """Returns {name: lookup(name)} for the names in the catalog, read from one index state."""
+        _, sources, offsets = self._current()
+        found = {}
+        for name in package_names:
+            entries = offsets.get(name)
+            if entries:
+                found[name] = self._records(sources, entries, None, fields)
+        return found
+
+    @staticmethod
+    def _records(sources, entries, architecture, fields):
+        records = []
+        for source_idx, start, end in entries:
+            list_file, buf = sources[source_idx]
+            record = parse_stanza(buf[start:end].decode("utf-8", errors="replace"), fields)
+            if architecture and record.get("Architecture") not in (architecture, "all"):
+                continue
+            record["List-File"] = os.path.basename(list_file)
+            records.append(record)
+        return records
+
+    def names_by_list(self):
+        """Returns {list file: set of package names} for the current index."""
+        _, sources, offsets = self._current()
+        by_source = [set() for _ in sources]
+        for name, entries in offsets.items():
+            for source_idx, _, _ in entries:
+                by_source[source_idx].add(name)
+        return {path: names for (path, _), names in zip(sources, by_source)}
+
+    def get(self, package_name, fields=None):
+        """Returns the candidate stanza for a package on this machine, or None.
+
+        Among the versions for this architecture, this is the one the policy
+        picks (highest pin, then highest version), or the highest version when
+        there is no policy or every version is pinned away.
+        """
+        if fields is not None:
+            fields = frozenset(fields) | {"Architecture", "Version"}
+        records = self.lookup(package_name, fields=fields)
+        if not records:
+            return None
+        native = [r for r in records if r.get("Architecture") in (self.architecture, "all")]
+        records = native or records
+        if len(records) == 1:
+            return records[0]
+        if self.policy is not None:
+            best, _ = self.policy.candidate(package_name, records)
+            if best is not None:
+                return best
+        return max(records, key=lambda record: version_sort_key(record.get("Version", "")))
+
+    def _current(self):
+        # apt replaces list files by renaming them into place, which always bumps the
+        # directory mtime, so the per-file stat sweep only runs after a directory change
+        dir_stamp = file_stamp(self.lists_dir)
+        state = self._state
+        if dir_stamp == self._dir_stamp and state[0] is not None:
+            return state
+        with self._lock:
+            stamp = tree_stamp(self.list_files())
+            if self._state[0] != stamp:
+                # Readers holding the previous state keep its buffers alive
+                self._state = (stamp,) + self._build([path for path, _ in stamp])
+            self._dir_stamp = dir_stamp
+            return self._state
+
+    def _build(self, paths):
+        sources = []
+        offsets = {}
+        for path in paths:
+            buf = self._open(path)
+            if buf is None:
+                continue
+            source_idx = len(sources)
+            sources.append((path, buf))
+
+            size = len(buf)
+            for match in self._PACKAGE_RE.finditer(buf):
+                start = match.start()
+                end = buf.find(b"\n\n", start)
+                if end == -1:
+                    end = size
+                name = match.group(1).decode("ascii", errors="replace")
+                offsets.setdefault(name, []).append((source_idx, start, end))
+
+        logger.debug(f"Indexed {len(offsets)} packages from {len(sources)} list files")
+        return sources, offsets
+
+    def _open(self, path):
+        """Maps a plain list file, or returns the decompressed contents of a compressed one."""
+        try:
+            if path.endswith("_Packages"):
+                with open(path, "rb") as f:
+                    if os.fstat(f.fileno()).st_size == 0:
+                        return None
+                    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if path.endswith(".gz"):
+                with gzip.open(path, "rb") as f:
+                    return f.read()
+            if path.endswith(".xz"):
+                with lzma.open(path, "rb") as f:
+                    return f.read()
+            if path.endswith(".bz2"):
+                with bz2.open(path, "rb") as f:
+                    return f.read()
+            if path.endswith(".lz4") and HAS_LZ4:
+                with lz4.frame.open(path, "rb") as f:
+                    return f.read()
+            if path.endswith(".zst") and HAS_ZSTD:
+                with open(path, "rb") as f:
+                    return zstandard.ZstdDecompressor().stream_reader(f).read()
+        except (OSError, EOFError, ValueError, lzma.LZMAError) as e:
+            logger.warning(f"Could not read package list {path}: {e}")
+            return None
+
+        logger.warning(f"No decompressor available for {path}, skipping")
+        return None
@@ -0,0 +1,270 @@
+import fnmatch
+import glob
+import logging
+import os
+import re
+import threading
+
+from common.deb822 import iter_stanzas, parse_stanza
+from common.stamps import tree_stamp
+from providers.debversion import compare_versions, version_sort_key
+
+logger = logging.getLogger("ctxos.apt_policy")
+
+
+class AptPolicy:
+    """Pin priorities and candidate selection as described in apt_preferences(5).
+
+    Priorities come from the Release file of the list a version was found in
+    (NotAutomatic/ButAutomaticUpgrades) and from /etc/apt/preferences{,.d}.
+    APT::Default-Release is not consulted.
+    """
+
+    PREFERENCES_PATH = "/etc/apt/preferences"
+    PREFERENCES_DIR = "/etc/apt/preferences.d"
+
+    DEFAULT_PRIORITY = 500
+    INSTALLED_PRIORITY = 100
+
+    RELEASE_FIELDS = frozenset(
+        ["Origin", "Label", "Suite", "Codename", "Version", "NotAutomatic", "ButAutomaticUpgrades"]
+    )
+    # Short keys accepted in "Pin: release ..." lines
+    RELEASE_PIN_KEYS = {
+        "a": "Suite",
+        "n": "Codename",
+        "o": "Origin",
+        "l": "Label",
+        "v": "Version",
+        "c": "component",
+        "b": "architecture",
+    }
+
+    # Catalog fields needed to pick candidates
+    CANDIDATE_FIELDS = frozenset(["Package", "Version", "Architecture"])
+
+    def __init__(self, catalog, preferences_path=None, preferences_dir=None):
+        self.catalog = catalog
+        self.preferences_path = preferences_path or self.PREFERENCES_PATH
+        self.preferences_dir = preferences_dir or self.PREFERENCES_DIR
+        self._lock = threading.Lock()
+        self._lists_stamp = None
+        self._releases = {}  # list file -> release info, valid for self._lists_stamp
+        self._pins = (None, [])  # (preferences stamp, parsed pins)
+
+    def upgradable(self, installed):
+        """Computes upgrades for {name: dpkg record} in one pass over the catalog.
+
+        Returns a list of {"name", "current_version", "candidate_version", "origin"}.
+        """
+        self._sync()
+        updates = []
+        available = self.catalog.lookup_many(installed, fields=self.CANDIDATE_FIELDS)
+        for name, records in available.items():
+            record = installed[name]
+            arch = record.get("Architecture")
+            if arch and arch != "all":
+                records = [r for r in records if r.get("Architecture") in (arch, "all")]
+            if not records:
+                continue
+            best, _ = self._candidate(name, records, record.get("Version"))
+            if best is None:
+                continue
+            release = self.release_info(best["List-File"])
+            updates.append(
+                {
+                    "name": name,
+                    "current_version": record.get("Version"),
+                    "candidate_version": best["Version"],
+                    "origin": release.get("Origin") or release.get("host", ""),
+                }
+            )
+        return sorted(updates, key=lambda u: u["name"])
+
+    def candidate(self, package_name, records, installed_version=None):
+        """Picks the version apt would install, or None if the installed one stays.
+
+        Returns (record, priority).
+        """
+        self._sync()
+        return self._candidate(package_name, records, installed_version)
+
+    def priority(self, package_name, record):
+        """Returns the pin priority of one catalog record."""
+        self._sync()
+        return self._priority(package_name, record)
+
+    def _priority(self, package_name, record):
+        release = self.release_info(record.get("List-File", ""))
+        specific, general = None, None
+        for pin in self._pins[1]:
+            if not self._pin_matches(pin, package_name, record, release):
+                continue
+            if pin["general"]:
+                general = pin["priority"] if general is None else general
+            else:
+                specific = pin["priority"]
+                break
+
+        if specific is not None:
+            return specific
+        if general is not None:
+            return general
+        if release.get("NotAutomatic", "").lower() == "yes":
+            return 100 if release.get("ButAutomaticUpgrades", "").lower() == "yes" else 1
+        return self.DEFAULT_PRIORITY
+
+    def _candidate(self, package_name, records, installed_version):
+        best, best_priority = None, None
+        for record in records:
+            prio = self._priority(package_name, record)
+            if prio < 0:
+                continue
+            if (
+                best is None
+                or prio > best_priority
+                or (
+                    prio == best_priority
+                    and version_sort_key(record["Version"]) > version_sort_key(best["Version"])
+                )
+            ):
+                best, best_priority = record, prio
+
+        if best is None or installed_version is None:
+            return best, best_priority
+
+        cmp = compare_versions(best["Version"], installed_version)
+        if cmp == 0:
+            return None, None
+        # The installed version has priority 100 and apt only downgrades at >= 1000
+        if best_priority < self.INSTALLED_PRIORITY or (cmp < 0 and best_priority < 1000):
+            return None, None
+        return best, best_priority
+
+    def release_info(self, list_file):
+        """Returns the Release fields (plus host/component/architecture) for a list file."""
+        if not list_file:
+            return {}
+        info = self._releases.get(list_file)
+        if info is None:
+            info = self._parse_list_name(list_file)
+            release_path = self._release_path(list_file)
+            if release_path:
+                info.update(self._read_release(release_path))
+            self._releases[list_file] = info
+        return info
+
+    def _sync(self):
+        """Drops cached Release data when the lists change and reloads changed preferences."""
+        lists_stamp = self.catalog.stamp
+        if lists_stamp != self._lists_stamp:
+            self._releases = {}
+            self._lists_stamp = lists_stamp
+        self._load_pins()
+
+    def _release_path(self, list_file):
+        base = re.sub(r"_Packages(\.\w+)?$", "", os.path.basename(list_file))
+        segments = base.split("_")
+        # Suites with slashes are flattened to underscores too, so probe from the longest prefix
+        for i in range(len(segments) - 1, 0, -1):
+            prefix = os.path.join(self.catalog.lists_dir, "_".join(segments[:i]))
+            for suffix in ("_InRelease", "_Release"):
+                if os.path.exists(prefix + suffix):
+                    return prefix + suffix
+        return None
+
+    def _parse_list_name(self, list_file):
+        # host_path_dists_suite_component_binary-arch_Packages
+        base = re.sub(r"_Packages(\.\w+)?$", "", os.path.basename(list_file))
+        segments = base.split("_")
+        info = {"host": segments[0]}
+        if len(segments) >= 2 and segments[-1].startswith("binary-"):
+            info["architecture"] = segments[-1][len("binary-") :]
+            if len(segments) >= 3:
+                info["component"] = segments[-2]
+        return info
+
+    def _read_release(self, path):
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                content = f.read()
+        except OSError as e:
+            logger.warning(f"Could not read release file {path}: {e}")
+            return {}
+
+        if content.startswith("-----BEGIN PGP SIGNED MESSAGE-----"):
+            # Skip the armor header block and drop the trailing signature
+            content = content.split("\n\n", 1)[-1]
+            content = content.split("-----BEGIN PGP SIGNATURE-----", 1)[0]
+        return parse_stanza(content, self.RELEASE_FIELDS)
+
+    def _load_pins(self):
+        paths = [self.preferences_path] + sorted(
+            p
+            for p in glob.glob(os.path.join(self.preferences_dir, "*"))
+            if re.match(r"^[\w.-]+$", os.path.basename(p))
+            and (p.endswith(".pref") or "." not in os.path.basename(p))
+        )
+        stamp = tree_stamp(paths)
+        if self._pins[0] == stamp:
+            return self._pins[1]
+
+        with self._lock:
+            pins = []
+            for path in paths:
+                try:
+                    with open(path, "r", encoding="utf-8", errors="replace") as f:
+                        content = f.read()
+                except OSError:
+                    continue
+                content = "\n".join(
+                    line for line in content.splitlines() if not line.lstrip().startswith("#")
+                )
+                for stanza in iter_stanzas(content):
+                    pin = self._parse_pin(stanza)
+                    if pin:
+                        pins.append(pin)
+            self._pins = (stamp, pins)
+        return pins
+
+    def _parse_pin(self, stanza):
+        try:
+            priority = int(stanza["Pin-Priority"])
+            kind, _, value = stanza["Pin"].partition(" ")
+            packages = stanza["Package"].split()
+        except (KeyError, ValueError):
+            return None
+        return {
+            "packages": packages,
+            "general": packages == ["*"],
+            "kind": kind,
+            "value": value.strip(),
+            "priority": priority,
+        }
+
+    def _pin_matches(self, pin, package_name, record, release):
+        if not pin["general"] and not any(
+            self._name_matches(pattern, package_name) for pattern in pin["packages"]
+        ):
+            return False
+
+        if pin["kind"] == "version":
+            return fnmatch.fnmatchcase(record.get("Version", ""), pin["value"])
+        if pin["kind"] == "origin":
+            return release.get("host", "") == pin["value"].strip('"')
+        if pin["kind"] == "release":
+            for term in pin["value"].split(","):
+                key, sep, expected = term.strip().partition("=")
+                if not sep:
+                    # Bare "release stable" is shorthand for the archive name
+                    key, expected = "a", key
+                field = self.RELEASE_PIN_KEYS.get(key)
+                if field is None or not self._name_matches(expected, release.get(field, "")):
+                    return False
+            return True
+        return False
+
+    def _name_matches(self, pattern, value):
+        if len(pattern) > 1 and pattern.startswith("/") and pattern.endswith("/"):
+            return re.search(pattern[1:-1], value) is not None
+        return fnmatch.fnmatchcase(value, pattern)
@@ -0,0 +1,96 @@
+import logging
+import os
+import re
+import subprocess
+
+from common.cache import MetadataCache
+
+logger = logging.getLogger("ctxos.apt_simulator")
+
+# "Inst name [old] (new origin [arch])", "Remv name [old]", "Conf name (new origin [arch])"
+_ACTION_RE = re.compile(
+    r"^(?P<action>Inst|Remv|Conf|Purg) (?P<name>\S+)"
+    r"(?: \[(?P<old>[^\]]+)\])?(?: \((?P<new>\S+)[^)]*\))?"
+)
+
+
+def parse_simulation(output):
+    """Parses ``apt-get -s`` output into {"install", "upgrade", "remove", "configure"}."""
+    plan = {"install": [], "upgrade": [], "remove": [], "configure": []}
+    for line in output.splitlines():
+        match = _ACTION_RE.match(line)
+        if not match:
+            continue
+        action, name, old, new = match.group("action", "name", "old", "new")
+        if action == "Inst" and old:
+            plan["upgrade"].append({"name": name, "version": new, "from": old})
+        elif action == "Inst":
+            plan["install"].append({"name": name, "version": new})
+        elif action == "Conf":
+            plan["configure"].append(name)
+        else:
+            plan["remove"].append(name)
+    return plan
+
+
+class AptSimulator:
+    """Runs apt's own solver in simulate mode and caches the resulting plans.
+
+    A plan is keyed by the requested installs and removals together with the
+    dpkg status and apt lists stamps, so a repeated preview is a dictionary
+    hit and is recomputed only once the system or the archive has changed.
+    """
+
+    MAX_ENTRIES = 64
+
+    def __init__(self, apt_provider):
+        self.apt = apt_provider
+        # Keys carry the system stamps, so entries never go stale and need no TTL
+        self.cache = MetadataCache(max_entries=self.MAX_ENTRIES, ttl=None, stripes=4)
+
+    def simulate(self, install=(), remove=()):
+        """Returns what apt would do for a transaction, without changing the system.
+
+        Returns {"success", "install", "upgrade", "remove", "configure", "error"}.
+        """
+        install = sorted(set(install))
+        remove = sorted(set(remove) - set(install))
+        key = (
+            tuple(install),
+            tuple(remove),
+            self.apt.dpkg.current_stamp(),
+            self.apt.catalog.current_stamp(),
+        )
+        return self.cache.get_or_load(
+            key, lambda key: self._run(install, remove), negative=lambda plan: False
+        )
+
+    def _run(self, install, remove):
+        env = os.environ.copy()
+        env["LC_ALL"] = "C"  # the Inst/Remv lines are parsed
+        # A trailing "-" asks apt to remove a package within the same install run
+        cmd = ["apt-get", "-s", "-q", "install"] + install + [f"{name}-" for name in remove]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, env=env)
+        except FileNotFoundError:
+            return self._mock_simulation(install, remove)
+
+        plan = parse_simulation(result.stdout)
+        plan["success"] = result.returncode == 0
+        plan["error"] = None
+        if result.returncode != 0:
+            errors = [line[3:] for line in result.stderr.splitlines() if line.startswith("E: ")]
+            plan["error"] = "\n".join(errors) or result.stderr.strip()
+            logger.warning(f"apt simulation failed for {cmd[4:]}: {plan['error']}")
+        return plan
+
+    def _mock_simulation(self, install, remove):
+        """Mock plan for development machines without APT."""
+        return {
+            "success": True,
+            "install": [{"name": name, "version": "1.0.0"} for name in install],
+            "upgrade": [],
+            "remove": list(remove),
+            "configure": list(install),
+            "error": None,
+        }
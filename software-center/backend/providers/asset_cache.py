@@ -0,0 +1,392 @@
+import contextlib
+import hashlib
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger("ctxos.asset_cache")
+
+# Pillow is optional; without it screenshots are served at full size
+try:
+    from PIL import Image
+
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+# Names under which cached files are served: an object digest, or a thumbnail of one
+ASSET_NAME_RE = re.compile(r"^([0-9a-f]{64})(-\d+x\d+\.png)?$")
+
+# Leading bytes of the image types screenshots and icons come in
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+)
+
+
+def _make_thumbnail(source, target, size):
+    """Writes a thumbnail of ``source`` to ``target``; runs in a worker process."""
+    with Image.open(source) as img:
+        img.thumbnail(size, Image.LANCZOS)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA")
+        fd, tmp_path = tempfile.mkstemp(prefix=".thumb-", dir=os.path.dirname(target))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, "PNG", optimize=True)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return target
+
+
+class ConnectionPool:
+    """Keeps idle keep-alive HTTP(S) connections per host for reuse between downloads."""
+
+    def __init__(self, max_idle=4, timeout=30):
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle = {}  # (scheme, netloc) -> [connection]
+
+    @contextlib.contextmanager
+    def get(self, url, headers=None):
+        """Yields the response to a GET; the connection is pooled again once it is read."""
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported asset URL: {url}")
+        key = (parts.scheme, parts.netloc)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+        while True:
+            conn, reused = self._acquire(key)
+            try:
+                conn.request("GET", path, headers=headers or {})
+                response = conn.getresponse()
+                break
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                # The server may have dropped an idle connection; retry once on a fresh one
+                if not reused:
+                    raise
+
+        try:
+            yield response
+        except BaseException:
+            conn.close()
+            raise
+        if response.will_close or not response.isclosed():
+            conn.close()
+        else:
+            self._release(key, conn)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+    def _acquire(self, key):
+        with self._lock:
+            connections = self._idle.get(key)
+            if connections:
+                return connections.pop(), True
+        scheme, netloc = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(netloc, timeout=self.timeout), False
+
+    def _release(self, key, conn):
+        with self._lock:
+            connections = self._idle.setdefault(key, [])
+            if len(connections) < self.max_idle:
+                connections.append(conn)
+                return
+        conn.close()
+
+
+class AssetCache:
+    """Content-addressed on-disk cache for screenshots and icons.
+
+    Downloads share a pool of keep-alive connections and at most
+    ``max_downloads`` run at once. Files are stored under the SHA-256 of
+    their content, so the same image behind several URLs is kept once; each
+    URL has a small record with its ETag/Last-Modified and is revalidated
+    with a conditional GET once it is older than ``REVALIDATE_AFTER``.
+    Thumbnails are made with Pillow in a process pool, off the request threads.
+    Downloads larger than ``max_bytes`` are refused, by their Content-Length
+    when the server sends one and otherwise once that much has been read.
+    """
+
+    SYSTEM_CACHE_DIR = "/var/cache/ctxos/software-center/assets"
+    MAX_DOWNLOADS = 4
+    MAX_REDIRECTS = 5
+    MAX_BYTES = 16 * 1024 * 1024
+    REVALIDATE_AFTER = 24 * 3600
+    THUMBNAIL_SIZE = (624, 351)
+    THUMBNAIL_TIMEOUT = 30
+
+    def __init__(self, cache_dir=None, max_downloads=None, max_bytes=None):
+        if cache_dir:
+            self.cache_dir = cache_dir
+        elif os.geteuid() == 0:
+            self.cache_dir = self.SYSTEM_CACHE_DIR
+        else:
+            self.cache_dir = os.path.join(
+                os.environ.get("HOME", "."), ".cache", "ctxos", "software-center", "assets"
+            )
+        max_downloads = max_downloads or self.MAX_DOWNLOADS
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self.pool = ConnectionPool(max_idle=max_downloads)
+        self._slots = threading.BoundedSemaphore(max_downloads)
+        self._executor = ThreadPoolExecutor(max_workers=max_downloads, thread_name_prefix="assets")
+        self._thumbnailer = None  # process pool, created on first use
+        self._lock = threading.Lock()
+        self._pending = {}  # url -> future of a background fetch
+
+    def local(self, url):
+        """Returns the cached file for a URL (its thumbnail if there is one), without any I/O
+        beyond a stat; None if it isn't cached."""
+        record = self._load_record(url)
+        if not record:
+            return None
+        path = self._object_path(record["object"])
+        thumb = self._thumbnail_path(record["object"])
+        if os.path.exists(thumb):
+            return thumb
+        return path if os.path.exists(path) else None
+
+    def localize(self, urls, base_url=None):
+        """Maps asset URLs to their cached copies where cached.
+
+        Cached copies are ``file://`` URIs for local frontends, or
+        ``base_url``/<name> when they are served over HTTP (see ``resolve``).
+        Missing assets keep their remote URL and are fetched in the background,
+        so the next view renders from the cache.
+        """
+        localized, missing = [], []
+        for url in urls:
+            path = self.local(url) if url.startswith(("http://", "https://")) else None
+            if path and base_url:
+                localized.append(f"{base_url}/{os.path.basename(path)}")
+            elif path:
+                localized.append("file://" + path)
+            else:
+                localized.append(url)
+                if url.startswith(("http://", "https://")):
+                    missing.append(url)
+        if missing:
+            self.prefetch(missing)
+        return localized
+
+    def resolve(self, name):
+        """Returns (path, mimetype) of a cached file by the name ``localize`` gave it;
+        None for unknown or malformed names."""
+        match = ASSET_NAME_RE.match(name)
+        if not match:
+            return None
+        if match.group(2):
+            path = os.path.join(self.cache_dir, "thumbnails", name)
+        else:
+            path = self._object_path(name)
+        try:
+            with open(path, "rb") as f:
+                head = f.read(512)
+        except OSError:
+            return None
+        for signature, mimetype in IMAGE_SIGNATURES:
+            if head.startswith(signature):
+                return path, mimetype
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return path, "image/webp"
+        if b"<svg" in head:
+            return path, "image/svg+xml"
+        return path, "application/octet-stream"
+
+    def prefetch(self, urls, thumbnails=True):
+        """Fetches assets in the background; returns their futures."""
+        futures = []
+        with self._lock:
+            for url in urls:
+                future = self._pending.get(url)
+                if future is None:
+                    future = self._executor.submit(self._prefetch_one, url, thumbnails)
+                    future.add_done_callback(lambda _, url=url: self._done(url))
+                    self._pending[url] = future
+                futures.append(future)
+        return futures
+
+    def fetch(self, url, revalidate=False):
+        """Returns the local path of an asset, downloading or revalidating it as needed.
+
+        A stale copy is returned when the server cannot be reached; None if
+        there is no copy at all.
+        """
+        record = self._load_record(url)
+        path = self._object_path(record["object"]) if record else None
+        if path and not os.path.exists(path):
+            record, path = None, None
+        if path and not revalidate and time.time() - record["checked"] < self.REVALIDATE_AFTER:
+            return path
+
+        headers = {}
+        if record and record.get("etag"):
+            headers["If-None-Match"] = record["etag"]
+        if record and record.get("last_modified"):
+            headers["If-Modified-Since"] = record["last_modified"]
+
+        try:
+            with self._slots:
+                status, validators, digest = self._download(url, headers)
+        except (http.client.HTTPException, OSError, ValueError) as e:
+            logger.warning(f"Could not fetch asset {url}: {e}")
+            return path
+
+        if status == 304 and record:
+            record["checked"] = time.time()
+            self._store_record(url, record)
+            return path
+        if digest is None:
+            logger.warning(f"Could not fetch asset {url}: HTTP {status}")
+            return path
+
+        self._store_record(url, dict(validators, object=digest, checked=time.time()))
+        return self._object_path(digest)
+
+    def thumbnail(self, path, size=None):
+        """Returns a thumbnail of a cached asset, made in the process pool.
+
+        Falls back to the asset itself when Pillow is missing or the image
+        can't be read.
+        """
+        size = size or self.THUMBNAIL_SIZE
+        digest = os.path.basename(path)
+        target = self._thumbnail_path(digest, size)
+        if os.path.exists(target):
+            return target
+        if not HAS_PIL:
+            return path
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            future = self._thumbnail_pool().submit(_make_thumbnail, path, target, size)
+            return future.result(timeout=self.THUMBNAIL_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Could not make a thumbnail of {path}: {e}")
+            return path
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        if self._thumbnailer is not None:
+            self._thumbnailer.shutdown(wait=False)
+        self.pool.close()
+
+    def _prefetch_one(self, url, thumbnails):
+        path = self.fetch(url)
+        if path and thumbnails:
+            self.thumbnail(path)
+        return path
+
+    def _done(self, url):
+        with self._lock:
+            self._pending.pop(url, None)
+
+    def _thumbnail_pool(self):
+        with self._lock:
+            if self._thumbnailer is None:
+                # Forking the threaded server could copy a lock another thread holds
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload([__name__])
+                self._thumbnailer = ProcessPoolExecutor(max_workers=2, mp_context=context)
+            return self._thumbnailer
+
+    def _download(self, url, headers):
+        """Streams a URL into the object store; returns (status, validators, digest or None)."""
+        for _ in range(self.MAX_REDIRECTS + 1):
+            with self.pool.get(url, headers) as response:
+                if response.status in (301, 302, 303, 307, 308) and response.getheader("Location"):
+                    response.read()
+                    url = urllib.parse.urljoin(url, response.getheader("Location"))
+                    continue
+                validators = {
+                    "etag": response.getheader("ETag"),
+                    "last_modified": response.getheader("Last-Modified"),
+                }
+                if response.status != 200:
+                    response.read()
+                    return response.status, validators, None
+                length = response.getheader("Content-Length")
+                if length and length.isdigit() and int(length) > self.max_bytes:
+                    raise ValueError(f"{length} bytes is over the {self.max_bytes} byte limit")
+                return response.status, validators, self._store_object(response)
+        raise http.client.HTTPException(f"Too many redirects for {url}")
+
+    def _store_object(self, stream):
+        objects = os.path.join(self.cache_dir, "objects")
+        os.makedirs(objects, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(prefix=".asset-", dir=objects)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in iter(lambda: stream.read(65536), b""):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ValueError(f"Asset is over the {self.max_bytes} byte limit")
+                    digest.update(chunk)
+                    f.write(chunk)
+            digest = digest.hexdigest()
+            path = self._object_path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(tmp_path, 0o644)
+            # Identical content behind another URL is already stored under the same name
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return digest
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, "objects", digest[:2], digest)
+
+    def _thumbnail_path(self, digest, size=None):
+        width, height = size or self.THUMBNAIL_SIZE
+        return os.path.join(self.cache_dir, "thumbnails", f"{digest}-{width}x{height}.png")
+
+    def _record_path(self, url):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "urls", digest[:2], digest + ".json")
+
+    def _load_record(self, url):
+        try:
+            with open(self._record_path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store_record(self, url, record):
+        path = self._record_path(url)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".url-", dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(dict(record, url=url), f)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not record asset {url} in {self.cache_dir}: {e}")
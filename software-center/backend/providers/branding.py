@@ -33,5 +33,9 @@ class BrandingProvider:
 
         return branding
 
+    def reload(self, event=None):
+        """Re-reads defaults and OEM overrides; subscribed to branding change events."""
+        self.branding = self._load_branding()
+
     def get_config(self):
         return self.branding
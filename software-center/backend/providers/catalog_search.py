@@ -0,0 +1,249 @@
+import logging
+import threading
+
+from common.desktop import DESKTOP_DIRS, desktop_files, read_desktop_entry
+from common.stamps import file_stamp
+from providers.category_index import CategoryIndex
+from providers.search_index import SearchIndex
+
+logger = logging.getLogger("ctxos.catalog_search")
+
+# Long descriptions are cut here; the opening paragraph carries the useful terms
+DESCRIPTION_LIMIT = 400
+
+
+class CatalogSearch:
+    """Keeps one SearchIndex over APT packages, flatpaks, profiles and desktop entries.
+
+    Each source has its own change marker and only changed sources are
+    re-read: for the APT lists only packages in list files that changed, for
+    DEP-11 and desktop files only the packages whose data differs. AppStream
+    and desktop entries enrich the document of the package they belong to
+    rather than adding documents of their own.
+
+    The CategoryIndex is kept alongside from the same documents. Of the APT
+    packages it only files stacks and packages with AppStream data or a
+    desktop entry, so categories list applications rather than libraries.
+    """
+
+    FIELDS = frozenset(["Package", "Description", "Section", "Version", "Architecture"])
+
+    def __init__(self, apt, flatpak, meta, dep11, desktop_dirs=None):
+        self.apt = apt
+        self.flatpak = flatpak
+        self.meta = meta
+        self.dep11 = dep11
+        self.desktop_dirs = desktop_dirs or DESKTOP_DIRS
+        self.index = SearchIndex()
+        self.categories = CategoryIndex()
+        self._lock = threading.Lock()  # serializes updates; searches read the index
+        self._stamps = {}
+        self._names_by_list = {}
+        self._appstream = {}  # package -> DEP-11 entry
+        self._desktop = {}  # package -> [desktop entries]
+
+    def search(self, query, limit=50):
+        """Returns ranked results as {"id", "name", "description", "type", "repo", "score"}.
+
+        Never waits for ``update``: until the first one finishes, results cover
+        the sources indexed so far.
+        """
+        return [
+            {
+                "id": document["id"],
+                "name": document["name"],
+                "description": document["summary"],
+                "type": document["type"],
+                "repo": document["repo"],
+                "score": document["score"],
+            }
+            for document in self.index.search(query, limit=limit)
+        ]
+
+    def list_category(self, category):
+        """Returns the entries filed under a category as {"id", "name", "description", "type", "repo"}.
+
+        Like ``search``, covers what has been indexed so far.
+        """
+        results, seen = [], set()
+        documents = (self.index.get(key) for key in self.categories.members(category))
+        for document in sorted(filter(None, documents), key=lambda d: (d["name"].lower(), d["id"])):
+            if document["id"] in seen:
+                continue
+            seen.add(document["id"])
+            results.append(
+                {
+                    "id": document["id"],
+                    "name": document["name"],
+                    "description": document["summary"],
+                    "type": document["type"],
+                    "repo": document["repo"],
+                }
+            )
+        return results
+
+    def update(self, event=None):
+        """Re-reads whatever changed since the last update; usable as a watcher callback."""
+        with self._lock:
+            changed = self._update_desktop() | self._update_appstream()
+            updated = self._update_packages(changed)
+            updated += self._update_flatpaks()
+            updated += self._update_profiles()
+        if updated:
+            logger.info(f"Search index updated: {updated} documents, {len(self.index)} total")
+        return updated
+
+    def _changed(self, source, stamp):
+        if self._stamps.get(source, object()) == stamp:
+            return False
+        self._stamps[source] = stamp
+        return True
+
+    def _update_desktop(self):
+        # Desktop files are added by package installs, which bump the directory mtime
+        stamp = tuple(file_stamp(directory) for directory in self.desktop_dirs)
+        if not self._changed("desktop", stamp):
+            return set()
+        by_package = {}
+        for path in desktop_files(self.desktop_dirs):
+            entry = read_desktop_entry(path)
+            if entry:
+                by_package.setdefault(entry["package"] or entry["id"], []).append(entry)
+        changed = {
+            package
+            for package in by_package.keys() | self._desktop.keys()
+            if by_package.get(package) != self._desktop.get(package)
+        }
+        self._desktop = by_package
+        return changed
+
+    def _update_appstream(self):
+        if self.dep11 is None or not self._changed("dep11", self.dep11.current_stamp()):
+            return set()
+        packages = self.dep11.packages()
+        changed = {
+            package
+            for package in packages.keys() | self._appstream.keys()
+            if packages.get(package) != self._appstream.get(package)
+        }
+        self._appstream = packages
+        return changed
+
+    def _update_packages(self, extra=()):
+        catalog = self.apt.catalog
+        if not catalog.available():
+            return 0
+        affected = set(extra)
+        stamp = catalog.stamp
+        old = self._stamps.get("apt")
+        if stamp != old:
+            # Same approach as the dependency graph: re-read the packages of changed lists
+            old, new = dict(old or ()), dict(stamp)
+            names_by_list = catalog.names_by_list()
+            for path in old.keys() | new.keys():
+                if old.get(path) != new.get(path):
+                    affected |= self._names_by_list.get(path, set())
+                    affected |= names_by_list.get(path, set())
+            self._stamps["apt"] = stamp
+            self._names_by_list = names_by_list
+        if not affected:
+            return 0
+
+        profiles = {profile["id"] for profile in self.meta.PROFILES.values()}
+        documents, removed, applications = {}, [], {}
+        for name in affected:
+            record = catalog.get(name, fields=self.FIELDS) if name not in profiles else None
+            if record:
+                document = self._package_document(name, record)
+                documents[f"apt:{name}"] = document
+                if document["type"] == "stack" or name in self._appstream or name in self._desktop:
+                    applications[f"apt:{name}"] = document["categories"]
+            else:
+                removed.append(f"apt:{name}")
+        self.categories.update(
+            applications, removed=[key for key in documents if key not in applications] + removed
+        )
+        return self.index.update(documents, removed)
+
+    def _package_document(self, name, record):
+        summary, _, description = record.get("Description", "").partition("\n")
+        appstream = self._appstream.get(name) or {}
+        desktop = self._desktop.get(name, [])
+        keywords = list(appstream.get("keywords", []))
+        categories = [record.get("Section", "")] + list(appstream.get("categories", []))
+        for entry in desktop:
+            keywords += [entry["name"], entry["comment"]] + entry["keywords"]
+            categories += entry["categories"]
+        stack = name.startswith(self.meta.METAPACKAGE_PREFIX)
+        if stack and self.meta.category_of(name):
+            categories.append(self.meta.category_of(name))
+        return {
+            "id": name,
+            "name": appstream.get("name") or name,
+            "summary": appstream.get("summary") or summary,
+            "description": (appstream.get("description") or description)[:DESCRIPTION_LIMIT],
+            "keywords": keywords,
+            "categories": categories,
+            "type": "stack" if stack else "package",
+            "repo": "apt",
+        }
+
+    def _update_flatpaks(self):
+        index = self.flatpak.appstream
+        stamp = (tuple(source[:3] for source in index.sources()), self.flatpak.installation_stamp())
+        if not self._changed("flatpak", stamp):
+            return 0
+        documents = {}
+        for entry in index.entries() if index.available() else ():
+            documents[f"flatpak:{entry['id']}"] = {
+                "id": entry["id"],
+                "name": entry["name"],
+                "summary": entry["summary"],
+                "description": entry["description"][:DESCRIPTION_LIMIT],
+                "keywords": entry["keywords"],
+                "categories": entry["categories"],
+                "type": "flatpak",
+                "repo": entry["remote"],
+            }
+        # Installed apps whose remote has no appstream data
+        for app in self.flatpak.list_apps():
+            documents.setdefault(
+                f"flatpak:{app['id']}",
+                {
+                    "id": app["id"],
+                    "name": app["name"],
+                    "summary": "",
+                    "type": "flatpak",
+                    "repo": app.get("repo", ""),
+                },
+            )
+        removed = [
+            key for key in self.index.keys() if key.startswith("flatpak:") and key not in documents
+        ]
+        self.categories.update(
+            {key: document.get("categories", []) for key, document in documents.items()}, removed
+        )
+        return self.index.update(documents, removed)
+
+    def _update_profiles(self):
+        if not self._changed("profiles", tuple(sorted(self.meta.PROFILES))):
+            return 0
+        documents = {
+            f"profile:{profile['id']}": {
+                "id": profile["id"],
+                "name": profile["name"],
+                "summary": profile["description"],
+                "keywords": [key],
+                "categories": [profile["category"]] if profile.get("category") else [],
+                "type": profile.get("type", "profile"),
+                "repo": "ctxos",
+            }
+            for key, profile in self.meta.PROFILES.items()
+        }
+        removed = [
+            key for key in self.index.keys() if key.startswith("profile:") and key not in documents
+        ]
+        self.categories.update(
+            {key: document["categories"] for key, document in documents.items()}, removed
+        )
+        return self.index.update(documents, removed)
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import zlib
+
+logger = logging.getLogger("ctxos.catalog_snapshot")
+
+
+def stamp_digest(stamp):
+    """Reduces a change marker (nested tuples of paths, mtimes and inodes) to a short string."""
+    return hashlib.sha1(repr(stamp).encode("utf-8")).hexdigest()
+
+
+class CatalogSnapshot:
+    """Versioned on-disk snapshot of derived catalog state.
+
+    The file is a small JSON header followed by independently zlib-compressed
+    JSON sections. Each section records the stamp of the sources it was built
+    from (apt lists, dpkg status, flatpak installations), so a stale section is
+    rebuilt without throwing away the others. The file is mapped at load time
+    and sections are only decoded when asked for.
+
+    Processes that can't write the system snapshot keep their own and fall
+    back to the system one (``fallback_path``) for sections theirs lacks.
+
+    Layout: MAGIC | u32 header length | header JSON | section blobs
+    """
+
+    MAGIC = b"CTXSNAP\x00"
+    FORMAT_VERSION = 1
+    SYSTEM_PATH = "/var/cache/ctxos/software-center/catalog.snap"
+
+    def __init__(self, path=None, fallback_path=None):
+        if path:
+            self.path = path
+        elif os.geteuid() == 0:
+            self.path = self.SYSTEM_PATH
+        else:
+            self.path = os.path.join(
+                os.environ.get("HOME", "."), ".cache", "ctxos", "software-center", "catalog.snap"
+            )
+            fallback_path = fallback_path or self.SYSTEM_PATH
+        self.fallback_path = fallback_path
+        self._lock = threading.Lock()
+        self._map = None
+        self._sections = {}  # name -> {"stamp", "offset", "length"}
+        self._fallback = (None, {})  # (map, sections) of the fallback snapshot
+        self._pending = {}  # name -> (stamp, compressed blob)
+        self.load()
+
+    def load(self):
+        """Maps the snapshot file and reads its header. Returns False if it is unusable."""
+        with self._lock:
+            self._map, self._sections = self._read(self.path)
+            if self.fallback_path:
+                self._fallback = self._read(self.fallback_path)
+            return self._map is not None
+
+    def _read(self, path):
+        """Returns (map, sections) of a snapshot file; (None, {}) if it is missing or unusable."""
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None, {}
+
+        try:
+            if mapped[: len(self.MAGIC)] != self.MAGIC:
+                raise ValueError("bad magic")
+            (header_len,) = struct.unpack_from("<I", mapped, len(self.MAGIC))
+            header_start = len(self.MAGIC) + 4
+            header = json.loads(mapped[header_start : header_start + header_len])
+            if header.get("version") != self.FORMAT_VERSION:
+                raise ValueError(f"unsupported version {header.get('version')}")
+            sections = header["sections"]
+            for entry in sections.values():
+                if entry["offset"] + entry["length"] > len(mapped):
+                    raise ValueError("truncated section")
+        except (ValueError, KeyError, TypeError, struct.error) as e:
+            logger.warning(f"Ignoring catalog snapshot {path}: {e}")
+            return None, {}
+        return mapped, sections
+
+    def get(self, name, stamp):
+        """Returns a section's payload if it was built from sources matching ``stamp``."""
+        digest = stamp_digest(stamp)
+        with self._lock:
+            pending = self._pending.get(name)
+            if pending:
+                return json.loads(zlib.decompress(pending[1])) if pending[0] == digest else None
+
+            for mapped, sections in ((self._map, self._sections), self._fallback):
+                entry = sections.get(name)
+                if entry and entry["stamp"] == digest and mapped is not None:
+                    blob = mapped[entry["offset"] : entry["offset"] + entry["length"]]
+                    break
+            else:
+                return None
+
+        try:
+            return json.loads(zlib.decompress(blob))
+        except (zlib.error, ValueError) as e:
+            logger.warning(f"Corrupt snapshot section {name}: {e}")
+            return None
+
+    def put(self, name, stamp, payload):
+        """Stages a section for the next save()."""
+        blob = zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            self._pending[name] = (stamp_digest(stamp), blob)
+
+    def save(self):
+        """Atomically writes staged sections, keeping still-valid ones from the current file."""
+        with self._lock:
+            if not self._pending:
+                return True
+
+            blobs = {}
+            for name, entry in self._sections.items():
+                if name not in self._pending and self._map is not None:
+                    start = entry["offset"]
+                    blobs[name] = (entry["stamp"], self._map[start : start + entry["length"]])
+            blobs.update(self._pending)
+
+            # Offsets depend on the header length, which depends on the offsets; lay out
+            # relative offsets first and shift them once the header size is known
+            relative = {}
+            cursor = 0
+            for name, (digest, blob) in blobs.items():
+                relative[name] = {"stamp": digest, "offset": cursor, "length": len(blob)}
+                cursor += len(blob)
+
+            base = len(self.MAGIC) + 4
+            header_len = 0
+            while True:
+                sections = {
+                    name: dict(entry, offset=entry["offset"] + base + header_len)
+                    for name, entry in relative.items()
+                }
+                header = json.dumps(
+                    {"version": self.FORMAT_VERSION, "sections": sections}, separators=(",", ":")
+                ).encode("utf-8")
+                if len(header) == header_len:
+                    break
+                header_len = len(header)
+
+            try:
+                directory = os.path.dirname(self.path)
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(prefix=".catalog-", dir=directory)
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(self.MAGIC)
+                        f.write(struct.pack("<I", len(header)))
+                        f.write(header)
+                        for _, blob in blobs.values():
+                            f.write(blob)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    # Frontends running as the desktop user fall back to the system snapshot
+                    os.chmod(tmp_path, 0o644)
+                    os.replace(tmp_path, self.path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+            except OSError as e:
+                logger.warning(f"Could not write catalog snapshot {self.path}: {e}")
+                return False
+
+            self._pending = {}
+
+        return self.load()
@@ -0,0 +1,145 @@
+import re
+import threading
+
+# Software center categories, in display order
+CATEGORIES = [
+    {"id": "system", "name": "System", "icon": "emblem-system-symbolic"},
+    {"id": "development", "name": "Development", "icon": "applications-engineering-symbolic"},
+    {"id": "media", "name": "Media", "icon": "applications-multimedia-symbolic"},
+    {"id": "server", "name": "Server", "icon": "network-server-symbolic"},
+    {"id": "security", "name": "Security", "icon": "security-high-symbolic"},
+]
+
+# Debian sections and freedesktop.org categories, lowercased; the two namespaces don't clash
+CATEGORY_MAP = {
+    # Debian sections
+    "admin": "system",
+    "kernel": "system",
+    "otherosfs": "system",
+    "shells": "system",
+    "utils": "system",
+    "cli-mono": "development",
+    "debug": "development",
+    "devel": "development",
+    "editors": "development",
+    "gnu-r": "development",
+    "golang": "development",
+    "haskell": "development",
+    "interpreters": "development",
+    "java": "development",
+    "javascript": "development",
+    "libdevel": "development",
+    "lisp": "development",
+    "ocaml": "development",
+    "perl": "development",
+    "php": "development",
+    "python": "development",
+    "ruby": "development",
+    "rust": "development",
+    "vcs": "development",
+    "games": "media",
+    "graphics": "media",
+    "sound": "media",
+    "video": "media",
+    "database": "server",
+    "httpd": "server",
+    "mail": "server",
+    "news": "server",
+    "web": "server",
+    # freedesktop.org main and additional categories
+    "filemanager": "system",
+    "filesystem": "system",
+    "hardwaresettings": "system",
+    "monitor": "system",
+    "packagemanager": "system",
+    "settings": "system",
+    "system": "system",
+    "terminalemulator": "system",
+    "building": "development",
+    "debugger": "development",
+    "development": "development",
+    "guidesigner": "development",
+    "ide": "development",
+    "profiling": "development",
+    "revisioncontrol": "development",
+    "translation": "development",
+    "audio": "media",
+    "audiovideo": "media",
+    "game": "media",
+    "music": "media",
+    "photography": "media",
+    "player": "media",
+    "recorder": "media",
+    "security": "security",
+    # CtxOS menu categories not under a numbered security heading
+    "14-services": "server",
+}
+
+# CtxOS menu categories ("06-wireless-attacks", "01-01-dns-analysis") file security tools
+MENU_CATEGORY_RE = re.compile(r"^\d\d-")
+
+
+def classify(raw_categories):
+    """Returns the software center category ids for Section/AppStream/desktop categories."""
+    categories = set()
+    for raw in raw_categories:
+        # Sections of non-main components carry the component ("contrib/devel")
+        name = raw.rpartition("/")[2].lower()
+        category = CATEGORY_MAP.get(name)
+        if category is None and MENU_CATEGORY_RE.match(name):
+            category = "security"
+        if category:
+            categories.add(category)
+    return frozenset(categories)
+
+
+class CategoryIndex:
+    """Maps each software center category to the set of catalog keys filed under it.
+
+    Entries are classified when they change, so listing a category is a set
+    lookup rather than a pass over the catalog.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._members = {category["id"]: set() for category in CATEGORIES}
+        self._categories = {}  # key -> frozenset of category ids
+
+    def update(self, entries=None, removed=()):
+        """Files ``entries`` ({key: raw categories}) and drops ``removed`` keys.
+
+        Returns the number of keys whose categories changed.
+        """
+        changed = 0
+        with self._lock:
+            for key in removed:
+                changed += self._file(key, frozenset())
+            for key, raw_categories in (entries or {}).items():
+                changed += self._file(key, classify(raw_categories))
+        return changed
+
+    def members(self, category):
+        """Returns the keys in a category; empty for unknown categories."""
+        with self._lock:
+            return set(self._members.get(category, ()))
+
+    def categories(self, key):
+        return self._categories.get(key, frozenset())
+
+    def counts(self):
+        with self._lock:
+            return {category: len(keys) for category, keys in self._members.items()}
+
+    def _file(self, key, categories):
+        old = self._categories.get(key, frozenset())
+        if categories == old:
+            return 0
+        for category in old - categories:
+            self._members[category].discard(key)
+        for category in categories - old:
+            self._members[category].add(key)
+        if categories:
+            self._categories[key] = categories
+        else:
+            self._categories.pop(key, None)
+        return 1
@@ -0,0 +1,436 @@
+import itertools
+import sys
+from array import array
+
+# Relation operators as stored per edge; index 0 means "no version constraint"
+OPERATORS = (None, "<<", "<=", "=", ">=", ">>", "<", ">")
+_OPERATOR_CODES = {op: code for code, op in enumerate(OPERATORS)}
+
+
+def _encode(dependencies, node_id, strings):
+    """Flattens alternative groups into (target id, op code, version index, alternative) edges."""
+    edges = []
+    for group in dependencies:
+        for position, (dep, op, dep_version) in enumerate(group):
+            string = strings.setdefault(dep_version and sys.intern(dep_version), len(strings))
+            edges.append((node_id(dep), _OPERATOR_CODES[op], string, int(position > 0)))
+    return edges
+
+
+def _shifted(offsets, delta):
+    return offsets if delta == 0 else array("I", map(delta.__add__, offsets))
+
+
+class CompactGraph:
+    """Immutable dependency graph over integer package ids.
+
+    Package names are interned to ids 0..n-1. Forward and reverse adjacency
+    are stored CSR-style: the edges of node i are targets[offsets[i]:offsets[i + 1]].
+    Each forward edge also carries an operator code, an index into a table of
+    constraint versions, and a flag marking it as an alternative to the
+    previous edge (a | b). Nodes whose version is None are referenced but not
+    provided by any package ("missing"). Per-node download sizes (bytes) and
+    installed sizes (KiB, as in control files) sit in parallel arrays.
+
+    Graphs are never modified; patched() returns a new one, so readers can keep
+    using the graph they hold while an update is built. Patching keeps ids
+    stable, so packages that are dropped leave unused slots in ``names``
+    (absent from ``ids``) until the graph is compacted.
+    """
+
+    # Patched graphs are rebuilt once more than 1/COMPACT_RATIO of their slots are unused
+    COMPACT_RATIO = 8
+
+    def __init__(
+        self,
+        names,
+        versions,
+        fwd_offsets,
+        fwd_targets,
+        edge_ops,
+        edge_versions,
+        edge_alts,
+        strings,
+        download_sizes=None,
+        installed_sizes=None,
+        _ids=None,
+        _reverse=None,
+    ):
+        self.names = names
+        self.ids = {name: i for i, name in enumerate(names)} if _ids is None else _ids
+        self.versions = versions
+        self.download_sizes = download_sizes or array("Q", [0]) * len(names)
+        self.installed_sizes = installed_sizes or array("Q", [0]) * len(names)
+        self.fwd_offsets = fwd_offsets
+        self.fwd_targets = fwd_targets
+        self.edge_ops = edge_ops
+        self.edge_versions = edge_versions
+        self.edge_alts = edge_alts
+        self.strings = strings
+        self.rev_offsets, self.rev_sources = _reverse or self._reverse()
+
+    @classmethod
+    def empty(cls):
+        return GraphBuilder().build()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    @property
+    def edge_count(self):
+        return len(self.fwd_targets)
+
+    def successors(self, node):
+        """Returns the distinct dependency ids of a node."""
+        start, end = self.fwd_offsets[node], self.fwd_offsets[node + 1]
+        return list(dict.fromkeys(self.fwd_targets[start:end]))
+
+    def predecessors(self, node):
+        """Returns the distinct ids of nodes depending on a node."""
+        start, end = self.rev_offsets[node], self.rev_offsets[node + 1]
+        return list(dict.fromkeys(self.rev_sources[start:end]))
+
+    def edges(self, node):
+        """Yields (target id, operator, version) for each dependency of a node."""
+        for edge in range(self.fwd_offsets[node], self.fwd_offsets[node + 1]):
+            yield (
+                self.fwd_targets[edge],
+                OPERATORS[self.edge_ops[edge]],
+                self.strings[self.edge_versions[edge]],
+            )
+
+    def groups(self, node):
+        """Returns a node's dependencies as alternative groups of (target id, operator, version)."""
+        groups = []
+        for edge in range(self.fwd_offsets[node], self.fwd_offsets[node + 1]):
+            dependency = (
+                self.fwd_targets[edge],
+                OPERATORS[self.edge_ops[edge]],
+                self.strings[self.edge_versions[edge]],
+            )
+            if self.edge_alts[edge] and groups:
+                groups[-1].append(dependency)
+            else:
+                groups.append([dependency])
+        return groups
+
+    def closure(self, roots):
+        """Breadth-first transitive closure over dependencies.
+
+        Returns (ids in visit order, number of levels).
+        """
+        return self._traverse(roots, self.fwd_offsets, self.fwd_targets)
+
+    def reverse_closure(self, roots):
+        """Breadth-first closure over reverse dependencies (everything that depends on roots)."""
+        return self._traverse(roots, self.rev_offsets, self.rev_sources)
+
+    def cycles(self):
+        """Returns dependency cycles as lists of ids (strongly connected components).
+
+        Iterative Tarjan, so deep chains do not hit the recursion limit.
+        """
+        n = len(self.names)
+        offsets, targets = self.fwd_offsets, self.fwd_targets
+        index = array("i", [-1]) * n
+        lowlink = array("i", [0]) * n
+        on_stack = bytearray(n)
+        stack = []
+        components = []
+        counter = 0
+
+        for root in range(n):
+            if index[root] != -1:
+                continue
+            work = [(root, offsets[root])]
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            while work:
+                node, edge = work[-1]
+                if edge < offsets[node + 1]:
+                    work[-1] = (node, edge + 1)
+                    target = targets[edge]
+                    if index[target] == -1:
+                        index[target] = lowlink[target] = counter
+                        counter += 1
+                        stack.append(target)
+                        on_stack[target] = 1
+                        work.append((target, offsets[target]))
+                    elif on_stack[target]:
+                        lowlink[node] = min(lowlink[node], index[target])
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in targets[offsets[node] : offsets[node + 1]]:
+                        components.append(component)
+        return components
+
+    def patched(self, changes):
+        """Returns a new graph with some packages replaced.
+
+        ``changes`` maps a name to None (no longer provided) or to the
+        arguments of GraphBuilder.add_package after the name. Only the edges
+        of changed packages and of the nodes they point at are rewritten; the
+        rest of the adjacency arrays is copied over in slices. That is still
+        a copy of every array, but no per-edge work in Python.
+        """
+        old_count = len(self.names)
+        names, ids, versions = list(self.names), dict(self.ids), list(self.versions)
+        download_sizes = array("Q", self.download_sizes)
+        installed_sizes = array("Q", self.installed_sizes)
+        strings = dict(zip(self.strings, range(len(self.strings))))
+
+        def node_id(name):
+            node = ids.get(name)
+            if node is None:
+                node = ids[name] = len(names)
+                names.append(sys.intern(name))
+                versions.append(None)
+                download_sizes.append(0)
+                installed_sizes.append(0)
+            return node
+
+        rewritten = {}  # node -> its new edges
+        for name, change in changes.items():
+            if change is None:
+                node = ids.get(name)
+                if node is None:
+                    continue
+                version, edges, sizes = None, [], (0, 0)
+            else:
+                version, dependencies, *sizes = change
+                node = node_id(name)
+                version, edges = sys.intern(version or ""), _encode(dependencies, node_id, strings)
+            versions[node] = version
+            download_sizes[node], installed_sizes[node] = (tuple(sizes) + (0, 0))[:2]
+            rewritten[node] = edges
+
+        # Forward adjacency: old runs of unchanged nodes, then the rewritten ones
+        columns = (self.fwd_targets, self.edge_ops, self.edge_versions, self.edge_alts)
+        targets, ops, version_refs, alts = (array(column.typecode) for column in columns)
+        offsets = array("I", [0])
+        start = 0
+        for node in sorted(rewritten) + [len(names)]:
+            end = min(node, old_count)
+            if start < end:
+                lo, hi = self.fwd_offsets[start], self.fwd_offsets[end]
+                for new, old in zip((targets, ops, version_refs, alts), columns):
+                    new.extend(old[lo:hi])
+                offsets.extend(_shifted(self.fwd_offsets[start + 1 : end + 1], len(targets) - hi))
+            # Nodes added only as missing dependencies have no edges
+            offsets.extend(array("I", [len(targets)]) * max(0, node - max(start, old_count)))
+            if node < len(names):
+                for target, op, string, alternative in rewritten[node]:
+                    targets.append(target)
+                    ops.append(op)
+                    version_refs.append(string)
+                    alts.append(alternative)
+                offsets.append(len(targets))
+            start = node + 1
+
+        # Reverse adjacency: only the targets whose sources changed are rebuilt
+        sources_by_target = {}
+        for node in rewritten:
+            if node < old_count:
+                for edge in range(self.fwd_offsets[node], self.fwd_offsets[node + 1]):
+                    sources_by_target.setdefault(self.fwd_targets[edge], [])
+            for target, _, _, _ in rewritten[node]:
+                sources_by_target.setdefault(target, []).append(node)
+        rev_offsets, rev_sources = array("I", [0]), array("I")
+        start = 0
+        for target in sorted(sources_by_target) + [len(names)]:
+            end = min(target, old_count)
+            if start < end:
+                lo, hi = self.rev_offsets[start], self.rev_offsets[end]
+                rev_sources.extend(self.rev_sources[lo:hi])
+                rev_offsets.extend(
+                    _shifted(self.rev_offsets[start + 1 : end + 1], len(rev_sources) - hi)
+                )
+            rev_offsets.extend(
+                array("I", [len(rev_sources)]) * max(0, target - max(start, old_count))
+            )
+            if target < len(names):
+                kept = ()
+                if target < old_count:
+                    lo, hi = self.rev_offsets[target], self.rev_offsets[target + 1]
+                    kept = [source for source in self.rev_sources[lo:hi] if source not in rewritten]
+                sources = sorted([*kept, *sources_by_target[target]])
+                rev_sources.extend(sources)
+                rev_offsets.append(len(rev_sources))
+                if not sources and versions[target] is None and ids.get(names[target]) == target:
+                    del ids[names[target]]  # dropped and no longer depended on
+            start = target + 1
+        for node in rewritten:
+            unused = versions[node] is None and rev_offsets[node] == rev_offsets[node + 1]
+            if unused and ids.get(names[node]) == node:
+                del ids[names[node]]
+
+        string_table = list(self.strings)
+        string_table.extend(itertools.islice(strings, len(string_table), None))
+        graph = CompactGraph(
+            names,
+            versions,
+            offsets,
+            targets,
+            ops,
+            version_refs,
+            alts,
+            string_table,
+            download_sizes,
+            installed_sizes,
+            _ids=ids,
+            _reverse=(rev_offsets, rev_sources),
+        )
+        if (len(names) - len(ids)) * self.COMPACT_RATIO > len(names):
+            return graph.compacted()
+        return graph
+
+    def compacted(self):
+        """Returns the graph rebuilt without unused slots; ids are renumbered."""
+        builder = GraphBuilder()
+        for node, name in enumerate(self.names):
+            if self.versions[node] is None:
+                continue
+            builder.add_package(
+                name,
+                self.versions[node],
+                [[(self.names[t], op, ver) for t, op, ver in group] for group in self.groups(node)],
+                self.download_sizes[node],
+                self.installed_sizes[node],
+            )
+        return builder.build()
+
+    def memory_usage(self):
+        """Approximate bytes held by the graph's own structures (excluding shared strings)."""
+        arrays = (
+            self.fwd_offsets,
+            self.fwd_targets,
+            self.edge_ops,
+            self.edge_versions,
+            self.edge_alts,
+            self.download_sizes,
+            self.installed_sizes,
+            self.rev_offsets,
+            self.rev_sources,
+        )
+        total = sum(a.itemsize * len(a) for a in arrays)
+        total += sys.getsizeof(self.names) + sys.getsizeof(self.ids) + sys.getsizeof(self.versions)
+        return total + sys.getsizeof(self.strings)
+
+    def _traverse(self, roots, offsets, targets):
+        seen = bytearray(len(self.names))
+        order = []
+        frontier = []
+        for root in roots:
+            if not seen[root]:
+                seen[root] = 1
+                frontier.append(root)
+        levels = 0
+        while frontier:
+            levels += 1
+            order.extend(frontier)
+            next_level = []
+            for node in frontier:
+                for target in targets[offsets[node] : offsets[node + 1]]:
+                    if not seen[target]:
+                        seen[target] = 1
+                        next_level.append(target)
+            frontier = next_level
+        return order, levels
+
+    def _reverse(self):
+        n = len(self.names)
+        counts = array("I", [0]) * (n + 1)
+        for target in self.fwd_targets:
+            counts[target + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        offsets = array("I", counts)
+        sources = array("I", [0]) * len(self.fwd_targets)
+        cursor = array("I", counts)
+        for node in range(n):
+            for edge in range(self.fwd_offsets[node], self.fwd_offsets[node + 1]):
+                target = self.fwd_targets[edge]
+                sources[cursor[target]] = node
+                cursor[target] += 1
+        return offsets, sources
+
+
+class GraphBuilder:
+    """Accumulates packages and produces a CompactGraph.
+
+    Dependencies on names never added as packages become missing nodes.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+        # id -> (version, [(target id, op code, version index, alternative)], sizes)
+        self._packages = {}
+        self._strings = {None: 0}
+
+    def add_package(self, name, version, dependencies, download_size=0, installed_size=0):
+        """Adds a package whose dependencies are groups of (name, operator, version) alternatives.
+
+        Sizes are the Size (bytes) and Installed-Size (KiB) fields.
+        """
+        node = self._id(name)
+        edges = _encode(dependencies, self._id, self._strings)
+        self._packages[node] = (sys.intern(version or ""), edges, (download_size, installed_size))
+
+    def build(self):
+        n = len(self._names)
+        versions = [None] * n
+        offsets = array("I", [0]) * (n + 1)
+        targets, ops, version_refs, alts = array("I"), array("B"), array("I"), array("B")
+        download_sizes = array("Q", [0]) * n
+        installed_sizes = array("Q", [0]) * n
+        for node in range(n):
+            version, edges, sizes = self._packages.get(node, (None, (), (0, 0)))
+            versions[node] = version
+            download_sizes[node], installed_sizes[node] = sizes
+            for target, op, string, alternative in edges:
+                targets.append(target)
+                ops.append(op)
+                version_refs.append(string)
+                alts.append(alternative)
+            offsets[node + 1] = len(targets)
+
+        strings = [None] * len(self._strings)
+        for value, i in self._strings.items():
+            strings[i] = value
+        return CompactGraph(
+            list(self._names),
+            versions,
+            offsets,
+            targets,
+            ops,
+            version_refs,
+            alts,
+            strings,
+            download_sizes,
+            installed_sizes,
+        )
+
+    def _id(self, name):
+        node = self._ids.get(name)
+        if node is None:
+            node = self._ids[name] = len(self._names)
+            self._names.append(sys.intern(name))
+        return node
@@ -0,0 +1,106 @@
+"""Debian version ordering, as implemented by dpkg --compare-versions.
+
+Versions are turned into byte strings whose plain lexicographic order is the
+dpkg order, so bulk sorts and constraint checks are bytes comparisons. Keys
+are memoized per (interned) version string.
+"""
+
+import functools
+import sys
+
+# Byte weights for the non-digit parts of a key. dpkg orders "~" before the end
+# of a part, the end before letters, and letters before every other character.
+_TILDE = 0x01
+_END = 0x02
+_NON_LETTER_BASE = 0x80
+
+# Relation operators from Debian policy 7.1; "<" and ">" are the obsolete forms of "<=" and ">="
+_OPERATORS = {
+    "<<": lambda cmp: cmp < 0,
+    "<=": lambda cmp: cmp <= 0,
+    "<": lambda cmp: cmp <= 0,
+    "=": lambda cmp: cmp == 0,
+    ">=": lambda cmp: cmp >= 0,
+    ">": lambda cmp: cmp >= 0,
+    ">>": lambda cmp: cmp > 0,
+}
+
+
+def split_version(version):
+    """Splits a version into (epoch, upstream, revision)."""
+    epoch = 0
+    if ":" in version:
+        epoch_str, version = version.split(":", 1)
+        epoch = int(epoch_str or 0)
+    upstream, sep, revision = version.rpartition("-")
+    if not sep:
+        upstream, revision = revision, ""
+    return epoch, upstream, revision
+
+
+def _encode_number(digits, out):
+    digits = digits.lstrip("0")
+    out.append(min(len(digits), 255))
+    out.extend(digits.encode("ascii"))
+
+
+def _encode_part(part, out):
+    """Encodes an upstream version or revision as alternating non-digit/digit chunks.
+
+    Every part yields at least one (possibly empty) chunk pair, so "" and "0"
+    encode identically, and a final _END marks where the part stops.
+    """
+    i, n = 0, len(part)
+    while True:
+        while i < n and not ("0" <= part[i] <= "9"):
+            char = part[i]
+            if char == "~":
+                out.append(_TILDE)
+            elif char.isascii() and char.isalpha():
+                out.append(ord(char))
+            else:
+                out.append(min(ord(char) + _NON_LETTER_BASE, 0xFF))
+            i += 1
+        out.append(_END)
+
+        start = i
+        while i < n and "0" <= part[i] <= "9":
+            i += 1
+        _encode_number(part[start:i], out)
+        if i >= n:
+            break
+    out.append(_END)
+
+
+@functools.lru_cache(maxsize=131072)
+def _sort_key(version):
+    epoch, upstream, revision = split_version(version)
+    out = bytearray()
+    _encode_number(str(epoch), out)
+    _encode_part(upstream, out)
+    _encode_part(revision, out)
+    return bytes(out)
+
+
+def version_sort_key(version):
+    """Returns a bytes key whose ordering matches dpkg's version ordering."""
+    return _sort_key(sys.intern(version))
+
+
+def compare_versions(a, b):
+    """Returns -1, 0 or 1 as version a sorts before, equal to or after version b."""
+    ka, kb = version_sort_key(a), version_sort_key(b)
+    return (ka > kb) - (ka < kb)
+
+
+def sort_versions(versions, reverse=False):
+    """Sorts version strings in dpkg order."""
+    return sorted(versions, key=version_sort_key, reverse=reverse)
+
+
+def satisfies(version, operator, reference):
+    """Checks a relation such as "(>= 1.0)" for a concrete version."""
+    check = _OPERATORS.get(operator)
+    if check is None:
+        raise ValueError(f"Unknown version relation: {operator}")
+    return check(compare_versions(version, reference))
@@ -0,0 +1,147 @@
+import glob
+import logging
+import os
+import threading
+
+from common.appstream import (
+    HAS_YAML,
+    iter_components,
+    iter_yaml_components,
+    open_collection,
+)
+from common.stamps import file_stamp, tree_stamp
+
+logger = logging.getLogger("ctxos.dep11")
+
+
+class Dep11Index:
+    """Index of the Debian AppStream (DEP-11) catalogs installed on the system.
+
+    YAML and XML collections are read with streaming parsers into compact
+    entries keyed by component id, with a second map from package name to
+    component id. The catalog directories are stat'ed on every lookup and the
+    files only when a directory changed, so lookups are dictionary hits; the
+    index is exported into the catalog snapshot so it survives restarts.
+    """
+
+    # (directory, glob patterns) that hold DEP-11 catalogs
+    CATALOGS = (
+        ("/var/lib/app-info/yaml", ("*.yml", "*.yml.gz", "*.yml.xz")),
+        ("/var/lib/app-info/xmls", ("*.xml", "*.xml.gz", "*.xml.xz")),
+        ("/usr/share/swcatalog/yaml", ("*.yml", "*.yml.gz", "*.yml.xz")),
+        ("/usr/share/swcatalog/xml", ("*.xml", "*.xml.gz", "*.xml.xz")),
+        ("/usr/share/app-info/xmls", ("*.xml", "*.xml.gz", "*.xml.xz")),
+        ("/var/lib/apt/lists", ("*_dep11_Components-*.yml.gz", "*_dep11_Components-*.yml.xz")),
+    )
+
+    def __init__(self, catalogs=None):
+        self.catalogs = catalogs or self.CATALOGS
+        self._lock = threading.Lock()
+        # (stamp, {component id: entry}, {package: component id}) swapped atomically
+        self._state = (None, {}, {})
+        self._dir_stamp = None
+        self._warned_yaml = False
+
+    def catalog_files(self):
+        files = []
+        for directory, patterns in self.catalogs:
+            for pattern in patterns:
+                files.extend(glob.glob(os.path.join(directory, pattern)))
+        if not HAS_YAML:
+            skipped = [path for path in files if ".yml" in path]
+            if skipped and not self._warned_yaml:
+                logger.warning(
+                    f"PyYAML is not installed; skipping {len(skipped)} YAML DEP-11 catalogs"
+                )
+                self._warned_yaml = True
+            files = [path for path in files if ".yml" not in path]
+        return sorted(files)
+
+    def current_stamp(self):
+        """Change marker of the catalog files on disk, without rebuilding the index."""
+        return tree_stamp(self.catalog_files())
+
+    def available(self):
+        return bool(self._current()[1])
+
+    def get(self, key):
+        """Returns the entry for a package name or component id, or None."""
+        _, components, packages = self._current()
+        entry = components.get(packages.get(key, key))
+        return dict(entry) if entry else None
+
+    def packages(self):
+        """Returns {package name: entry} for every package with AppStream data; do not modify."""
+        _, components, packages = self._current()
+        return {package: components[component] for package, component in packages.items()}
+
+    def export(self):
+        """Returns (stamp, payload) for a catalog snapshot."""
+        stamp, components, packages = self._current()
+        return stamp, {"components": components, "packages": packages}
+
+    def restore(self, stamp, payload):
+        """Installs an index exported from catalog files matching ``stamp``."""
+        with self._lock:
+            self._state = (stamp, payload["components"], payload["packages"])
+            self._dir_stamp = self._dir_stamps()
+        return True
+
+    def _dir_stamps(self):
+        return tuple(file_stamp(directory) for directory, _ in self.catalogs)
+
+    def _current(self):
+        # Catalogs are replaced by renaming them into place, which bumps the directory mtime
+        dir_stamp = self._dir_stamps()
+        state = self._state
+        if dir_stamp == self._dir_stamp and state[0] is not None:
+            return state
+        with self._lock:
+            stamp = self.current_stamp()
+            if self._state[0] != stamp:
+                self._state = (stamp,) + self._build([path for path, _ in stamp])
+            self._dir_stamp = dir_stamp
+            return self._state
+
+    def _build(self, paths):
+        components, packages = {}, {}
+        for path in paths:
+            parse = iter_yaml_components if ".yml" in path else iter_components
+            try:
+                with open_collection(path) as f:
+                    for component in parse(f):
+                        # The first catalog listing a component wins
+                        if component["id"] in components:
+                            continue
+                        components[component["id"]] = self._entry(component, path)
+                        if component["package"]:
+                            packages.setdefault(component["package"], component["id"])
+            except Exception as e:
+                # A broken catalog must not take the others down with it
+                logger.warning(f"Could not read AppStream catalog {path}: {e}")
+
+        logger.info(f"DEP-11 index built: {len(components)} components from {len(paths)} catalogs")
+        return components, packages
+
+    @staticmethod
+    def _entry(component, path):
+        icons = component["icons"]
+        icon = icons.get("remote", "")
+        if not icon and icons.get("cached") and component["origin"]:
+            # <root>/icons/<origin>/<size>/<name>, next to the yaml/ or xml(s)/ directory
+            root = os.path.dirname(os.path.dirname(path))
+            icon = os.path.join(root, "icons", component["origin"], icons["cached"])
+        return {
+            "id": component["id"],
+            "package": component["package"],
+            "name": component["name"],
+            "summary": component["summary"],
+            "description": component["description"],
+            "categories": component["categories"],
+            "keywords": component["keywords"],
+            "screenshots": component["screenshots"],
+            "icon": icon or icons.get("stock", ""),
+            "version": component["version"],
+            "license": component["license"],
+            "developer": component["developer"],
+        }
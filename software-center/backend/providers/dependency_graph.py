@@ -0,0 +1,373 @@
+import logging
+import threading
+
+from common.deb822 import parse_relations
+from providers.compact_graph import CompactGraph
+from providers.debversion import satisfies
+from providers.relations import Relations
+
+logger = logging.getLogger("ctxos.dependency_graph")
+
+# Relationship fields that must be satisfied before a package can be configured
+DEPENDENCY_FIELDS = ("Pre-Depends", "Depends")
+
+# Download size in bytes and unpacked size in KiB
+SIZE_FIELDS = ("Size", "Installed-Size")
+
+
+def dependency_groups(info):
+    """Returns a record's dependencies as groups of (name, operator, version) alternatives."""
+    return [
+        [(alt["name"], alt["op"], alt["version"]) for alt in group]
+        for field in DEPENDENCY_FIELDS
+        for group in parse_relations(info.get(field, ""))
+    ]
+
+
+def record_sizes(info):
+    """Returns (download size in bytes, installed size in KiB) of a record, 0 when unknown."""
+    sizes = []
+    for field in SIZE_FIELDS:
+        try:
+            sizes.append(int(info.get(field) or 0))
+        except ValueError:
+            sizes.append(0)
+    return tuple(sizes)
+
+
+class ClosurePlan:
+    """Walks the dependency closure of one or more packages, choosing one alternative per group.
+
+    A group is satisfied, in order of preference, by an installed package, an
+    installed provider, a package already in the plan, an archive package
+    whose version fits, or an archive provider. Only when none of these exist
+    does the first alternative count as missing or unsatisfied.
+
+    _choose returns the node to walk into, or None when the group is
+    satisfied by an installed package. Like apt, a satisfied installed
+    package is neither upgraded nor descended into; an installed package is
+    only selected when a versioned dependency rules out its installed
+    version. Roots walked together share the selected set, so a dependency
+    common to several of them is expanded only once.
+    """
+
+    def __init__(self, graph, archive, installed):
+        self.graph = graph
+        self.archive = archive
+        self.installed = installed
+        self.selected = set()
+        self.missing = set()
+        self.unsatisfied = []
+
+    def walk(self, roots):
+        graph = self.graph
+        frontier = [root for root in dict.fromkeys(roots) if root not in self.selected]
+        self.selected.update(frontier)
+        levels = 0
+        while frontier:
+            levels += 1
+            next_level = []
+            for node in frontier:
+                if graph.versions[node] is None:
+                    self.missing.add(graph.names[node])
+                    continue
+                for group in graph.groups(node):
+                    chosen = self._choose(node, group)
+                    if chosen is not None and chosen not in self.selected:
+                        self.selected.add(chosen)
+                        next_level.append(chosen)
+            frontier = next_level
+        return levels
+
+    def choices(self, node):
+        """Returns the node chosen for each of a node's dependency groups that needs one."""
+        chosen = (self._choose(node, group) for group in self.graph.groups(node))
+        return [target for target in chosen if target is not None]
+
+    def _choose(self, node, group):
+        graph, installed, archive = self.graph, self.installed, self.archive
+        names, versions = graph.names, graph.versions
+
+        for target, op, version in group:
+            if self._fits(installed.version(names[target]), op, version):
+                return None
+        for target, op, version in group:
+            for provider, provided in installed.providers.get(names[target], ()):
+                if self._provided_fits(op, version, provided):
+                    return None
+        for target, op, version in group:
+            if target in self.selected and self._fits(versions[target], op, version):
+                return target
+        for target, op, version in group:
+            if self._fits(versions[target], op, version):
+                return target
+        for target, op, version in group:
+            for provider, provided in archive.providers.get(names[target], ()):
+                if self._provided_fits(op, version, provided) and provider in graph.ids:
+                    return graph.ids[provider]
+
+        target, op, version = group[0]
+        if versions[target] is not None:
+            self.unsatisfied.append(
+                {
+                    "package": names[node],
+                    "dependency": names[target],
+                    "required": f"{op} {version}",
+                    "available": versions[target],
+                }
+            )
+        return target
+
+    @staticmethod
+    def _fits(available, op, version):
+        return available is not None and (not op or satisfies(available, op, version))
+
+    @staticmethod
+    def _provided_fits(op, version, provided):
+        # Unversioned Provides never satisfy a versioned dependency
+        return not op or (provided is not None and satisfies(provided, op, version))
+
+
+def find_conflicts(planned, archive, installed):
+    """Checks planned {name: version} against itself and the installed set.
+
+    Every check is a lookup in the Relations indexes. A conflict with an
+    installed package is skipped when the plan upgrades that package or the
+    archive has a version outside the conflicting range (apt would upgrade it);
+    with Conflicts + Replaces apt removes the installed package instead.
+
+    Returns (conflicts, names apt would remove).
+    """
+    conflicts = {}
+    replaced = set()
+
+    def record(package, target, field, against_installed):
+        conflicts[(package, target, field)] = {
+            "package": package,
+            "conflicts_with": target,
+            "relation": field,
+            "installed": against_installed,
+        }
+
+    def replaces(package, target):
+        # Replacing a virtual name covers every installed package providing it
+        names = {name for name, _, _ in archive.replaces(package)}
+        return target in names or any(virtual in names for virtual, _ in installed.provides(target))
+
+    def hits_installed(package, target, op, version, field):
+        if target == package or target in planned:
+            return False
+        installed_version = installed.version(target)
+        if installed_version is None or (op and not satisfies(installed_version, op, version)):
+            return False
+        candidate = archive.version(target)
+        if op and candidate and not satisfies(candidate, op, version):
+            return False
+        if field == "Conflicts" and replaces(package, target):
+            replaced.add(target)
+            return False
+        return True
+
+    for package, package_version in planned.items():
+        for target, op, version, field in archive.conflicts(package):
+            # The conflicting name may be a real package, a virtual one, or both
+            if hits_installed(package, target, op, version, field):
+                record(package, target, field, True)
+            planned_version = planned.get(target)
+            if (
+                target != package
+                and planned_version
+                and (not op or satisfies(planned_version, op, version))
+            ):
+                record(package, target, field, False)
+            if op:
+                continue
+            for provider, _ in installed.providers.get(target, ()):
+                if hits_installed(package, provider, None, None, field):
+                    record(package, provider, field, True)
+            for provider, _ in archive.providers.get(target, ()):
+                if provider != package and provider in planned:
+                    record(package, provider, field, False)
+
+        # Installed packages declaring a conflict against this one or what it provides
+        offered = [(package, package_version)] + list(archive.provides(package))
+        for name, offered_version in offered:
+            for declarer, op, version, field in installed.conflicted_by.get(name, ()):
+                if declarer == package or declarer in planned or declarer in replaced:
+                    continue
+                if op and (offered_version is None or not satisfies(offered_version, op, version)):
+                    continue
+                if field == "Conflicts" and replaces(package, declarer):
+                    replaced.add(declarer)
+                    continue
+                record(declarer, package, field, True)
+
+    return sorted(conflicts.values(), key=lambda c: (c["package"], c["conflicts_with"])), replaced
+
+
+def summarize(graph, package_name, archive=None, installed=None):
+    """Builds the resolver result for a package from a CompactGraph holding its closure.
+
+    ``archive`` and ``installed`` are Relations over the graph's packages and
+    over the installed system; without them no conflicts can be found and
+    only archive packages satisfy dependencies.
+    """
+    archive = archive if archive is not None else Relations()
+    installed = installed if installed is not None else Relations()
+    root = graph.ids.get(package_name)
+    if root is None:
+        return {
+            "package": package_name,
+            "dependencies": [],
+            "total_packages": 1,
+            "conflicts": [],
+            "replaces": [],
+            "missing": [package_name],
+            "unsatisfied": [],
+            "stats": {"nodes_visited": 1, "levels": 1},
+        }
+
+    plan = ClosurePlan(graph, archive, installed)
+    levels = plan.walk([root])
+
+    names, versions = graph.names, graph.versions
+    planned = {
+        names[node]: versions[node]
+        for node in plan.selected
+        if versions[node] is not None and installed.version(names[node]) != versions[node]
+    }
+    conflicts, replaced = find_conflicts(planned, archive, installed)
+
+    return {
+        "package": package_name,
+        "dependencies": [names[t] for t in graph.successors(root)],
+        "total_packages": len(plan.selected),
+        "conflicts": conflicts,
+        "replaces": sorted(replaced),
+        "missing": sorted(plan.missing),
+        "unsatisfied": sorted(plan.unsatisfied, key=lambda u: (u["package"], u["dependency"])),
+        "stats": {"nodes_visited": len(plan.selected), "levels": levels},
+    }
+
+
+class DependencyGraph:
+    """Archive-wide dependency graph shared by every resolver in the daemon.
+
+    Built once from the package catalog and patched when the apt lists change:
+    only packages listed in list files that were added, removed or rewritten
+    are re-read. Each update swaps in a new CompactGraph and Relations index
+    together, so readers never take a lock and never see a half-patched graph.
+    Building those copies still touches every node once (array slices and
+    dict copies), but only the re-read packages are re-encoded: tens of
+    milliseconds on a full archive rather than a rebuild.
+    """
+
+    FIELDS = (
+        frozenset(["Package", "Architecture"] + list(DEPENDENCY_FIELDS) + list(SIZE_FIELDS))
+        | Relations.FIELDS
+    )
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._lock = threading.Lock()  # serializes updates only
+        self._state = (CompactGraph.empty(), Relations())
+        self._stamp = None
+        self._names_by_list = {}
+
+    def available(self):
+        return self.catalog.available()
+
+    @property
+    def graph(self):
+        """The current CompactGraph, brought up to date with the catalog."""
+        self.update()
+        return self._state[0]
+
+    @property
+    def relations(self):
+        """Provides/Conflicts/Breaks/Replaces indexes matching the current graph."""
+        self.update()
+        return self._state[1]
+
+    def snapshot(self):
+        """Returns a (CompactGraph, Relations) pair that stays consistent while in use."""
+        self.update()
+        return self._state
+
+    def built(self):
+        """Whether the graph has been read from the catalog at least once."""
+        return self._stamp is not None
+
+    def current(self):
+        """Returns the last built (CompactGraph, Relations) pair without updating it."""
+        return self._state
+
+    def update(self, event=None):
+        """Brings the graph in line with the catalog; usable as a watcher callback."""
+        stamp = self.catalog.stamp
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            names_by_list = self.catalog.names_by_list()
+            if self._stamp is None:
+                affected = set().union(*names_by_list.values()) if names_by_list else set()
+            else:
+                affected = self._changed_names(self._stamp, stamp, names_by_list)
+
+            records = {name: self._read(name) for name in affected}
+            graph, relations = self._state
+            graph = graph.patched(
+                {
+                    name: (
+                        (record.get("Version"), dependency_groups(record), *record_sizes(record))
+                        if record
+                        else None
+                    )
+                    for name, record in records.items()
+                }
+            )
+            self._state = (graph, relations.patched(records))
+            self._stamp = stamp
+            self._names_by_list = names_by_list
+            logger.info(
+                f"Dependency graph updated: {len(affected)} packages re-read, "
+                f"{len(graph)} nodes, {graph.edge_count} edges, "
+                f"~{graph.memory_usage() // 1024} KiB"
+            )
+
+    def resolve(self, package_name, installed=None):
+        """Summarizes the dependency closure of a package without modifying the graph.
+
+        ``installed`` is a Relations index over the installed packages.
+        """
+        self.update()
+        graph, relations = self._state
+        return summarize(graph, package_name, relations, installed)
+
+    def reverse_dependencies(self, package_name):
+        """Returns every package that directly or transitively depends on a package."""
+        graph = self.graph
+        root = graph.ids.get(package_name)
+        if root is None:
+            return []
+        closure, _ = graph.reverse_closure([root])
+        return sorted(graph.names[node] for node in closure[1:])
+
+    def cycles(self):
+        """Returns dependency cycles as sorted lists of package names."""
+        graph = self.graph
+        return sorted(sorted(graph.names[node] for node in cycle) for cycle in graph.cycles())
+
+    def _changed_names(self, old_stamp, new_stamp, names_by_list):
+        old, new = dict(old_stamp), dict(new_stamp)
+        changed = {path for path in old.keys() | new.keys() if old.get(path) != new.get(path)}
+        affected = set()
+        for path in changed:
+            affected |= self._names_by_list.get(path, set())
+            affected |= names_by_list.get(path, set())
+        return affected
+
+    def _read(self, name):
+        return self.catalog.get(name, fields=self.FIELDS)
@@ -1,73 +1,111 @@
 import logging
-
-import networkx as nx
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from providers.compact_graph import GraphBuilder
+from providers.dependency_graph import (
+    DependencyGraph,
+    dependency_groups,
+    record_sizes,
+    summarize,
+)
+from providers.relations import Relations
 
 logger = logging.getLogger("ctxos.dependency_resolver")
 
 
 class DependencyResolver:
-    """Resolves and analyzes package dependencies to prevent broken installations."""
+    """Resolves and analyzes package dependencies to prevent broken installations.
+
+    With a shared DependencyGraph over the package catalog, resolve() is a
+    read-only traversal. Without one (or before the apt lists exist) the
+    closure is fetched from the provider breadth-first, one batched lookup per
+    level, into a per-call graph. Either way alternatives, virtual packages
+    and conflicts are checked against the installed set.
+    """
+
+    # Frontier levels larger than this are split and fetched on a thread pool
+    BATCH_SIZE = 200
+    MAX_WORKERS = 4
 
-    def __init__(self, apt_provider=None):
+    def __init__(self, apt_provider=None, graph=None):
         from providers.apt import AptProvider
 
-        self.apt = apt_provider or AptProvider()
-        self.graph = nx.DiGraph()
+        if apt_provider is None:
+            apt_provider = AptProvider()
+            graph = graph or DependencyGraph(apt_provider.catalog)
+        self.apt = apt_provider
+        self.graph = graph
 
     def resolve(self, package_name):
-        """Builds a dependency graph for a package."""
-        self.graph.clear()
-        self._add_to_graph(package_name)
-
-        return {
-            "package": package_name,
-            "dependencies": list(self.graph.successors(package_name)),
-            "total_packages": len(self.graph.nodes),
-            "conflicts": self._find_conflicts(),
-            "missing": self._find_missing(),
-        }
-
-    def _add_to_graph(self, package_name):
-        """Recursively adds dependencies to the graph."""
-        if package_name in self.graph and "version" in self.graph.nodes[package_name]:
-            return
-
-        info = self.apt.get_package_info(package_name)
-        if not info:
-            logger.warning(f"Metadata not found for package: {package_name}")
-            self.graph.add_node(package_name, missing=True)
-            return
-
-        self.graph.add_node(package_name, version=info.get("Version"))
-
-        deps = self._parse_dependencies(info.get("Depends", ""))
-        for dep in deps:
-            self.graph.add_edge(package_name, dep)
-            self._add_to_graph(dep)
-
-    def _parse_dependencies(self, deps_string):
-        """Parses APT dependency string into a list of package names."""
-        if not deps_string:
-            return []
-
-        results = []
-        # Depends: liba (>= 1.0), libb | libc, libd
-        parts = deps_string.split(",")
-        for part in parts:
-            # Handle alternatives: libb | libc -> pick first for now
-            pkg = part.split("|")[0].strip()
-            # Remove version constraints: liba (>= 1.0) -> liba
-            pkg_name = pkg.split("(")[0].strip()
-            if pkg_name:
-                results.append(pkg_name)
-        return results
-
-    def _find_conflicts(self):
-        """Checks for known conflicts in the current graph."""
-        # This would require checking 'Conflicts' or 'Breaks' fields
-        # Simplified for now
-        return []
-
-    def _find_missing(self):
-        """Returns packages that were not found in the provider."""
-        return [n for n, d in self.graph.nodes(data=True) if d.get("missing")]
+        """Builds a dependency graph for a package.
+
+        The result carries "stats": nodes visited, levels, metadata lookups and wall time.
+        """
+        started = time.monotonic()
+        lookups = 0
+        installed = self.apt.installed_relations()
+        if self.graph is not None and self.graph.available():
+            result = self.graph.resolve(package_name, installed)
+        else:
+            graph, records, lookups = self._build_graph([package_name])
+            result = summarize(graph, package_name, Relations(records), installed)
+
+        result["stats"]["lookups"] = lookups
+        result["stats"]["wall_time_ms"] = round((time.monotonic() - started) * 1000, 3)
+        return result
+
+    def graph_for(self, package_names):
+        """Returns (CompactGraph, archive Relations, lookups) covering the closure of packages.
+
+        This is the shared graph when there is one; otherwise a per-call graph
+        is fetched for all the packages together.
+        """
+        if self.graph is not None and self.graph.available():
+            graph, relations = self.graph.snapshot()
+            return graph, relations, 0
+        graph, records, lookups = self._build_graph(package_names)
+        return graph, Relations(records), lookups
+
+    def _build_graph(self, package_names):
+        """Walks the dependency closure level by level, fetching every alternative.
+
+        Returns (graph, {name: record}, lookups).
+        """
+        builder = GraphBuilder()
+        records = {}
+        frontier = list(dict.fromkeys(package_names))
+        seen = set(frontier)
+        lookups = 0
+        while frontier:
+            infos, calls = self._fetch(frontier)
+            lookups += calls
+            next_level = []
+            for name in frontier:
+                info = infos.get(name)
+                if not info:
+                    # Virtual packages have no record of their own
+                    logger.debug(f"Metadata not found for package: {name}")
+                    continue
+
+                records[name] = info
+                groups = dependency_groups(info)
+                builder.add_package(name, info.get("Version"), groups, *record_sizes(info))
+                for dep, _, _ in (alt for group in groups for alt in group):
+                    if dep not in seen:
+                        seen.add(dep)
+                        next_level.append(dep)
+            frontier = next_level
+        return builder.build(), records, lookups
+
+    def _fetch(self, names):
+        """Fetches metadata for a frontier level. Returns ({name: info}, lookups made)."""
+        chunks = [names[i : i + self.BATCH_SIZE] for i in range(0, len(names), self.BATCH_SIZE)]
+        if len(chunks) == 1:
+            return self.apt.get_package_info_many(chunks[0]), 1
+
+        infos = {}
+        with ThreadPoolExecutor(max_workers=min(self.MAX_WORKERS, len(chunks))) as pool:
+            for fetched in pool.map(self.apt.get_package_info_many, chunks):
+                infos.update(fetched)
+        return infos, len(chunks)
@@ -0,0 +1,147 @@
+import logging
+import threading
+
+from common.deb822 import iter_stanzas
+from common.stamps import file_stamp
+
+logger = logging.getLogger("ctxos.dpkg_status")
+
+
+class DpkgStatusIndex:
+    """In-memory index of the dpkg status database.
+
+    Parses /var/lib/dpkg/status directly instead of forking dpkg-query per
+    package, and reloads itself whenever the file's mtime, inode or size change.
+    """
+
+    STATUS_PATH = "/var/lib/dpkg/status"
+
+    # Only the fields the software center actually consumes are kept in memory
+    FIELDS = frozenset(
+        [
+            "Package",
+            "Status",
+            "Version",
+            "Architecture",
+            "Installed-Size",
+            "Section",
+            "Source",
+            "Essential",
+            "Depends",
+            "Pre-Depends",
+            "Recommends",
+            "Provides",
+            "Conflicts",
+            "Breaks",
+            "Replaces",
+        ]
+    )
+
+    def __init__(self, status_path=None):
+        self.status_path = status_path or self.STATUS_PATH
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._packages = {}
+
+    def available(self):
+        """Returns True if the status file exists and can be indexed."""
+        return file_stamp(self.status_path) is not None
+
+    @property
+    def stamp(self):
+        """Change marker of the status file the index was last loaded from."""
+        self._refresh()
+        return self._stamp
+
+    def current_stamp(self):
+        """Change marker of the status file on disk, without reloading the index."""
+        return file_stamp(self.status_path)
+
+    def export(self):
+        """Returns (stamp, payload) describing the index for a catalog snapshot."""
+        self._refresh()
+        return self._stamp, self._packages
+
+    def restore(self, stamp, packages):
+        """Installs an index exported from a status file matching ``stamp``."""
+        with self._lock:
+            self._packages = packages
+            self._stamp = stamp
+        return True
+
+    def get(self, package_name):
+        """Returns the indexed record for a package, or None if dpkg does not know it."""
+        self._refresh()
+        return self._packages.get(package_name)
+
+    def is_installed(self, package_name):
+        record = self.get(package_name)
+        return bool(record and record["installed"])
+
+    def get_version(self, package_name):
+        """Returns the installed version of a package, or None."""
+        record = self.get(package_name)
+        if record and record["installed"]:
+            return record["Version"]
+        return None
+
+    def get_installed_size(self, package_name):
+        """Returns Installed-Size in KiB for an installed package, or None."""
+        record = self.get(package_name)
+        if record and record["installed"]:
+            return record["installed_size"]
+        return None
+
+    def installed_states(self, names):
+        """Returns {name: bool} for every requested package in one pass."""
+        self._refresh()
+        packages = self._packages
+        states = {}
+        for name in names:
+            record = packages.get(name)
+            states[name] = bool(record and record["installed"])
+        return states
+
+    def installed_packages(self):
+        """Returns {name: record} for every installed package."""
+        self._refresh()
+        return {name: rec for name, rec in self._packages.items() if rec["installed"]}
+
+    def _refresh(self):
+        stamp = file_stamp(self.status_path)
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            if stamp == self._stamp:
+                return
+            self._packages = self._load()
+            self._stamp = stamp
+
+    def _load(self):
+        try:
+            with open(self.status_path, "r", encoding="utf-8", errors="replace") as f:
+                content = f.read()
+        except OSError as e:
+            logger.warning(f"Could not read dpkg status file {self.status_path}: {e}")
+            return {}
+
+        packages = {}
+        for stanza in iter_stanzas(content, self.FIELDS):
+            name = stanza.get("Package")
+            if not name:
+                continue
+            status = stanza.get("Status", "").split()
+            stanza["installed"] = len(status) == 3 and status[2] == "installed"
+            try:
+                stanza["installed_size"] = int(stanza.get("Installed-Size", "0"))
+            except ValueError:
+                stanza["installed_size"] = 0
+
+            # Multi-arch packages can appear several times; the installed one wins
+            existing = packages.get(name)
+            if existing is None or (stanza["installed"] and not existing["installed"]):
+                packages[name] = stanza
+
+        logger.debug(f"Indexed {len(packages)} dpkg status entries")
+        return packages
@@ -1,24 +1,247 @@
+import configparser
+import glob
+import logging
+import os
+import shutil
 import subprocess
 
+from common.appstream import iter_components
+from common.stamps import tree_stamp
+from providers.flatpak_appstream import FlatpakAppStreamIndex
+
+logger = logging.getLogger("ctxos.flatpak")
+
 
 class FlatpakProvider:
     """Provides access to Flatpak for package management."""
 
+    SYSTEM_INSTALLATION = "/var/lib/flatpak"
+
     def __init__(self):
+        self.user_installation = os.path.join(
+            os.environ.get("HOME", "."), ".local", "share", "flatpak"
+        )
         self.has_flatpak = self._check_flatpak()
+        self._apps_cache = None  # (installation stamp, apps)
+        self._installed_cache = None  # (installation stamp, frozenset of app ids)
+        self.appstream = FlatpakAppStreamIndex([self.SYSTEM_INSTALLATION, self.user_installation])
 
     def _check_flatpak(self):
-        try:
-            subprocess.run(["flatpak", "--version"], capture_output=True, check=True)
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
+        # Looking up the binary is enough; running it costs a fork and several hundred ms
+        return shutil.which("flatpak") is not None or any(
+            os.path.isdir(base) for base in self.installations()
+        )
+
+    def installations(self):
+        """Returns {installation name: directory} for the system and user installations."""
+        return {"system": self.SYSTEM_INSTALLATION, "user": self.user_installation}
+
+    def installation_stamp(self):
+        """Change marker for the system and user installations.
+
+        Flatpak touches ".changed" in an installation after every install, update
+        or removal; the app directories cover installs made by older versions.
+        """
+        paths = []
+        for base in self.installations().values():
+            paths += [os.path.join(base, ".changed"), os.path.join(base, "app")]
+        return tree_stamp(paths)
+
+    def export_apps(self):
+        """Returns (stamp, apps) for a catalog snapshot."""
+        stamp = self.installation_stamp()
+        return stamp, self.list_apps()
+
+    def restore_apps(self, stamp, apps):
+        """Seeds the installed-apps listing from a catalog snapshot."""
+        self._apps_cache = (stamp, apps)
+        return True
+
+    def invalidate(self, event=None):
+        """Drops the cached installed-apps listing; subscribed to flatpak change events."""
+        self._apps_cache = None
+        self._installed_cache = None
+
+    def installed_ids(self):
+        """Returns the ids of every installed app, refreshed when an installation changes.
+
+        Read from the installation directories; a single ``flatpak list`` call
+        is the fallback when neither installation exists on disk.
+        """
+        if not self.has_flatpak:
+            return frozenset()
+
+        stamp = self.installation_stamp()
+        if self._installed_cache and self._installed_cache[0] == stamp:
+            return self._installed_cache[1]
+
+        ids = self._scan_installed_ids()
+        if ids is None:
+            ids = frozenset(app["id"] for app in self._list_apps_cli())
+        self._installed_cache = (stamp, ids)
+        return ids
+
+    def _scan_installed_ids(self):
+        bases = [base for base in self.installations().values() if os.path.isdir(base)]
+        if not bases:
+            return None
+        ids = set()
+        for base in bases:
+            app_dir = os.path.join(base, "app")
+            try:
+                names = os.listdir(app_dir)
+            except OSError:
+                continue
+            # An app is deployed once its "current" link exists
+            ids.update(n for n in names if os.path.exists(os.path.join(app_dir, n, "current")))
+        return frozenset(ids)
 
     def list_apps(self):
         """Lists installed flatpak applications."""
         if not self.has_flatpak:
             return []
 
+        stamp = self.installation_stamp()
+        if self._apps_cache and self._apps_cache[0] == stamp:
+            return [dict(app) for app in self._apps_cache[1]]
+
+        apps = self._read_installed_apps()
+        if apps is None:
+            apps = self._list_apps_cli()
+        self._apps_cache = (stamp, apps)
+        return [dict(app) for app in apps]
+
+    def _read_installed_apps(self):
+        """Lists installed apps straight from the installation trees.
+
+        Returns None when neither installation exists, so callers can fall back
+        to the CLI.
+        """
+        if not any(os.path.isdir(base) for base in self.installations().values()):
+            return None
+        apps = []
+        for installation, base in self.installations().items():
+            app_dir = os.path.join(base, "app")
+            try:
+                app_ids = sorted(os.listdir(app_dir))
+            except OSError:
+                continue
+            for app_id in app_ids:
+                deployment = self._read_deployment(installation, base, app_id)
+                if deployment:
+                    apps.append(
+                        {
+                            "id": app_id,
+                            "name": deployment["name"],
+                            "version": deployment["version"],
+                            "repo": deployment["origin"],
+                            "type": "flatpak",
+                            "installed": True,
+                        }
+                    )
+        return apps
+
+    def _read_deployment(self, installation, base, app_id):
+        """Reads the current deployment of an installed app, or None if it is not deployed.
+
+        app/<id>/current links to <arch>/<branch>, whose "active" link holds the
+        checkout with the metadata keyfile and the app's metainfo file.
+        """
+        current = os.path.join(base, "app", app_id, "current")
+        try:
+            arch, branch = os.readlink(current).split("/")[-2:]
+        except (OSError, ValueError):
+            return None
+        active = os.path.join(base, "app", app_id, arch, branch, "active")
+        if not os.path.isdir(active):
+            return None
+
+        keyfile = configparser.ConfigParser(interpolation=None, strict=False)
+        try:
+            keyfile.read(os.path.join(active, "metadata"), encoding="utf-8")
+        except configparser.Error as e:
+            logger.debug(f"Unreadable flatpak metadata for {app_id}: {e}")
+
+        component = {}
+        share = os.path.join(active, "files", "share")
+        for pattern in (
+            "metainfo/{}.metainfo.xml",
+            "metainfo/{}.appdata.xml",
+            "appdata/{}.appdata.xml",
+        ):
+            path = os.path.join(share, pattern.format(app_id))
+            if os.path.exists(path):
+                try:
+                    component = next(iter_components(path), {})
+                except (OSError, SyntaxError) as e:
+                    logger.debug(f"Unreadable metainfo for {app_id}: {e}")
+                break
+
+        return {
+            "name": component.get("name") or app_id,
+            "summary": component.get("summary", ""),
+            "version": component.get("version", ""),
+            "license": component.get("license", ""),
+            "origin": self._origin(base, f"app/{app_id}/{arch}/{branch}"),
+            "arch": arch,
+            "branch": branch,
+            "runtime": keyfile.get("Application", "runtime", fallback=""),
+            "installation": installation,
+        }
+
+    def installed_refs(self):
+        """Returns every deployed app and runtime with the commit it runs.
+
+        Each entry is {"ref", "id", "kind", "arch", "branch", "commit", "origin", "installation"};
+        the commit is the checkout the deployment's "active" link points at.
+        """
+        refs = []
+        for installation, base in self.installations().items():
+            for kind in ("app", "runtime"):
+                for active in sorted(glob.glob(os.path.join(base, kind, "*", "*", "*", "active"))):
+                    app_id, arch, branch = active.split(os.sep)[-4:-1]
+                    try:
+                        commit = os.path.basename(os.readlink(active))
+                    except OSError:
+                        continue
+                    ref = f"{kind}/{app_id}/{arch}/{branch}"
+                    refs.append(
+                        {
+                            "ref": ref,
+                            "id": app_id,
+                            "kind": kind,
+                            "arch": arch,
+                            "branch": branch,
+                            "commit": commit,
+                            "origin": self._origin(base, ref),
+                            "installation": installation,
+                        }
+                    )
+        return refs
+
+    def remote_urls(self):
+        """Returns {(installation, remote): url} from each installation's repo config."""
+        urls = {}
+        for installation, base in self.installations().items():
+            config = configparser.ConfigParser(interpolation=None, strict=False)
+            try:
+                config.read(os.path.join(base, "repo", "config"), encoding="utf-8")
+            except configparser.Error as e:
+                logger.debug(f"Unreadable flatpak repo config in {base}: {e}")
+                continue
+            for section in config.sections():
+                if section.startswith('remote "') and config.has_option(section, "url"):
+                    urls[(installation, section[8:-1])] = config.get(section, "url")
+        return urls
+
+    @staticmethod
+    def _origin(base, ref):
+        # The remote a ref was pulled from keeps a copy of it under repo/refs/remotes
+        parts = ref.split("/")
+        found = glob.glob(os.path.join(base, "repo", "refs", "remotes", "*", *parts))
+        return found[0].split(os.sep)[-len(parts) - 1] if found else ""
+
+    def _list_apps_cli(self):
         try:
             # List installed apps with specific columns
             result = subprocess.run(
@@ -33,11 +256,18 @@ class FlatpakProvider:
                 check=True,
             )
             return self._parse_list_output(result.stdout, installed=True)
-        except subprocess.CalledProcessError:
+        except (subprocess.CalledProcessError, FileNotFoundError):
             return []
 
     def search(self, query):
         """Searches for apps in configured remotes (e.g., Flathub)."""
+        if self.appstream.available():
+            installed = self.installed_ids()
+            return [
+                self._appstream_app(entry, entry["id"] in installed)
+                for entry in self.appstream.search(query)
+            ]
+
         if not self.has_flatpak:
             return []
 
@@ -71,7 +301,40 @@ class FlatpakProvider:
             return []
 
     def get_app_details(self, app_id):
-        """Gets detailed info about a specific flatpak."""
+        """Gets detailed info about a specific flatpak.
+
+        Installed apps are read from their deployment, others from the remote
+        appstream index; the CLI is the fallback for both.
+        """
+        entry = self.appstream.get(app_id) if self.appstream.available() else None
+        for installation, base in self.installations().items():
+            deployment = self._read_deployment(installation, base, app_id)
+            if deployment:
+                return {
+                    "id": app_id,
+                    "type": "flatpak",
+                    "installed": True,
+                    "Name": deployment["name"],
+                    "Version": deployment["version"],
+                    "Description": deployment["summary"] or (entry or {}).get("summary", ""),
+                    "Origin": deployment["origin"],
+                    "License": deployment["license"],
+                    "Runtime": deployment["runtime"],
+                    "Installation": installation,
+                }
+
+        if entry:
+            return {
+                "id": app_id,
+                "type": "flatpak",
+                "installed": False,
+                "Name": entry["name"],
+                "Version": entry["version"],
+                "Description": entry["summary"],
+                "Origin": entry["remote"],
+                "License": entry["license"],
+            }
+
         if not self.has_flatpak:
             return None
 
@@ -80,7 +343,7 @@ class FlatpakProvider:
                 ["flatpak", "info", app_id], capture_output=True, text=True, check=True
             )
             # Basic parsing of flatpak info output
-            info = {"id": app_id, "type": "flatpak"}
+            info = {"id": app_id, "type": "flatpak", "installed": self.is_installed(app_id)}
             for line in result.stdout.splitlines():
                 if ":" in line:
                     key, val = line.split(":", 1)
@@ -91,13 +354,19 @@ class FlatpakProvider:
 
     def is_installed(self, app_id):
         """Checks if a specific flatpak is installed."""
-        if not self.has_flatpak:
-            return False
-        try:
-            subprocess.run(["flatpak", "info", app_id], capture_output=True, check=True)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        return app_id in self.installed_ids()
+
+    @staticmethod
+    def _appstream_app(entry, installed):
+        return {
+            "id": entry["id"],
+            "name": entry["name"],
+            "description": entry["summary"],
+            "version": entry["version"],
+            "repo": entry["remote"],
+            "type": "flatpak",
+            "installed": installed,
+        }
 
     def _parse_list_output(self, output, installed=False):
         apps = []
@@ -118,6 +387,7 @@ class FlatpakProvider:
         return apps
 
     def _parse_search_output(self, output):
+        installed = self.installed_ids()
         apps = []
         lines = output.strip().splitlines()
         for line in lines:
@@ -131,7 +401,7 @@ class FlatpakProvider:
                         "version": parts[3].strip() if len(parts) > 3 else "",
                         "repo": parts[4].strip() if len(parts) > 4 else "flathub",
                         "type": "flatpak",
-                        "installed": self.is_installed(parts[0].strip()),
+                        "installed": parts[0].strip() in installed,
                     }
                 )
         return apps
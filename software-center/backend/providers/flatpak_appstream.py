@@ -0,0 +1,163 @@
+import logging
+import os
+import threading
+
+from common.appstream import iter_components, open_collection
+from common.stamps import file_stamp, tree_stamp
+from providers.search_index import SearchIndex
+
+logger = logging.getLogger("ctxos.flatpak_appstream")
+
+
+class FlatpakAppStreamIndex:
+    """Local index over the AppStream data flatpak keeps for each remote.
+
+    Every installation holds the last fetched collection per remote and arch
+    under appstream/<remote>/<arch>/active, a link named after the commit it
+    was checked out from. The collections are parsed with a streaming parser
+    into per-app entries, and rebuilt only when one of those commits changes.
+    Searches go through a SearchIndex over the entries, updated on first use
+    after a rebuild. Lookups and searches never fork and work offline.
+    """
+
+    def __init__(self, installations):
+        self.installations = installations
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._index = None
+        self._sources = (None, [])  # (stamp of the directories scanned, sources)
+        self._search = SearchIndex()
+        self._searched = None  # the index the SearchIndex was last brought in line with
+
+    def sources(self):
+        """Returns [(remote, arch, commit, collection path)] for every installation.
+
+        The scan is reused until one of the directories it listed changes:
+        flatpak swaps the ``active`` link of a remote and arch on every
+        appstream update, and adding a remote or arch changes its parent.
+        """
+        stamp, found = self._sources
+        if stamp is not None and tree_stamp(path for path, _ in stamp) == stamp:
+            return found
+
+        scanned, found = [], []
+        for base in self.installations:
+            root = os.path.join(base, "appstream")
+            for remote in self._listdir(root, scanned):
+                for arch in self._listdir(os.path.join(root, remote), scanned):
+                    source = self._source(os.path.join(root, remote, arch), scanned)
+                    if source:
+                        found.append((remote, arch) + source)
+        self._sources = (tuple(sorted(scanned)), found)
+        return found
+
+    def available(self):
+        return bool(self.sources())
+
+    def get(self, app_id):
+        """Returns the entry for an app id, or None."""
+        index = self._current()
+        position = index["ids"].get(app_id)
+        return dict(index["apps"][position]) if position is not None else None
+
+    def entries(self):
+        """Returns every app entry in the index; do not modify."""
+        return self._current()["apps"]
+
+    def search(self, query, limit=50):
+        """Returns entries matching every query term, best first.
+
+        The last term also matches as a prefix so partial input finds results.
+        """
+        index = self._current()
+        with self._lock:
+            if self._searched is not index:
+                documents = {entry["id"]: self._document(entry) for entry in index["apps"]}
+                removed = [key for key in self._search.keys() if key not in documents]
+                self._search.update(documents, removed)
+                self._searched = index
+        apps, ids = index["apps"], index["ids"]
+        hits = self._search.search(query, limit=limit)
+        # A concurrent rebuild may have indexed apps this index doesn't have
+        return [dict(apps[ids[hit["id"]]]) for hit in hits if hit["id"] in ids]
+
+    def _current(self):
+        sources = self.sources()
+        stamp = tuple(source[:3] for source in sources)
+        if stamp == self._stamp and self._index is not None:
+            return self._index
+        with self._lock:
+            if stamp != self._stamp or self._index is None:
+                self._index = self._build(sources)
+                self._stamp = stamp
+            return self._index
+
+    def _build(self, sources):
+        apps, ids = [], {}
+        for remote, arch, _, path in sources:
+            try:
+                with open_collection(path) as f:
+                    for component in iter_components(f):
+                        # The first installation and remote listing an app wins
+                        if component["id"] in ids:
+                            continue
+                        ids[component["id"]] = len(apps)
+                        apps.append(self._entry(component, remote, os.path.dirname(path)))
+            except (OSError, EOFError, SyntaxError) as e:
+                # ElementTree's ParseError is a SyntaxError
+                logger.warning(f"Could not read flatpak appstream for {remote}/{arch}: {e}")
+
+        logger.info(f"Flatpak appstream index built: {len(apps)} apps from {len(sources)} remotes")
+        return {"apps": apps, "ids": ids}
+
+    @staticmethod
+    def _listdir(path, scanned):
+        """Lists a directory, noting its stamp first so a change during the scan is seen later."""
+        scanned.append((path, file_stamp(path)))
+        try:
+            return sorted(os.listdir(path))
+        except OSError:
+            return []
+
+    @staticmethod
+    def _source(arch_dir, scanned):
+        """Returns (commit, collection path) of the active checkout in an arch directory."""
+        scanned.append((arch_dir, file_stamp(arch_dir)))
+        active = os.path.join(arch_dir, "active")
+        for name in ("appstream.xml.gz", "appstream.xml"):
+            path = os.path.join(active, name)
+            if os.path.exists(path):
+                break
+        else:
+            return None
+        try:
+            commit = os.path.basename(os.readlink(active))
+        except OSError:
+            commit = file_stamp(path)
+        return commit, path
+
+    @staticmethod
+    def _document(entry):
+        fields = ("id", "name", "summary", "description", "keywords", "categories")
+        return {field: entry[field] for field in fields}
+
+    @staticmethod
+    def _entry(component, remote, directory):
+        icons = component["icons"]
+        icon = icons.get("remote", "")
+        if not icon and icons.get("cached"):
+            icon = os.path.join(directory, "icons", icons["cached"])
+        return {
+            "id": component["id"],
+            "name": component["name"] or component["id"],
+            "summary": component["summary"],
+            "description": component["description"],
+            "categories": component["categories"],
+            "keywords": component["keywords"],
+            "screenshots": component["screenshots"],
+            "icon": icon,
+            "version": component["version"],
+            "license": component["license"],
+            "developer": component["developer"],
+            "remote": remote,
+        }
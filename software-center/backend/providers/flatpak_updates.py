@@ -0,0 +1,215 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import subprocess
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+
+logger = logging.getLogger("ctxos.flatpak_updates")
+
+# Summary files are GVariants; GLib is needed to read them
+try:
+    from gi.repository import GLib
+
+    HAS_GLIB = True
+except ImportError:
+    HAS_GLIB = False
+
+# (refs: [(ref, (commit size, checksum, metadata))], metadata)
+SUMMARY_TYPE = "(a(s(taya{sv}))a{sv})"
+
+
+def _from_be(value):
+    # flatpak stores the xa.cache / xa.data sizes big-endian
+    return struct.unpack(">Q", struct.pack("=Q", value))[0]
+
+
+def parse_summary(data):
+    """Returns {ref: {"commit", "download_size", "installed_size"}} from an ostree summary file."""
+    variant = GLib.Variant.new_from_bytes(
+        GLib.VariantType.new(SUMMARY_TYPE), GLib.Bytes.new(data), False
+    )
+    refs, metadata = variant.unpack()
+    sizes = metadata.get("xa.cache", {})
+    summary = {}
+    for ref, (_, checksum, ref_metadata) in refs:
+        installed_size, download_size, _ = ref_metadata.get("xa.data") or sizes.get(ref, (0, 0, ""))
+        summary[ref] = {
+            "commit": bytes(checksum).hex(),
+            "download_size": _from_be(download_size),
+            "installed_size": _from_be(installed_size),
+        }
+    return summary
+
+
+class FlatpakUpdateChecker:
+    """Finds updatable flatpaks by comparing installed commits with the remotes' summaries.
+
+    Each remote's summary is cached on disk with its ETag and Last-Modified
+    and revalidated with a conditional GET, so an unchanged remote costs one
+    304 response and every process shares the same copy. When GLib is not
+    available to read summaries, a single ``flatpak remote-ls --updates`` call
+    is used instead.
+    """
+
+    SYSTEM_CACHE_DIR = "/var/cache/ctxos/software-center/flatpak-summaries"
+    TIMEOUT = 30
+
+    def __init__(self, flatpak_provider, cache_dir=None):
+        self.flatpak = flatpak_provider
+        if cache_dir:
+            self.cache_dir = cache_dir
+        elif os.geteuid() == 0:
+            self.cache_dir = self.SYSTEM_CACHE_DIR
+        else:
+            self.cache_dir = os.path.join(
+                os.environ.get("HOME", "."),
+                ".cache",
+                "ctxos",
+                "software-center",
+                "flatpak-summaries",
+            )
+        self._lock = threading.Lock()
+        self._parsed = {}  # summary url -> (validators, {ref: entry})
+
+    def check(self):
+        """Returns the updatable refs, sorted by ref.
+
+        Each entry is {"id", "ref", "remote", "installation", "installed_commit",
+        "commit", "download_size", "installed_size"}; sizes are in bytes.
+        """
+        if not self.flatpak.has_flatpak:
+            return []
+        if not HAS_GLIB:
+            return self._check_cli()
+
+        urls = self.flatpak.remote_urls()
+        summaries = {}  # one conditional request per remote per check
+        updates = []
+        for installed in self.flatpak.installed_refs():
+            url = urls.get((installed["installation"], installed["origin"]))
+            if url and url not in summaries:
+                summaries[url] = self._summary(url)
+            entry = (summaries.get(url) or {}).get(installed["ref"])
+            if entry and entry["commit"] != installed["commit"]:
+                updates.append(
+                    {
+                        "id": installed["id"],
+                        "ref": installed["ref"],
+                        "remote": installed["origin"],
+                        "installation": installed["installation"],
+                        "installed_commit": installed["commit"],
+                        "commit": entry["commit"],
+                        "download_size": entry["download_size"],
+                        "installed_size": entry["installed_size"],
+                    }
+                )
+        return sorted(updates, key=lambda u: (u["ref"], u["installation"]))
+
+    def _summary(self, remote_url):
+        """Returns the parsed summary of a remote, revalidated with a conditional GET.
+
+        A stale copy is returned when the remote cannot be reached; None if
+        there is no copy at all.
+        """
+        url = remote_url.rstrip("/") + "/summary"
+        with self._lock:
+            cached = self._parsed.get(url)
+            validators, data = (cached[0], None) if cached else self._load(url)
+            headers = {}
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+            try:
+                request = urllib.request.Request(url, headers=headers)
+                with urllib.request.urlopen(request, timeout=self.TIMEOUT) as response:
+                    data = response.read()
+                    validators = {
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    }
+                self._store(url, validators, data)
+                cached = None
+            except urllib.error.HTTPError as e:
+                if e.code != 304:
+                    logger.warning(f"Could not fetch flatpak summary {url}: HTTP {e.code}")
+            except (urllib.error.URLError, OSError) as e:
+                logger.warning(f"Could not fetch flatpak summary {url}: {e}")
+
+            if cached:
+                return cached[1]
+            if data is None:
+                return None
+            try:
+                summary = parse_summary(data)
+            except Exception as e:
+                logger.warning(f"Unreadable flatpak summary {url}: {e}")
+                return None
+            self._parsed[url] = (validators, summary)
+            return summary
+
+    def _paths(self, url):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        base = os.path.join(self.cache_dir, digest)
+        return base + ".summary", base + ".json"
+
+    def _load(self, url):
+        data_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                validators = json.load(f)
+            with open(data_path, "rb") as f:
+                return validators, f.read()
+        except (OSError, ValueError):
+            return {}, None
+
+    def _store(self, url, validators, data):
+        """Writes the summary, then its validators, each atomically."""
+        data_path, meta_path = self._paths(url)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for path, payload in ((data_path, data), (meta_path, json.dumps(validators).encode())):
+                fd, tmp_path = tempfile.mkstemp(prefix=".summary-", dir=self.cache_dir)
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(payload)
+                    os.chmod(tmp_path, 0o644)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+        except OSError as e:
+            logger.warning(f"Could not cache flatpak summary in {self.cache_dir}: {e}")
+
+    def _check_cli(self):
+        try:
+            result = subprocess.run(
+                ["flatpak", "remote-ls", "--updates", "--columns=application,ref,origin"],
+                capture_output=True,
+                text=True,
+            )
+        except FileNotFoundError:
+            return []
+        updates = []
+        for line in result.stdout.strip().splitlines():
+            parts = line.split("\t")
+            if len(parts) >= 2:
+                updates.append(
+                    {
+                        "id": parts[0].strip(),
+                        "ref": parts[1].strip(),
+                        "remote": parts[2].strip() if len(parts) > 2 else "",
+                        "installation": "",
+                        "installed_commit": "",
+                        "commit": "",
+                        "download_size": None,
+                        "installed_size": None,
+                    }
+                )
+        return sorted(updates, key=lambda u: (u["ref"], u["installation"]))
@@ -0,0 +1,175 @@
+import logging
+
+from providers.dependency_graph import ClosurePlan
+
+logger = logging.getLogger("ctxos.footprint")
+
+
+class FootprintCalculator:
+    """Download and installed size of a package's full dependency closure.
+
+    Packages count when they are not installed yet, or when a versioned
+    dependency forces an upgrade of the installed version; satisfied
+    installed packages are neither counted nor descended into. This is the
+    same set TransactionPlanner plans, so the two report the same sizes.
+    Closures are computed per strongly connected component, children
+    first, and memoized per node, so overlapping stacks share the work. The
+    memo is tied to the graph and installed-set snapshots it was built from
+    and is dropped as soon as either changes.
+    """
+
+    def __init__(self, resolver):
+        self.resolver = resolver
+        self.apt = resolver.apt
+        self._state = None
+
+    def footprint(self, package_name):
+        """Returns the footprint of installing a single package."""
+        return self.footprints([package_name])[package_name]
+
+    def footprints(self, package_names, wait=True):
+        """Returns {name: {"package", "packages", "download_size", "installed_size", "missing"}}.
+
+        Sizes are in bytes: the download and the change in installed size. With
+        ``wait=False`` nothing is built: the result is empty until the shared
+        graph has been built in the background, and a graph being patched is
+        read as it was.
+        """
+        names = list(dict.fromkeys(package_names))
+        graph = self.resolver.graph
+        if not wait and not (graph is not None and graph.built() and graph.available()):
+            return {}
+        state = self._current(names, wait)
+        graph = state["graph"]
+        results = {}
+        for name in names:
+            node = graph.ids.get(name)
+            if node is None:
+                results[name] = self._result(state, name, (), [name])
+                continue
+            closure = self._closure(state, node)
+            missing = [graph.names[n] for n in closure if graph.versions[n] is None]
+            available = [n for n in closure if graph.versions[n] is not None]
+            results[name] = self._result(state, name, available, missing)
+        return results
+
+    def _current(self, names, wait=True):
+        """Returns the memo for the current graph and installed set, rebuilding it if stale."""
+        installed = self.apt.installed_relations()
+        state = self._state
+        shared = self.resolver.graph is not None and self.resolver.graph.available()
+        if shared:
+            shared_graph = self.resolver.graph
+            graph, archive = shared_graph.snapshot() if wait else shared_graph.current()
+            if state and state["graph"] is graph and state["installed"] is installed:
+                return state
+        elif (
+            state
+            and state["installed"] is installed
+            and all(name in state["roots"] for name in names)
+        ):
+            return state
+
+        # Without the shared graph, keep every name seen so far in the per-call graph
+        known = list(state["roots"]) if state and not shared else []
+        roots = list(dict.fromkeys(known + names))
+        if not shared:
+            graph, archive, _ = self.resolver.graph_for(roots)
+        state = {
+            "graph": graph,
+            "installed": installed,
+            "roots": roots,
+            "plan": ClosurePlan(graph, archive, installed),
+            "children": {},
+            "closures": {},
+        }
+        self._state = state
+        logger.debug(f"Footprint memo reset over {len(graph)} nodes")
+        return state
+
+    @staticmethod
+    def _changes(state, node):
+        """Whether installing a node changes the system: a new package or an upgrade."""
+        graph = state["graph"]
+        installed_version = state["installed"].version(graph.names[node])
+        return installed_version is None or (
+            graph.versions[node] is not None and installed_version != graph.versions[node]
+        )
+
+    def _children(self, state, node):
+        children = state["children"].get(node)
+        if children is None:
+            children = state["plan"].choices(node) if self._changes(state, node) else ()
+            state["children"][node] = children
+        return children
+
+    def _closure(self, state, root):
+        """Returns the frozenset of nodes to install for ``root``, memoizing every node on the way.
+
+        Iterative Tarjan: a component's closure is its own uninstalled members
+        plus the closures of the components it points to, which are complete by
+        the time the component is popped.
+        """
+        memo = state["closures"]
+        if root in memo:
+            return memo[root]
+
+        index, low = {root: 0}, {root: 0}
+        stack, on_stack = [root], {root}
+        work = [(root, iter(self._children(state, root)))]
+        while work:
+            node, children = work[-1]
+            descended = False
+            for child in children:
+                if child in memo:
+                    continue
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(self._children(state, child))))
+                    descended = True
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index[child])
+            if descended:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] != index[node]:
+                continue
+
+            members = []
+            while True:
+                member = stack.pop()
+                on_stack.discard(member)
+                members.append(member)
+                if member == node:
+                    break
+            closure = {m for m in members if self._changes(state, m)}
+            for member in members:
+                for child in self._children(state, member):
+                    if child in memo:
+                        closure |= memo[child]
+            closure = frozenset(closure)
+            for member in members:
+                memo[member] = closure
+        return memo[root]
+
+    def _result(self, state, name, nodes, missing):
+        graph, installed = state["graph"], state["installed"]
+        installed_kib = sum(graph.installed_sizes[n] for n in nodes)
+        for node in nodes:
+            # Upgrades replace what is installed
+            if installed.version(graph.names[node]) is not None:
+                installed_kib -= self.apt.dpkg.get_installed_size(graph.names[node]) or 0
+        return {
+            "package": name,
+            "packages": len(nodes),
+            "download_size": sum(graph.download_sizes[n] for n in nodes),
+            "installed_size": installed_kib * 1024,
+            "missing": sorted(missing),
+        }
@@ -0,0 +1,206 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+from common.stamps import file_stamp
+
+logger = logging.getLogger("ctxos.fs_watcher")
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_inotify():
+    """Returns libc if it exposes inotify, else None."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class CatalogWatcher(threading.Thread):
+    """Publishes invalidation events when package databases change on disk.
+
+    Directories are watched with inotify (files like dpkg's status are replaced
+    by rename, so watching the file itself would lose track of it). Directories
+    that do not exist yet, or every directory when inotify is unavailable, are
+    polled by stat instead. Bursts of changes, such as apt-get update rewriting
+    every list, are coalesced into one event per topic.
+    """
+
+    DPKG = "dpkg"
+    APT_LISTS = "apt-lists"
+    FLATPAK = "flatpak"
+    BRANDING = "branding"
+
+    # Transient files that never carry catalog data
+    IGNORED_NAMES = frozenset(["lock", "partial", "status-old", "status-new"])
+
+    def __init__(self, watches=None, poll_interval=5, debounce=0.5):
+        super().__init__()
+        self.daemon = True
+        self.running = False
+        self.watches = watches if watches is not None else self.default_watches()
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._poll_stamps = {}
+
+    @classmethod
+    def default_watches(cls):
+        """Returns {topic: [(directory, names or None for any entry)]}."""
+        user_flatpak = os.path.join(os.environ.get("HOME", "."), ".local", "share", "flatpak")
+        return {
+            cls.DPKG: [("/var/lib/dpkg", {"status"})],
+            cls.APT_LISTS: [("/var/lib/apt/lists", None)],
+            cls.FLATPAK: [
+                ("/var/lib/flatpak", {".changed"}),
+                ("/var/lib/flatpak/app", None),
+                (user_flatpak, {".changed"}),
+                (os.path.join(user_flatpak, "app"), None),
+            ],
+            cls.BRANDING: [("/etc/default", {"software-center-oem"})],
+        }
+
+    def subscribe(self, topic, callback):
+        """Registers callback(event) for a topic; event is {"topic": ..., "names": [...]}."""
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(callback)
+
+    def publish(self, topic, names=()):
+        with self._lock:
+            callbacks = list(self._subscribers.get(topic, []))
+        event = {"topic": topic, "names": sorted(names)}
+        logger.debug(f"Invalidation event: {event}")
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Invalidation subscriber for {topic} failed: {e}")
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        self.running = True
+        libc = _load_inotify()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC) if libc else -1
+        if fd < 0:
+            logger.info("inotify unavailable, polling for catalog changes")
+            self._run_polling()
+            return
+        try:
+            self._run_inotify(libc, fd)
+        finally:
+            os.close(fd)
+
+    def poll(self):
+        """Stats every polled entry once and publishes changes. Returns the topics that changed."""
+        changes = {}
+        for topic, entries in self.watches.items():
+            for directory, names in entries:
+                self._collect_poll_changes(topic, directory, names, changes)
+        self._publish_all(changes)
+        return set(changes)
+
+    def _run_polling(self):
+        self.poll()  # record baseline stamps
+        while self.running:
+            time.sleep(self.poll_interval)
+            self.poll()
+
+    def _run_inotify(self, libc, fd):
+        watched = {}  # wd -> [(topic, directory, names)]; one directory may serve several topics
+        polled = {}  # (topic, directory) -> names
+        total = sum(len(entries) for entries in self.watches.values())
+
+        def add_watches():
+            active = {(t, d) for entries in watched.values() for t, d, _ in entries}
+            for topic, entries in self.watches.items():
+                for directory, names in entries:
+                    if (topic, directory) in active:
+                        continue
+                    wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+                    if wd >= 0:
+                        watched.setdefault(wd, []).append((topic, directory, names))
+                        polled.pop((topic, directory), None)
+                    elif (topic, directory) not in polled:
+                        polled[(topic, directory)] = names
+                        # Record a baseline so the directory's later creation is noticed
+                        self._collect_poll_changes(topic, directory, names, {})
+
+        add_watches()
+        while self.running:
+            ready, _, _ = select.select([fd], [], [], self.poll_interval)
+            changes = {}
+            while ready:
+                self._read_events(fd, watched, changes)
+                # Keep draining until the burst has been quiet for `debounce` seconds
+                ready, _, _ = select.select([fd], [], [], self.debounce)
+
+            for (topic, directory), names in list(polled.items()):
+                self._collect_poll_changes(topic, directory, names, changes)
+            if sum(len(entries) for entries in watched.values()) < total:
+                # A polled directory may have appeared, or a watched one was removed
+                add_watches()
+
+            self._publish_all(changes)
+
+    def _read_events(self, fd, watched, changes):
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + name_len].rstrip(b"\0").decode("utf-8", "replace")
+            offset += name_len
+
+            if mask & IN_IGNORED:
+                # The directory itself went away; it is polled until it reappears
+                for topic, directory, _ in watched.pop(wd, []):
+                    changes.setdefault(topic, set()).add(directory)
+                continue
+            for topic, directory, names in watched.get(wd, []):
+                if name in self.IGNORED_NAMES or (names is not None and name not in names):
+                    continue
+                changes.setdefault(topic, set()).add(os.path.join(directory, name))
+
+    def _collect_poll_changes(self, topic, directory, names, changes):
+        paths = [directory] if names is None else [os.path.join(directory, n) for n in names]
+        for path in paths:
+            stamp = file_stamp(path)
+            key = (topic, path)
+            if key in self._poll_stamps and self._poll_stamps[key] != stamp:
+                changes.setdefault(topic, set()).add(path)
+            self._poll_stamps[key] = stamp
+
+    def _publish_all(self, changes):
+        for topic, names in changes.items():
+            self.publish(topic, names)
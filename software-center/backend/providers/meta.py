@@ -2,6 +2,8 @@ class MetaProvider:
     """Handles meta-packages and system profiles (stacks)."""
 
     METAPACKAGE_PREFIX = "ctxos-"
+    # Stacks named ctxos-tools-* (packaging/deb/ctxos-tools-*) bundle security tools
+    TOOLS_PREFIX = "ctxos-tools-"
 
     # Predefined profiles for the software center
     PROFILES = {
@@ -10,6 +12,7 @@ class MetaProvider:
             "name": "Desktop Environment",
             "description": "A full-featured desktop environment with productivity tools.",
             "type": "profile",
+            "category": "system",
             "icon": "desktop-symbolic",
         },
         "server": {
@@ -17,6 +20,7 @@ class MetaProvider:
             "name": "Server Base",
             "description": "Minimal server environment with core networking and security tools.",
             "type": "profile",
+            "category": "server",
             "icon": "server-symbolic",
         },
         "dev": {
@@ -24,6 +28,7 @@ class MetaProvider:
             "name": "Development Stack",
             "description": "Compilers, debuggers, and essential development libraries.",
             "type": "profile",
+            "category": "development",
             "icon": "builder-symbolic",
         },
         "security-web": {
@@ -31,6 +36,7 @@ class MetaProvider:
             "name": "Web Security Stack",
             "description": "Comprehensive tools for web application assessment and exploitation.",
             "type": "profile",
+            "category": "security",
             "icon": "network-wired-symbolic",
         },
         "security-wireless": {
@@ -38,6 +44,7 @@ class MetaProvider:
             "name": "Wireless Auditing Stack",
             "description": "Tools for WiFi, Bluetooth, and RF security research.",
             "type": "profile",
+            "category": "security",
             "icon": "network-wireless-symbolic",
         },
         "security-forensics": {
@@ -45,6 +52,7 @@ class MetaProvider:
             "name": "Digital Forensics Stack",
             "description": "Evidence collection, file carving, and memory analysis utilities.",
             "type": "profile",
+            "category": "security",
             "icon": "drive-harddisk-symbolic",
         },
         "security-reversing": {
@@ -52,6 +60,7 @@ class MetaProvider:
             "name": "Reverse Engineering Stack",
             "description": "Disassemblers, decompilers, and binary analysis frameworks.",
             "type": "profile",
+            "category": "security",
             "icon": "emblem-system-symbolic",
         },
         "security-automotive": {
@@ -59,52 +68,72 @@ class MetaProvider:
             "name": "Automotive Security Stack",
             "description": "Specialized tools for CAN bus analysis and automotive security research.",
             "type": "profile",
+            "category": "security",
             "icon": "car-symbolic",
         },
     }
 
-    def __init__(self, apt_provider):
+    def __init__(self, apt_provider, footprints=None):
         self.apt = apt_provider
+        self.footprints = footprints
 
     def list_profiles(self):
         """Returns the list of available profiles with their status."""
+        pkg_ids = [p_info["id"] for p_info in self.PROFILES.values()]
+        installed = self.apt.is_installed_many(pkg_ids)
+        infos = self.apt.get_package_info_many(pkg_ids)
+        # Size of the whole stack a profile pulls in, once the dependency graph has been built
+        footprints = self.footprints.footprints(pkg_ids, wait=False) if self.footprints else {}
+
         profiles = []
         for p_id, p_info in self.PROFILES.items():
             pkg_id = p_info["id"]
-            is_installed = self.apt.is_installed(pkg_id)
 
             profile_data = p_info.copy()
-            profile_data["installed"] = is_installed
+            profile_data["installed"] = installed.get(pkg_id, False)
 
             # Fetch extra metadata if available from APT
-            apt_info = self.apt.get_package_info(pkg_id)
+            apt_info = infos.get(pkg_id)
             if apt_info:
                 profile_data["version"] = apt_info.get("Version", "N/A")
                 profile_data["size"] = apt_info.get("Installed-Size", "N/A")
                 if "Description" in apt_info and not profile_data["description"]:
                     profile_data["description"] = apt_info["Description"]
 
+            if pkg_id in footprints:
+                profile_data["footprint"] = footprints[pkg_id]
+
             profiles.append(profile_data)
         return profiles
 
+    def category_of(self, package):
+        """Returns the software center category of a profile or stack, or None."""
+        for profile in self.PROFILES.values():
+            if profile["id"] == package:
+                return profile["category"]
+        if package.startswith(self.TOOLS_PREFIX):
+            return "security"
+        return None
+
     def get_meta_packages(self):
         """Discovers meta-packages in the repo following the prefix."""
         # This would normally search the APT cache for our prefix
-        pkgs = self.apt.list_packages(self.METAPACKAGE_PREFIX)
+        profile_ids = {p["id"] for p in self.PROFILES.values()}
+        # Avoid duplicating profiles already defined
+        pkgs = [p for p in self.apt.list_packages(self.METAPACKAGE_PREFIX) if p not in profile_ids]
+
+        infos = self.apt.get_package_info_many(pkgs)
+        installed = self.apt.is_installed_many(pkgs)
         meta_pkgs = []
         for pkg in pkgs:
-            # Avoid duplicating profiles already defined
-            if any(p["id"] == pkg for p in self.PROFILES.values()):
-                continue
-
-            info = self.apt.get_package_info(pkg)
+            info = infos.get(pkg)
             if info:
                 meta_pkgs.append(
                     {
                         "id": pkg,
                         "name": info.get("Name", pkg.replace(self.METAPACKAGE_PREFIX, "").title()),
                         "description": info.get("Description", ""),
-                        "installed": self.apt.is_installed(pkg),
+                        "installed": installed.get(pkg, False),
                         "type": "stack",
                         "repo": info.get("Origin", "ctxos"),
                     }
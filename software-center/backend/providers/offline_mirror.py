@@ -6,6 +6,7 @@ import subprocess
 from datetime import datetime
 
 from common.errors import ProviderError
+from providers.debversion import version_sort_key
 
 logger = logging.getLogger("ctxos.offline_mirror")
 
@@ -43,8 +44,12 @@ class OfflineMirrorManager:
             os.makedirs(self.packages_dir, exist_ok=True)
             os.makedirs(self.dists_dir, exist_ok=True)
 
-    def sync(self, package_list=None):
-        """Perform incremental sync of remote repository to local mirror."""
+    def sync(self, package_list=None, prune=False, keep=1):
+        """Perform incremental sync of remote repository to local mirror.
+
+        With ``prune``, all but the ``keep`` newest versions of each package
+        are deleted from the pool before it is indexed (see ``prune``).
+        """
         if not package_list:
             package_list = [
                 "build-essential",
@@ -106,6 +111,9 @@ class OfflineMirrorManager:
                 # apt-get download returns non-zero if ANY package fails
                 logger.warning(f"Some packages failed to download: {process.stderr}")
 
+            # Only on request: older versions may be kept on purpose for rollbacks
+            pruned = self.prune(keep=keep) if prune else []
+
             # 2. Generate Packages.gz (Repository Index)
             # dpkg-scanpackages . /dev/null | gzip -9c > Packages.gz
             # We need to run this from the root of the repo (mirror_path) usually, or point to pool
@@ -140,6 +148,7 @@ class OfflineMirrorManager:
                 "success": True,
                 "files_updated": len(os.listdir(self.packages_dir)),
                 "path": self.mirror_path,
+                "pruned": pruned,
             }
 
         except Exception as e:
@@ -172,6 +181,37 @@ class OfflineMirrorManager:
             else 0,
         }
 
+    def prune(self, keep=1):
+        """Removes all but the ``keep`` newest versions of each package in the pool.
+
+        Pool files are named name_version_arch.deb, with the epoch colon escaped as %3a.
+        Returns the removed file names.
+        """
+        groups = {}
+        for filename in os.listdir(self.packages_dir):
+            if not filename.endswith(".deb"):
+                continue
+            parts = filename[: -len(".deb")].split("_")
+            if len(parts) != 3:
+                continue
+            name, version, arch = parts
+            version = version.replace("%3a", ":").replace("%3A", ":")
+            groups.setdefault((name, arch), []).append((version_sort_key(version), filename))
+
+        removed = []
+        for entries in groups.values():
+            entries.sort(reverse=True)
+            for _, filename in entries[keep:]:
+                try:
+                    os.remove(os.path.join(self.packages_dir, filename))
+                    removed.append(filename)
+                except OSError as e:
+                    logger.warning(f"Could not prune {filename}: {e}")
+
+        if removed:
+            logger.info(f"Pruned {len(removed)} superseded packages from the mirror")
+        return sorted(removed)
+
     def configure_apt_for_offline(self):
         """Updates APT sources to use the local mirror."""
         if os.geteuid() != 0:
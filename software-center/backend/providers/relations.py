@@ -0,0 +1,132 @@
+from common.deb822 import parse_relations
+
+# Fields that make two packages mutually exclusive; Breaks only bites once unpacked,
+# but for an install plan both end the same way
+CONFLICT_FIELDS = ("Conflicts", "Breaks")
+
+
+class Relations:
+    """Hash indexes over Provides, Conflicts, Breaks and Replaces for a set of packages.
+
+    ``records`` maps a package name to its control record (a dpkg status
+    entry or a catalog stanza). Besides the per-package declarations, two
+    reverse indexes are kept so checks are dictionary lookups:
+
+    - providers: virtual name -> [(package, provided version or None)]
+    - conflicted_by: name -> [(declaring package, operator, version, field)]
+
+    Instances are immutable; patched() returns an updated copy.
+    """
+
+    FIELDS = frozenset(("Version", "Provides", "Replaces") + CONFLICT_FIELDS)
+
+    def __init__(self, records=None, _declared=None, _indexes=None):
+        if _declared is None:
+            _declared = {name: self._declare(record) for name, record in (records or {}).items()}
+        self.declared = _declared  # name -> (version, provides, conflicts, replaces)
+        if _indexes is not None:
+            self.providers, self.conflicted_by = _indexes
+            return
+        self.providers = {}
+        self.conflicted_by = {}
+        for name, (_, provides, conflicts, _) in self.declared.items():
+            for virtual, version in provides:
+                self.providers.setdefault(virtual, []).append((name, version))
+            for target, op, version, field in conflicts:
+                self.conflicted_by.setdefault(target, []).append((name, op, version, field))
+
+    def __contains__(self, name):
+        return name in self.declared
+
+    def version(self, name):
+        entry = self.declared.get(name)
+        return entry[0] if entry else None
+
+    def provides(self, name):
+        entry = self.declared.get(name)
+        return entry[1] if entry else ()
+
+    def conflicts(self, name):
+        entry = self.declared.get(name)
+        return entry[2] if entry else ()
+
+    def replaces(self, name):
+        entry = self.declared.get(name)
+        return entry[3] if entry else ()
+
+    def patched(self, changes):
+        """Returns a copy with packages replaced; ``changes`` maps names to a record or None.
+
+        The reverse indexes are copied and only the entries of changed
+        packages are rewritten, so a patch costs the dict copies, not a
+        re-index of every declaration.
+        """
+        declared = dict(self.declared)
+        old = [declared.pop(name) for name in changes if name in declared]
+        new = {
+            name: self._declare(record) for name, record in changes.items() if record is not None
+        }
+        declared.update(new)
+        providers = self._reindexed(
+            self.providers,
+            changes,
+            (virtual for _, provides, _, _ in old for virtual, _ in provides),
+            (
+                (virtual, (name, version))
+                for name, (_, provides, _, _) in new.items()
+                for virtual, version in provides
+            ),
+        )
+        conflicted_by = self._reindexed(
+            self.conflicted_by,
+            changes,
+            (target for _, _, conflicts, _ in old for target, _, _, _ in conflicts),
+            (
+                (target, (name, op, version, field))
+                for name, (_, _, conflicts, _) in new.items()
+                for target, op, version, field in conflicts
+            ),
+        )
+        return Relations(_declared=declared, _indexes=(providers, conflicted_by))
+
+    @staticmethod
+    def _reindexed(index, changes, stale, added):
+        """Copies a reverse index without the ``changes`` entries under ``stale`` keys, plus ``added``.
+
+        Only the lists under touched keys are copied; the rest stay shared
+        with the index they came from, which is never modified.
+        """
+        index = dict(index)
+        copied = set()
+        for key in stale:
+            if key not in copied:
+                index[key] = [entry for entry in index[key] if entry[0] not in changes]
+                copied.add(key)
+        for key, entry in added:
+            if key not in copied:
+                index[key] = list(index.get(key, ()))
+                copied.add(key)
+            index[key].append(entry)
+        for key in copied:
+            if not index[key]:
+                del index[key]
+        return index
+
+    @staticmethod
+    def _declare(record):
+        provides = tuple(
+            (group[0]["name"], group[0]["version"] if group[0]["op"] == "=" else None)
+            for group in parse_relations(record.get("Provides", ""))
+        )
+        conflicts = tuple(
+            (alt["name"], alt["op"], alt["version"], field)
+            for field in CONFLICT_FIELDS
+            for group in parse_relations(record.get(field, ""))
+            for alt in group
+        )
+        replaces = tuple(
+            (alt["name"], alt["op"], alt["version"])
+            for group in parse_relations(record.get("Replaces", ""))
+            for alt in group
+        )
+        return record.get("Version"), provides, conflicts, replaces
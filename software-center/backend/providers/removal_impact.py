@@ -0,0 +1,186 @@
+import logging
+import threading
+
+from common.deb822 import iter_stanzas, parse_relations
+from common.stamps import file_stamp
+
+logger = logging.getLogger("ctxos.removal_impact")
+
+
+class RemovalImpactIndex:
+    """Reverse-dependency index over installed packages for removal previews.
+
+    Built from the dpkg status index and apt's extended_states (auto-installed
+    marks), and rebuilt only when either file changes. A removal preview
+    follows reverse dependencies to a fixpoint: a package goes when one of its
+    Depends/Pre-Depends groups has no installed alternative or provider left.
+    Auto-installed packages no longer reachable from a manually installed or
+    essential package, through Depends, Pre-Depends or Recommends as apt's
+    autoremove does by default, are reported as auto-removable.
+    """
+
+    EXTENDED_STATES_PATH = "/var/lib/apt/extended_states"
+
+    HARD_FIELDS = ("Pre-Depends", "Depends")
+    KEEP_FIELDS = ("Pre-Depends", "Depends", "Recommends")
+
+    def __init__(self, dpkg_status, extended_states_path=None):
+        self.dpkg = dpkg_status
+        self.extended_states_path = extended_states_path or self.EXTENDED_STATES_PATH
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._index = None
+
+    def available(self):
+        return self.dpkg.available()
+
+    def impact(self, names, keep=()):
+        """Previews removing ``names``.
+
+        ``keep`` lists packages that will stay or be (re)installed, and so keep
+        their dependencies from becoming auto-removable.
+
+        Returns {"requested", "removed", "autoremovable", "not_installed"}.
+        """
+        index = self._current()
+        installed = index["installed"]
+        requested = [name for name in names if name in installed]
+        removed = self._removal_closure(index, requested)
+
+        roots = [name for name in index["manual"] if name not in removed]
+        roots.extend(name for name in keep if name in installed and name not in removed)
+        needed = self._mark(index, roots, removed)
+        autoremovable = [
+            name
+            for name in index["auto"]
+            if name not in removed and name not in needed and name in index["needed"]
+        ]
+
+        return {
+            "requested": requested,
+            "removed": sorted(removed),
+            "autoremovable": sorted(autoremovable),
+            "not_installed": [name for name in names if name not in installed],
+        }
+
+    def reverse_dependencies(self, package_name):
+        """Returns installed packages that directly depend on a package or something it provides."""
+        index = self._current()
+        dependents = set()
+        for target in index["provided_by"].get(package_name, [package_name]):
+            dependents.update(index["rdeps"].get(target, ()))
+        return sorted(dependents)
+
+    def _removal_closure(self, index, requested):
+        groups, rdeps, providers = index["groups"], index["rdeps"], index["providers"]
+        removed = set(requested)
+        queue = list(requested)
+        while queue:
+            name = queue.pop()
+            for target in index["provided_by"].get(name, [name]):
+                for dependent in rdeps.get(target, ()):
+                    if dependent in removed:
+                        continue
+                    for group in groups[dependent]:
+                        if not any(
+                            (alt not in removed and alt in index["installed"])
+                            or any(p not in removed for p in providers.get(alt, ()))
+                            for alt in group
+                        ):
+                            removed.add(dependent)
+                            queue.append(dependent)
+                            break
+        return removed
+
+    def _mark(self, index, roots, removed):
+        """Returns everything reachable from ``roots`` without passing through removed packages."""
+        keep_groups, providers, installed = (
+            index["keep_groups"],
+            index["providers"],
+            index["installed"],
+        )
+        needed = set(roots)
+        queue = list(roots)
+        while queue:
+            name = queue.pop()
+            for group in keep_groups.get(name, ()):
+                for alt in group:
+                    candidates = [alt] if alt in installed else []
+                    candidates.extend(providers.get(alt, ()))
+                    for candidate in candidates:
+                        if candidate not in needed and candidate not in removed:
+                            needed.add(candidate)
+                            queue.append(candidate)
+        return needed
+
+    def _current(self):
+        stamp = (self.dpkg.stamp, file_stamp(self.extended_states_path))
+        if stamp == self._stamp and self._index is not None:
+            return self._index
+        with self._lock:
+            if stamp != self._stamp or self._index is None:
+                self._index = self._build()
+                self._stamp = stamp
+            return self._index
+
+    def _build(self):
+        installed = self.dpkg.installed_packages()
+        auto = self._read_auto_installed() & installed.keys()
+
+        groups, keep_groups, rdeps, providers, provided_by = {}, {}, {}, {}, {}
+        for name, record in installed.items():
+            for relation in parse_relations(record.get("Provides", "")):
+                providers.setdefault(relation[0]["name"], []).append(name)
+                provided_by.setdefault(name, [name]).append(relation[0]["name"])
+
+            hard = []
+            for field in self.HARD_FIELDS:
+                hard.extend(
+                    [alt["name"] for alt in group]
+                    for group in parse_relations(record.get(field, ""))
+                )
+            groups[name] = hard
+            for group in hard:
+                for alt in group:
+                    rdeps.setdefault(alt, set()).add(name)
+
+            keep = []
+            for field in self.KEEP_FIELDS:
+                keep.extend(
+                    [alt["name"] for alt in group]
+                    for group in parse_relations(record.get(field, ""))
+                )
+            keep_groups[name] = keep
+
+        manual = [
+            name
+            for name, record in installed.items()
+            if name not in auto or record.get("Essential", "").lower() == "yes"
+        ]
+        index = {
+            "installed": installed,
+            "auto": sorted(auto),
+            "manual": manual,
+            "groups": groups,
+            "keep_groups": keep_groups,
+            "rdeps": rdeps,
+            "providers": providers,
+            "provided_by": provided_by,
+        }
+        # Packages that are needed before any removal; already-orphaned ones are not
+        # attributed to the removal being previewed
+        index["needed"] = self._mark(index, manual, set())
+        logger.debug(f"Removal index built over {len(installed)} installed packages")
+        return index
+
+    def _read_auto_installed(self):
+        try:
+            with open(self.extended_states_path, "r", encoding="utf-8", errors="replace") as f:
+                content = f.read()
+        except OSError:
+            return set()
+        return {
+            stanza["Package"]
+            for stanza in iter_stanzas(content, {"Package", "Auto-Installed"})
+            if stanza.get("Auto-Installed") == "1" and "Package" in stanza
+        }
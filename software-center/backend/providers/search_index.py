@@ -0,0 +1,383 @@
+import bisect
+import heapq
+import itertools
+import math
+import threading
+
+from common.text import tokenize
+
+# Cost of probing one document's terms for a prefix, relative to one set lookup
+PROBE_COST = 40
+
+
+def _by_weight(posting):
+    return -posting[1]
+
+
+def _scaled(impacts, scale):
+    return ((key, weight * scale) for key, weight in impacts)
+
+
+class _TermGroup:
+    """The postings of one exact query term, scaled by its IDF."""
+
+    def __init__(self, impacts=(), postings=None, scale=0.0):
+        self.impacts = impacts
+        self.postings = postings or {}
+        self.scale = scale
+        self.size = len(self.postings)
+
+    def ranked(self):
+        return _scaled(self.impacts, self.scale)
+
+
+class _PrefixGroup:
+    """A query term and its completions; a document scores by its best-matching one.
+
+    Nothing is merged up front: ranking merges the completions' impact-ordered
+    postings lazily and scoring only looks at the documents asked for, so the
+    work follows the results wanted rather than the postings matched.
+    """
+
+    def __init__(self, index, term, scales):
+        self.term = term
+        self.scales = scales  # completion -> IDF times match factor
+        self.postings = index._postings
+        self.impacts = index._impacts
+        self.doc_terms = index._terms
+        self.size = sum(len(self.postings[t]) for t in scales)
+
+    def ranked(self):
+        streams = [_scaled(self.impacts[t], scale) for t, scale in self.scales.items()]
+        seen = set()
+        # A document's first appearance in the merge carries its best weight
+        for key, score in heapq.merge(*streams, key=_by_weight):
+            if key not in seen:
+                seen.add(key)
+                yield key, score
+
+    def scores(self, keys):
+        """Returns {key: best weight} for the ``keys`` holding any of the completions.
+
+        Few keys are probed through their own sorted terms; many are
+        intersected with each completion's postings instead.
+        """
+        best = {}
+        overlap = sum(min(len(keys), len(self.postings[t])) for t in self.scales)
+        if len(keys) * PROBE_COST < overlap:
+            prefix, scales, postings = self.term, self.scales, self.postings
+            for key in keys:
+                terms = self.doc_terms[key]
+                for i in range(bisect.bisect_left(terms, prefix), len(terms)):
+                    term = terms[i]
+                    if not term.startswith(prefix):
+                        break
+                    if term in scales:
+                        weight = postings[term][key] * scales[term]
+                        if best.get(key, 0.0) < weight:
+                            best[key] = weight
+            return best
+        for term, scale in self.scales.items():
+            postings = self.postings[term]
+            for key in postings.keys() & keys:
+                weight = postings[key] * scale
+                if best.get(key, 0.0) < weight:
+                    best[key] = weight
+        return best
+
+
+class SearchIndex:
+    """In-memory inverted index with BM25F ranking and incremental updates.
+
+    Documents are dicts with the text fields in FIELD_BOOSTS plus whatever the
+    caller wants back in results. Each posting stores the saturated,
+    length-normalized term weight of one document, normalized against one set
+    of average field lengths for the whole index. Those averages are only
+    re-taken, and every document re-weighed, once the live averages drift
+    more than REWEIGH_DRIFT from them, so weights don't depend on insertion
+    order and small updates stay small. One-term queries read postings in
+    descending weight order and stop at the results wanted; longer queries
+    intersect the exact terms' postings first and only score what is left.
+    Documents can be added, replaced and removed one at a time; unchanged
+    documents are skipped.
+    """
+
+    FIELD_BOOSTS = {
+        "name": 5.0,
+        "id": 3.0,
+        "keywords": 2.5,
+        "summary": 2.0,
+        "categories": 1.5,
+        "description": 1.0,
+    }
+    K1 = 1.2
+    B = 0.75
+    PREFIX_WEIGHT = 0.7  # a prefix match on the last query term scores less than an exact one
+    MAX_EXPANSIONS = 64
+    REWEIGH_DRIFT = 0.05
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs = {}  # key -> document
+        self._terms = {}  # key -> sorted terms posted for the document
+        self._field_lengths = {}  # key -> {field: tokens}
+        self._postings = {}  # term -> {key: weight}
+        self._lengths = dict.fromkeys(self.FIELD_BOOSTS, 0)  # total tokens per field
+        self._averages = {}  # average field lengths the weights are normalized with
+        self._vocabulary = []  # sorted terms, for prefix expansion
+        self._impacts = {}  # term -> postings sorted by descending weight
+        # term -> [(key, old weight, new weight)] since the last update; None to re-sort
+        self._dirty = {}
+        self._prefixes = {}  # prefix -> group, dropped on every change
+        self.version = 0  # bumped by every update that changed something
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, key):
+        return key in self._docs
+
+    def keys(self):
+        with self._lock:
+            return list(self._docs)
+
+    def documents(self):
+        """Returns every document; do not modify."""
+        with self._lock:
+            return list(self._docs.values())
+
+    def get(self, key):
+        document = self._docs.get(key)
+        return dict(document) if document else None
+
+    def update(self, documents=None, removed=()):
+        """Adds or replaces ``documents`` ({key: document}) and drops ``removed`` keys.
+
+        Returns the number of documents that actually changed.
+        """
+        changed = 0
+        with self._lock:
+            added = {}  # key -> {field: tokens}
+            for key in removed:
+                if key in self._docs:
+                    self._remove(key)
+                    changed += 1
+            for key, document in (documents or {}).items():
+                if self._docs.get(key) == document:
+                    continue
+                if key in self._docs:
+                    self._remove(key)
+                added[key] = self._add(key, document)
+                changed += 1
+            if changed:
+                self._weigh_changes(added)
+                self._prefixes = {}
+                self.version += 1
+        return changed
+
+    def search(self, query, limit=50, unique="id"):
+        """Returns the best ``limit`` documents matching every query term.
+
+        The last term also matches as a prefix, so partial input finds
+        results. Documents sharing the ``unique`` field are returned once.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            groups = [self._term_group(term) for term in terms[:-1]]
+            groups.append(self._prefix_group(terms[-1]))
+            if not all(group.size for group in groups):
+                return []
+            wanted = limit * 2 if unique else limit
+            if len(groups) == 1:
+                top = self._walk(groups[0], wanted)
+            else:
+                top = self._intersect(groups, wanted)
+
+            results, seen = [], set()
+            for score, key in sorted(top, key=lambda item: (-item[0], item[1])):
+                document = self._docs[key]
+                if unique and document.get(unique) in seen:
+                    continue
+                seen.add(document.get(unique))
+                results.append(dict(document, score=round(score, 4)))
+                if len(results) == limit:
+                    break
+            return results
+
+    def _walk(self, group, wanted):
+        """Top (score, key) pairs of one group, read in impact order."""
+        return [(score, key) for key, score in itertools.islice(group.ranked(), wanted)]
+
+    def _intersect(self, groups, wanted):
+        """Top (score, key) pairs of the documents in every group.
+
+        Exact terms are intersected as key sets, rarest first, and a prefix
+        group is only looked up for the documents left.
+        """
+        exact = sorted(
+            (group for group in groups if isinstance(group, _TermGroup)), key=lambda g: g.size
+        )
+        keys = exact[0].postings.keys()
+        for group in exact[1:]:
+            keys = keys & group.postings.keys()
+        scores = dict.fromkeys(keys, 0.0)
+        for group in groups:
+            if not isinstance(group, _TermGroup):
+                matched = group.scores(scores.keys())
+                scores = {key: scores[key] + weight for key, weight in matched.items()}
+        for group in exact:
+            postings, scale = group.postings, group.scale
+            for key in scores:
+                scores[key] += postings[key] * scale
+        return heapq.nlargest(wanted, ((score, key) for key, score in scores.items()))
+
+    def _term_group(self, term):
+        postings = self._postings.get(term)
+        if not postings:
+            return _TermGroup()
+        return _TermGroup(self._impacts[term], postings, self._idf(term, len(self._docs)))
+
+    def _prefix_group(self, term):
+        """Groups a term with the MAX_EXPANSIONS most frequent terms it prefixes.
+
+        Groups are cached until the index changes, since type-ahead repeats
+        the same prefixes.
+        """
+        if len(term) < 2:
+            return self._term_group(term)
+        group = self._prefixes.get(term)
+        if group is not None:
+            return group
+
+        vocabulary, postings, count = self._vocabulary, self._postings, len(self._docs)
+        lo = bisect.bisect_right(vocabulary, term)
+        hi = bisect.bisect_left(vocabulary, term + "\uffff", lo)
+        # The most common completions are the likeliest intended ones
+        common = heapq.nlargest(
+            self.MAX_EXPANSIONS, vocabulary[lo:hi], key=lambda t: len(postings[t])
+        )
+        if not common:
+            group = self._term_group(term)
+        else:
+            scales = {t: self._idf(t, count) * self.PREFIX_WEIGHT for t in common}
+            if term in postings:
+                scales[term] = self._idf(term, count)
+            group = _PrefixGroup(self, term, scales)
+        self._prefixes[term] = group
+        return group
+
+    def _idf(self, term, count):
+        frequency = len(self._postings.get(term, ()))
+        return math.log(1 + (max(count, 1) - frequency + 0.5) / (frequency + 0.5))
+
+    def _fields(self, document):
+        fields = {}
+        for field in self.FIELD_BOOSTS:
+            tokens = self._tokens(document.get(field))
+            if tokens:
+                fields[field] = tokens
+        return fields
+
+    def _add(self, key, document):
+        """Stores a document and counts its field lengths; it is weighed in _weigh_changes."""
+        fields = self._fields(document)
+        for field, tokens in fields.items():
+            self._lengths[field] += len(tokens)
+        self._field_lengths[key] = {field: len(tokens) for field, tokens in fields.items()}
+        self._docs[key] = document
+        self._terms[key] = ()
+        return fields
+
+    def _remove(self, key):
+        del self._docs[key]
+        for field, length in self._field_lengths.pop(key).items():
+            self._lengths[field] -= length
+        for term in self._terms.pop(key):
+            postings = self._postings[term]
+            self._changed(term, key, postings.pop(key), None)
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+
+    def _weigh_changes(self, added):
+        count = len(self._docs)
+        averages = (
+            {field: length / count for field, length in self._lengths.items()} if count else {}
+        )
+        if any(
+            abs(average - self._averages.get(field, 0))
+            > self.REWEIGH_DRIFT * self._averages.get(field, 0)
+            for field, average in averages.items()
+        ):
+            # Weights are only comparable under the same averages, so all move together
+            self._averages = averages
+            for key, document in self._docs.items():
+                fields = added[key] if key in added else self._fields(document)
+                self._weigh(key, fields, record=False)
+            self._impacts = {
+                term: sorted(postings.items(), key=_by_weight)
+                for term, postings in self._postings.items()
+            }
+            self._dirty = {}
+            return
+
+        for key, fields in added.items():
+            self._weigh(key, fields)
+        for term, changes in self._dirty.items():
+            postings = self._postings.get(term)
+            if not postings:
+                self._impacts.pop(term, None)
+            elif changes is None:
+                self._impacts[term] = sorted(postings.items(), key=_by_weight)
+            else:
+                impacts = self._impacts[term]
+                for key, old, new in changes:
+                    if old is not None:
+                        i = bisect.bisect_left(impacts, -old, key=_by_weight)
+                        while impacts[i][0] != key:
+                            i += 1
+                        del impacts[i]
+                    if new is not None:
+                        bisect.insort(impacts, (key, new), key=_by_weight)
+        self._dirty = {}
+
+    def _weigh(self, key, fields, record=True):
+        """Posts a document's terms, normalized with the index's average field lengths."""
+        frequencies = {}
+        for field, tokens in fields.items():
+            norm = 1 - self.B + self.B * len(tokens) / self._averages[field]
+            boost = self.FIELD_BOOSTS[field] / norm
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + boost
+
+        for term, frequency in frequencies.items():
+            weight = frequency * (self.K1 + 1) / (frequency + self.K1)
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._vocabulary, term)
+            old = postings.get(key)
+            postings[key] = weight
+            if record:
+                self._changed(term, key, old, weight)
+        self._terms[key] = tuple(sorted(frequencies))
+
+    def _changed(self, term, key, old, new):
+        """Notes a posting change; terms with many changes are re-sorted instead."""
+        changes = self._dirty.setdefault(term, [])
+        if changes is None:
+            return
+        impacts = self._impacts.get(term)
+        if impacts is None or len(changes) > len(impacts) // 8:
+            self._dirty[term] = None
+        else:
+            changes.append((key, old, new))
+
+    @staticmethod
+    def _tokens(value):
+        if not value:
+            return []
+        return tokenize(" ".join(value) if isinstance(value, (list, tuple)) else value)
@@ -0,0 +1,229 @@
+import bisect
+import heapq
+import logging
+import math
+import re
+import threading
+
+logger = logging.getLogger("ctxos.suggest")
+
+_WORD_RE = re.compile(r"[^\W_]{3,}")
+
+
+class Suggester:
+    """Search-as-you-type completions over the names in the search index.
+
+    Completion keys (ids, display names and the words of display names) are
+    kept in one sorted list, which works as an implicit trie: the keys under
+    a prefix are a contiguous range found by bisection, and the children of
+    a prefix are found by bisecting for each next character. Typos are
+    tolerated by walking that trie with a Levenshtein row per prefix, pruned
+    as soon as the row exceeds the allowed distance. The best keys of large
+    ranges are cached until the next rebuild, so short prefixes stay cheap.
+    """
+
+    # Key score: source type, plus installed state and popularity (reverse dependencies)
+    TYPE_SCORES = {"profile": 3.0, "stack": 2.0, "flatpak": 1.5, "package": 1.0}
+    INSTALLED_SCORE = 2.5
+    POPULARITY_SCORE = 0.5
+    WORD_PENALTY = 0.5  # a match on a later word of the name ranks below the name itself
+    SCAN_LIMIT = 256  # ranges up to this size are scanned instead of cached
+    CACHED_KEYS = 64
+    CACHED_NODES = 100000
+    # Leading characters that must match exactly; typos there are rare and it prunes most of the walk
+    EXACT_PREFIX = 1
+
+    def __init__(self, search_index, apt, flatpak, graph=None):
+        self.search_index = search_index
+        self.apt = apt
+        self.flatpak = flatpak
+        self.graph = graph
+        self._lock = threading.Lock()  # serializes rebuilds
+        self._stamp = None
+        # (keys, key items, key scores, items, {range: best key positions},
+        #  {prefix: children}) swapped atomically
+        self._state = ([], [], [], [], {}, {})
+
+    def update(self, event=None):
+        """Rebuilds the completion keys when the index or the installed sets changed."""
+        stamp = (
+            self.search_index.version,
+            self.apt.dpkg.current_stamp(),
+            self.flatpak.installation_stamp(),
+        )
+        if stamp == self._stamp:
+            return False
+        with self._lock:
+            if stamp != self._stamp:
+                self._state = self._build()
+                self._stamp = stamp
+        return True
+
+    def suggest(self, query, limit=10):
+        """Returns up to ``limit`` completions, exact prefix matches first.
+
+        Each is {"id", "name", "type", "installed", "distance"}, where distance
+        is the number of edits the query needed to match. Empty until the
+        first ``update``, which runs in the background.
+        """
+        query = " ".join(query.lower().split())
+        if not query:
+            return []
+        keys, _, _, items, _, _ = state = self._state
+
+        found = {}
+        lo = bisect.bisect_left(keys, query)
+        hi = bisect.bisect_left(keys, query + "\uffff", lo)
+        self._collect(state, lo, hi, 0, found, limit)
+
+        # Typo tolerance only fills up what exact completion couldn't
+        if len(found) < limit and len(query) >= 3:
+            max_distance = 1 if len(query) <= 5 else 2
+            level = 0
+            for distance, lo, hi in sorted(self._fuzzy_ranges(state, query, max_distance)):
+                if distance > level and len(found) >= limit:
+                    break
+                if distance:
+                    # Every range at a distance contributes, so the best of them win below
+                    level = distance
+                    self._collect(state, lo, hi, distance, found, limit)
+
+        ranked = sorted(found.items(), key=lambda item: (item[1][0], -item[1][1]))
+        return [dict(items[item], distance=distance) for item, (distance, _) in ranked[:limit]]
+
+    def _collect(self, state, lo, hi, distance, found, limit):
+        """Adds up to ``limit`` of the best new items of the key range [lo, hi) to ``found``."""
+        _, key_items, scores, _, _, _ = state
+        added = 0
+        for position in self._best(state, lo, hi, limit):
+            item = key_items[position]
+            if item not in found:
+                found[item] = (distance, scores[position])
+                added += 1
+                if added == limit:
+                    return
+
+    def _best(self, state, lo, hi, limit=None):
+        """Key positions of a range, best score first; cached for large ranges."""
+        _, _, scores, _, cache, _ = state
+        if hi - lo <= self.SCAN_LIMIT:
+            return heapq.nlargest(limit or self.CACHED_KEYS, range(lo, hi), key=scores.__getitem__)
+        best = cache.get((lo, hi))
+        if best is None:
+            best = heapq.nlargest(self.CACHED_KEYS, range(lo, hi), key=scores.__getitem__)
+            cache[(lo, hi)] = best
+        return best
+
+    @staticmethod
+    def _children(keys, prefix, lo, hi):
+        """Yields (character, lo, hi) for each extension of ``prefix`` in the range."""
+        depth = len(prefix)
+        i = lo
+        while i < hi and len(keys[i]) == depth:
+            i += 1
+        while i < hi:
+            char = keys[i][depth]
+            end = bisect.bisect_left(keys, prefix + chr(ord(char) + 1), i, hi)
+            yield char, i, end
+            i = end
+
+    def _fuzzy_ranges(self, state, query, max_distance):
+        """Returns (distance, lo, hi) for key ranges whose prefix is within max_distance edits.
+
+        Row values are capped at max_distance + 1, which leaves few distinct
+        rows, so transitions are memoized: a Levenshtein automaton built lazily
+        for the query.
+        """
+        keys, children = state[0], state[5]
+        size, cap = len(query), max_distance + 1
+        transitions = {}  # (row, char) -> next row, or None once no extension can match
+
+        def step(row, char):
+            try:
+                return transitions[row, char]
+            except KeyError:
+                next_row = self._next_row(query, row, char, cap)
+                transitions[row, char] = next_row if min(next_row) < cap else None
+                return transitions[row, char]
+
+        prefix = query[: self.EXACT_PREFIX]
+        row = tuple(min(j, cap) for j in range(size + 1))
+        for char in prefix:
+            row = step(row, char)
+        lo = bisect.bisect_left(keys, prefix)
+        stack = [(prefix, lo, bisect.bisect_left(keys, prefix + "\uffff", lo), row)]
+        ranges = []
+        while stack:
+            prefix, lo, hi, row = stack.pop()
+            if row is None:
+                continue
+            distance = row[size]
+            if distance < cap:
+                # Every key below this prefix completes the query
+                ranges.append((distance, lo, hi))
+                if min(row) >= distance:
+                    continue
+            below = children.get(prefix)
+            if below is None:
+                # The walk revisits the same upper levels for every query
+                below = list(self._children(keys, prefix, lo, hi))
+                if len(children) < self.CACHED_NODES:
+                    children[prefix] = below
+            for char, child_lo, child_hi in below:
+                child = step(row, char)
+                if child is not None:
+                    stack.append((prefix + char, child_lo, child_hi, child))
+        return ranges
+
+    @staticmethod
+    def _next_row(query, row, char, cap):
+        """Levenshtein row of a prefix extended by ``char``, from the row of the prefix."""
+        next_row = [min(row[0] + 1, cap)]
+        for j, expected in enumerate(query):
+            next_row.append(min(next_row[j] + 1, row[j + 1] + 1, row[j] + (expected != char), cap))
+        return tuple(next_row)
+
+    def _build(self):
+        documents = self.search_index.documents()
+        installed_packages = set(self.apt.dpkg.installed_packages())
+        installed_flatpaks = self.flatpak.installed_ids()
+        graph = self.graph.graph if self.graph is not None else None
+
+        items, entries = [], []
+        for document in documents:
+            kind = document.get("type", "package")
+            if kind == "flatpak":
+                installed = document["id"] in installed_flatpaks
+            else:
+                installed = document["id"] in installed_packages
+            score = self.TYPE_SCORES.get(kind, 1.0) + (self.INSTALLED_SCORE if installed else 0)
+            node = graph.ids.get(document["id"]) if graph is not None else None
+            if node is not None:
+                dependents = graph.rev_offsets[node + 1] - graph.rev_offsets[node]
+                score += self.POPULARITY_SCORE * math.log1p(dependents)
+
+            item = len(items)
+            items.append(
+                {
+                    "id": document["id"],
+                    "name": document.get("name") or document["id"],
+                    "type": kind,
+                    "installed": installed,
+                }
+            )
+            name = " ".join(items[-1]["name"].lower().split())
+            keys = {document["id"].lower(): score, name: score}
+            for word in _WORD_RE.findall(name)[1:]:
+                keys.setdefault(word, score - self.WORD_PENALTY)
+            entries.extend((key, item, key_score) for key, key_score in keys.items())
+
+        entries.sort()
+        keys = [key for key, _, _ in entries]
+        key_items = [item for _, item, _ in entries]
+        scores = [score for _, _, score in entries]
+        state = (keys, key_items, scores, items, {}, {})
+        # Single characters are what every search starts with
+        for char, lo, hi in self._children(keys, "", 0, len(keys)):
+            self._best(state, lo, hi)
+        logger.info(f"Suggestion index built: {len(keys)} keys for {len(items)} items")
+        return state
@@ -0,0 +1,102 @@
+import logging
+import time
+
+from providers.dependency_graph import ClosurePlan, find_conflicts
+
+logger = logging.getLogger("ctxos.transaction_planner")
+
+
+class TransactionPlanner:
+    """Plans a batch of installs and removals as a single transaction.
+
+    Removals are previewed first so the install side is resolved against the
+    installed set as it will be afterwards. All install targets are then
+    walked together in one breadth-first pass over the resolver's graph; a
+    dependency shared by several targets is chosen and expanded once, so
+    planning every profile stack together costs about as much as planning
+    the largest of them.
+    """
+
+    def __init__(self, resolver):
+        self.resolver = resolver
+        self.apt = resolver.apt
+
+    def plan(self, install=(), remove=()):
+        """Computes the transaction for installing ``install`` and removing ``remove``.
+
+        Returns {"install", "remove", "autoremovable", "final_packages",
+        "download_size", "installed_size_delta", "conflicts", "missing",
+        "unsatisfied", "stats"}. Sizes are in bytes.
+        """
+        started = time.monotonic()
+        install = list(dict.fromkeys(install))
+        remove = [name for name in dict.fromkeys(remove) if name not in install]
+
+        current = self.apt.installed_relations()
+        removal = {"removed": [], "autoremovable": []}
+        if remove:
+            removal = self.apt.get_removal_impact(remove, keep=install)
+
+        graph, archive, lookups = self.resolver.graph_for(install)
+        names, versions = graph.names, graph.versions
+
+        # Packages the install side needs stay; apt will not remove them
+        removed = set(removal["removed"])
+        plan = ClosurePlan(graph, archive, self._without(current, removed))
+        levels = plan.walk(graph.ids[name] for name in install if name in graph.ids)
+        selected = {names[node] for node in plan.selected}
+        removed -= selected
+        installed = self._without(current, removed)
+
+        planned = {
+            names[node]: versions[node]
+            for node in plan.selected
+            if versions[node] is not None and current.version(names[node]) != versions[node]
+        }
+        conflicts, replaced = find_conflicts(planned, archive, installed)
+        gone = (removed | replaced) - planned.keys()
+
+        download_size = 0
+        installed_kib = 0
+        for name in planned:
+            node = graph.ids[name]
+            download_size += graph.download_sizes[node]
+            installed_kib += graph.installed_sizes[node]
+        for name in gone | {name for name in planned if current.version(name) is not None}:
+            installed_kib -= self.apt.dpkg.get_installed_size(name) or 0
+
+        missing = plan.missing | {name for name in install if name not in graph.ids}
+        result = {
+            "install": [
+                {
+                    "name": name,
+                    "version": version,
+                    "action": "upgrade" if current.version(name) is not None else "install",
+                }
+                for name, version in sorted(planned.items())
+            ],
+            "remove": sorted(gone),
+            "autoremovable": sorted(set(removal["autoremovable"]) - selected),
+            "final_packages": sorted((set(current.declared) - gone) | planned.keys()),
+            "download_size": download_size,
+            "installed_size_delta": installed_kib * 1024,
+            "conflicts": conflicts,
+            "missing": sorted(missing),
+            "unsatisfied": sorted(plan.unsatisfied, key=lambda u: (u["package"], u["dependency"])),
+            "stats": {
+                "targets": len(install) + len(remove),
+                "nodes_visited": len(plan.selected),
+                "levels": levels,
+                "lookups": lookups,
+                "wall_time_ms": round((time.monotonic() - started) * 1000, 3),
+            },
+        }
+        logger.info(
+            f"Planned {len(install)} installs and {len(remove)} removals: "
+            f"{len(planned)} packages to install, {len(gone)} to remove"
+        )
+        return result
+
+    @staticmethod
+    def _without(relations, names):
+        return relations.patched(dict.fromkeys(names)) if names else relations
@@ -1,13 +1,14 @@
 import json
 import os
 import sys
+import threading
 
 import gi
 
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
 
-from gi.repository import Adw, Gio, Gtk  # noqa: E402
+from gi.repository import Adw, Gio, GLib, Gtk  # noqa: E402
 
 # Handle DBus connection
 try:
@@ -27,6 +28,18 @@ except Exception:
     direct_actions = ActionManager()
 
 
+def describe_transaction(transaction):
+    """One line describing what apt will do, from an apt-get simulation."""
+    if not transaction.get("success"):
+        return f"apt reports: {transaction.get('error')}"
+    parts = [
+        f"{verb} {len(transaction[key])}"
+        for verb, key in (("installs", "install"), ("upgrades", "upgrade"), ("removes", "remove"))
+        if transaction[key]
+    ]
+    return f"apt {', '.join(parts)} package(s)" if parts else "No changes needed"
+
+
 class AppCard(Gtk.Button):
     def __init__(self, app_data):
         super().__init__()
@@ -161,6 +174,8 @@ class SoftwareCenterApp(Adw.Application):
 
         header = Adw.HeaderBar()
         self.search_bar = Gtk.SearchEntry(placeholder_text="Search security tools...")
+        # SearchEntry debounces search-changed, so results follow typing without a request per key
+        self.search_bar.connect("search-changed", self.on_search_changed)
         self.search_bar.connect("activate", self.on_search)
         header.set_title_widget(self.search_bar)
         box.append(header)
@@ -205,8 +220,7 @@ class SoftwareCenterApp(Adw.Application):
     def load_category(self, cat_id):
         self.clear_flowbox()
         if HAS_DBUS:
-            # Note: ListAll category filter might not be implemented in DBus yet
-            apps = json.loads(dbus_service.ListAll())
+            apps = json.loads(dbus_service.ListAll(cat_id))
         else:
             apps = direct_apps.get_all_apps(category=cat_id)
 
@@ -215,14 +229,27 @@ class SoftwareCenterApp(Adw.Application):
             card.connect("clicked", lambda b: self.show_details(b.app_data["id"]))
             self.flowbox.append(card)
 
+    def on_search_changed(self, entry):
+        query = entry.get_text().strip()
+        if not query:
+            self.load_featured()
+            return
+        if HAS_DBUS:
+            apps = json.loads(dbus_service.Suggest(query, 24))
+        else:
+            apps = direct_apps.suggest(query, limit=24)
+        self.show_apps(apps)
+
     def on_search(self, entry):
         query = entry.get_text()
-        self.clear_flowbox()
         if HAS_DBUS:
-            apps = json.loads(dbus_service.Search(query))
+            apps = json.loads(dbus_service.SearchApps(query))
         else:
             apps = direct_apps.search_apps(query)
+        self.show_apps(apps)
 
+    def show_apps(self, apps):
+        self.clear_flowbox()
         for app in apps:
             card = AppCard(app)
             card.connect("clicked", lambda b: self.show_details(b.app_data["id"]))
@@ -237,6 +264,11 @@ class SoftwareCenterApp(Adw.Application):
         self.details_title.set_label(app["name"])
         self.details_desc.set_label(app.get("description", "No description available."))
         self.install_btn.app_id = app_id
+        self.transaction = None
+        self.details_transaction.set_label("")
+        # Only APT packages have an apt-get simulation; it fills in once apt answers
+        if "type" not in app:
+            threading.Thread(target=self.load_transaction, args=(app_id,), daemon=True).start()
 
         if app.get("installed"):
             self.install_btn.set_label("Remove")
@@ -248,6 +280,20 @@ class SoftwareCenterApp(Adw.Application):
 
         self.content_stack.set_visible_child_name("details")
 
+    def load_transaction(self, app_id):
+        if HAS_DBUS:
+            transaction = json.loads(dbus_service.GetAppTransaction(app_id))
+        else:
+            transaction = direct_apps.get_app_transaction(app_id)
+        GLib.idle_add(self.show_transaction, app_id, transaction)
+
+    def show_transaction(self, app_id, transaction):
+        # The details page may show another app by now
+        if self.install_btn.app_id == app_id:
+            self.transaction = transaction
+            self.details_transaction.set_label(describe_transaction(transaction))
+        return GLib.SOURCE_REMOVE
+
     def create_details_page(self):
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         header = Adw.HeaderBar()
@@ -273,10 +319,38 @@ class SoftwareCenterApp(Adw.Application):
         btn_box.append(self.install_btn)
         inner.append(btn_box)
 
+        self.details_transaction = Gtk.Label(xalign=0, wrap=True)
+        self.details_transaction.add_css_class("dim-label")
+        inner.append(self.details_transaction)
+
         box.append(inner)
         return box
 
     def on_install(self, btn):
+        transaction = self.transaction
+        if transaction and transaction.get("success"):
+            changes = (
+                [f"Remove: {name}" for name in transaction["remove"]]
+                + [f"Install: {p['name']}" for p in transaction["install"]]
+                + [f"Upgrade: {p['name']}" for p in transaction["upgrade"]]
+            )
+            # Confirm when apt would touch more than the package itself
+            if len(changes) > 1:
+                dialog = Adw.MessageDialog(
+                    transient_for=self.win,
+                    heading=describe_transaction(transaction),
+                    body="\n".join(changes),
+                )
+                dialog.add_response("cancel", "Cancel")
+                dialog.add_response("apply", "Continue")
+                dialog.connect(
+                    "response", lambda d, response: response == "apply" and self.apply(btn)
+                )
+                dialog.present()
+                return
+        self.apply(btn)
+
+    def apply(self, btn):
         self.install_btn.set_sensitive(False)
         self.install_btn.set_label("Working...")
 
@@ -10,7 +10,9 @@ const API = {
         const endpoints = {
             'list_featured': '/api/v1/profiles',
             'get_details': `/api/v1/packages/${params.id}`,
+            'get_transaction': `/api/v1/packages/${params.id}/transaction`,
             'search': `/api/v1/packages?search=${params.query}`,
+            'suggest': `/api/v1/suggest?q=${encodeURIComponent(params.query)}&limit=${params.limit || 10}`,
             'install': `/api/v1/packages/${params.id}/install`,
             'remove': `/api/v1/packages/${params.id}/install`, // DELETE method in real REST, but using same endpoint for now
             'get_repo_status': '/api/v1/system/mirror',
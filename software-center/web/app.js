@@ -81,6 +81,16 @@ async function init() {
         });
     }
 
+    // One line describing what apt will do, from an apt-get simulation
+    function describeTransaction(tx) {
+        if (!tx.success) return `apt reports: ${tx.error}`;
+        const parts = [];
+        if (tx.install.length) parts.push(`installs ${tx.install.length}`);
+        if (tx.upgrade.length) parts.push(`upgrades ${tx.upgrade.length}`);
+        if (tx.remove.length) parts.push(`removes ${tx.remove.length}`);
+        return parts.length ? `apt ${parts.join(', ')} package(s)` : 'No changes needed';
+    }
+
     async function showDetails(appId) {
         document.querySelector('.content').scrollTop = 0;
         const app = await API.fetch('get_details', { id: appId });
@@ -136,6 +146,8 @@ async function init() {
                     <small>${i18n.ui.protection_desc}</small>
                 </div>
                 <p>${app.migration.message || 'This will switch your system environment.'}</p>
+                ${app.migration.transaction && !app.migration.transaction.success
+                    ? `<p class="remove-item">${describeTransaction(app.migration.transaction)}</p>` : ''}
                 <ul>
                     ${app.migration.to_remove.map(name => `<li class="remove-item">Remove: ${name}</li>`).join('')}
                     ${app.migration.to_install.map(name => `<li class="install-item">Install: ${name}</li>`).join('')}
@@ -148,7 +160,32 @@ async function init() {
             if (migrationInfo) migrationInfo.classList.add('hidden');
         }
 
+        // The apt simulation is slower than the details, so it fills in afterwards
+        const transactionInfo = document.getElementById('details-transaction');
+        transactionInfo.textContent = '';
+        let transaction = null;
+        installBtn.dataset.appId = appId;
+        if (!app.type) {
+            API.fetch('get_transaction', { id: appId }).then(tx => {
+                // Ignore answers for a page that is no longer shown
+                if (!tx || tx.success === undefined || installBtn.dataset.appId !== appId) return;
+                transaction = tx;
+                transactionInfo.textContent = describeTransaction(tx);
+            });
+        }
+
         installBtn.onclick = async () => {
+            // Confirm when apt would touch more than the package itself
+            if (transaction && transaction.success) {
+                const others = transaction.install.length + transaction.upgrade.length
+                    + transaction.remove.length - 1;
+                const names = transaction.remove.map(name => `Remove: ${name}`)
+                    .concat(transaction.install.map(p => `Install: ${p.name}`))
+                    .concat(transaction.upgrade.map(p => `Upgrade: ${p.name}`));
+                if (others > 0 && !confirm(`${describeTransaction(transaction)}:\n${names.join('\n')}`)) {
+                    return;
+                }
+            }
             installBtn.textContent = app.can_switch ? i18n.ui.create_snapshot : 'Processing...';
             installBtn.disabled = true;
             if (app.can_switch) {
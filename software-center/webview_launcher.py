@@ -35,6 +35,8 @@ class APIBridge:
                 return json.loads(dbus_service.ListFeatured())
             elif action == "get_details":
                 return json.loads(dbus_service.GetAppDetails(params.get("id")))
+            elif action == "get_transaction":
+                return json.loads(dbus_service.GetAppTransaction(params.get("id")))
             elif action == "search":
                 return json.loads(dbus_service.SearchApps(params.get("query")))
             elif action == "install":
@@ -53,6 +55,8 @@ class APIBridge:
                 return direct_apps.get_featured_apps()
             elif action == "get_details":
                 return direct_apps.get_app_details(params.get("id"))
+            elif action == "get_transaction":
+                return direct_apps.get_app_transaction(params.get("id"))
             elif action == "get_translations":
                 return direct_apps.get_translations()
             elif action == "get_branding":
@@ -85,7 +89,15 @@ def start_webview():
     # For now, let's just use the monitor if available
     from api.update_monitor import UpdateMonitor
 
-    monitor = UpdateMonitor(api.notify_updates, interval=1800)
+    if HAS_DBUS:
+        monitor = UpdateMonitor(api.notify_updates, interval=1800)
+    else:
+        monitor = UpdateMonitor(
+            api.notify_updates,
+            interval=1800,
+            apt=direct_apps.apt,
+            flatpak=direct_apps.flatpak,
+        )
     monitor.start()
 
     web_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "web")
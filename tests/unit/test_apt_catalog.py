@@ -0,0 +1,117 @@
+import gzip
+import os
+
+import pytest
+from providers.apt_catalog import PackageCatalog
+
+MAIN_AMD64 = """Package: tool-a
+Version: 1.0-1
+Architecture: amd64
+Depends: libfoo (>= 1.2)
+Description: first tool
+
+Package: libfoo
+Version: 1.2
+Architecture: amd64
+Installed-Size: 300
+Description: foo library
+ Long description line.
+"""
+
+MAIN_I386 = """Package: libfoo
+Version: 1.2
+Architecture: i386
+Description: foo library
+"""
+
+UPDATES_AMD64 = """Package: tool-a
+Version: 1.1-1
+Architecture: amd64
+Description: first tool
+"""
+
+
+@pytest.fixture
+def lists_dir(tmp_path):
+    (tmp_path / "deb.example.org_dists_stable_main_binary-amd64_Packages").write_text(MAIN_AMD64)
+    (tmp_path / "deb.example.org_dists_stable_main_binary-i386_Packages").write_text(MAIN_I386)
+    with gzip.open(
+        tmp_path / "deb.example.org_dists_updates_main_binary-amd64_Packages.gz", "wt"
+    ) as f:
+        f.write(UPDATES_AMD64)
+    return tmp_path
+
+
+def test_lookup_reports_versions_and_list_files(lists_dir):
+    catalog = PackageCatalog(str(lists_dir))
+
+    records = catalog.lookup("tool-a")
+    assert sorted(r["Version"] for r in records) == ["1.0-1", "1.1-1"]
+    assert {r["List-File"] for r in records} == {
+        "deb.example.org_dists_stable_main_binary-amd64_Packages",
+        "deb.example.org_dists_updates_main_binary-amd64_Packages.gz",
+    }
+
+
+def test_lookup_filters_architecture(lists_dir):
+    catalog = PackageCatalog(str(lists_dir))
+
+    assert len(catalog.lookup("libfoo")) == 2
+    assert [r["Architecture"] for r in catalog.lookup("libfoo", architecture="i386")] == ["i386"]
+
+
+def test_lookup_many_skips_unknown_names(lists_dir):
+    catalog = PackageCatalog(str(lists_dir))
+
+    found = catalog.lookup_many(["tool-a", "libfoo", "not-there"], fields={"Version"})
+    assert sorted(found) == ["libfoo", "tool-a"]
+    assert found["tool-a"] == catalog.lookup("tool-a", fields={"Version"})
+
+
+def test_get_parses_stanza(lists_dir):
+    catalog = PackageCatalog(str(lists_dir))
+    catalog.architecture = "amd64"
+
+    info = catalog.get("libfoo")
+    assert info["Architecture"] == "amd64"
+    assert info["Installed-Size"] == "300"
+    assert info["Description"] == "foo library\nLong description line."
+    assert catalog.get("missing") is None
+    assert "tool-a" in catalog
+    assert len(catalog) == 2
+
+
+def test_rebuilds_when_lists_change(lists_dir):
+    catalog = PackageCatalog(str(lists_dir))
+    assert "tool-b" not in catalog
+
+    new_list = lists_dir / "deb.example.org_dists_stable_contrib_binary-amd64_Packages"
+    new_list.write_text("Package: tool-b\nVersion: 0.1\nArchitecture: all\n")
+    st = os.stat(lists_dir)
+    os.utime(lists_dir, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert "tool-b" in catalog
+    assert catalog.get("tool-b")["Version"] == "0.1"
+
+
+def test_empty_lists_dir(tmp_path):
+    catalog = PackageCatalog(str(tmp_path / "missing"))
+    assert catalog.available() is False
+    assert catalog.lookup("tool-a") == []
+
+
+def test_get_returns_candidate_across_suites(tmp_path):
+    for suite, version in [
+        ("bookworm", "1.0-b2"),
+        ("bookworm-updates", "1.0-b3"),
+        ("bookworm-security", "1.0-b4"),
+    ]:
+        (tmp_path / f"deb.debian.org_debian_dists_{suite}_main_binary-amd64_Packages").write_text(
+            f"Package: tool-a\nVersion: {version}\nArchitecture: amd64\n"
+        )
+    catalog = PackageCatalog(str(tmp_path))
+    catalog.architecture = "amd64"
+
+    # The highest version wins, not the first list file in sorted order
+    assert catalog.get("tool-a")["Version"] == "1.0-b4"
+    assert catalog.get("tool-a", fields=["Package"])["Version"] == "1.0-b4"
@@ -0,0 +1,117 @@
+import pytest
+from providers.apt_catalog import PackageCatalog
+from providers.apt_policy import AptPolicy
+
+STABLE = """Package: tool-a
+Version: 1.0-2
+Architecture: amd64
+
+Package: tool-b
+Version: 2.0-1
+Architecture: all
+
+Package: tool-c
+Version: 3.0-1
+Architecture: amd64
+"""
+
+BACKPORTS = """Package: tool-a
+Version: 1.5-1~bpo12+1
+Architecture: amd64
+
+Package: tool-c
+Version: 4.0-1~bpo12+1
+Architecture: amd64
+"""
+
+INSTALLED = {
+    "tool-a": {"Version": "1.0-1", "Architecture": "amd64"},
+    "tool-b": {"Version": "2.0-1", "Architecture": "all"},
+    "tool-c": {"Version": "3.0-1", "Architecture": "amd64"},
+}
+
+
+@pytest.fixture
+def lists_dir(tmp_path):
+    lists = tmp_path / "lists"
+    lists.mkdir()
+    (lists / "deb.debian.org_debian_dists_bookworm_main_binary-amd64_Packages").write_text(STABLE)
+    (lists / "deb.debian.org_debian_dists_bookworm_InRelease").write_text(
+        "-----BEGIN PGP SIGNED MESSAGE-----\nHash: SHA512\n\n"
+        "Origin: Debian\nSuite: stable\nCodename: bookworm\n"
+        "-----BEGIN PGP SIGNATURE-----\nabc\n-----END PGP SIGNATURE-----\n"
+    )
+    (
+        lists / "deb.debian.org_debian_dists_bookworm-backports_main_binary-amd64_Packages"
+    ).write_text(BACKPORTS)
+    (lists / "deb.debian.org_debian_dists_bookworm-backports_Release").write_text(
+        "Origin: Debian Backports\nSuite: stable-backports\nCodename: bookworm-backports\n"
+        "NotAutomatic: yes\nButAutomaticUpgrades: yes\n"
+    )
+    return lists
+
+
+def make_policy(lists_dir, tmp_path, preferences=""):
+    prefs = tmp_path / "preferences"
+    prefs.write_text(preferences)
+    return AptPolicy(
+        PackageCatalog(str(lists_dir)),
+        preferences_path=str(prefs),
+        preferences_dir=str(tmp_path / "preferences.d"),
+    )
+
+
+def test_upgradable_ignores_not_automatic_backports(lists_dir, tmp_path):
+    policy = make_policy(lists_dir, tmp_path)
+
+    updates = policy.upgradable(INSTALLED)
+
+    assert updates == [
+        {
+            "name": "tool-a",
+            "current_version": "1.0-1",
+            "candidate_version": "1.0-2",
+            "origin": "Debian",
+        }
+    ]
+
+
+def test_upgradable_honors_pins(lists_dir, tmp_path):
+    policy = make_policy(
+        lists_dir,
+        tmp_path,
+        "Package: tool-c\nPin: release n=bookworm-backports\nPin-Priority: 600\n\n"
+        "Package: tool-a\nPin: version 1.0*\nPin-Priority: 1001\n",
+    )
+
+    updates = {u["name"]: u for u in policy.upgradable(INSTALLED)}
+
+    assert updates["tool-c"]["candidate_version"] == "4.0-1~bpo12+1"
+    assert updates["tool-c"]["origin"] == "Debian Backports"
+    assert updates["tool-a"]["candidate_version"] == "1.0-2"
+    assert "tool-b" not in updates
+
+
+def test_negative_pin_blocks_candidate(lists_dir, tmp_path):
+    policy = make_policy(
+        lists_dir, tmp_path, "Package: tool-a\nPin: origin deb.debian.org\nPin-Priority: -1\n"
+    )
+    assert "tool-a" not in {u["name"] for u in policy.upgradable(INSTALLED)}
+
+
+def test_catalog_get_follows_pin_priorities(lists_dir, tmp_path):
+    policy = make_policy(lists_dir, tmp_path)
+    policy.catalog.architecture = "amd64"
+    policy.catalog.policy = policy
+
+    # Backports are NotAutomatic, so the stable version stays the candidate
+    assert policy.catalog.get("tool-c")["Version"] == "3.0-1"
+
+    pinned = make_policy(
+        lists_dir,
+        tmp_path,
+        "Package: tool-c\nPin: release a=stable-backports\nPin-Priority: 600\n",
+    )
+    pinned.catalog.architecture = "amd64"
+    pinned.catalog.policy = pinned
+    assert pinned.catalog.get("tool-c")["Version"] == "4.0-1~bpo12+1"
@@ -2,11 +2,17 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 from providers.apt import AptProvider
+from providers.apt_catalog import PackageCatalog
+from providers.dpkg_status import DpkgStatusIndex
 
 
 @pytest.fixture
-def apt_provider():
-    return AptProvider()
+def apt_provider(tmp_path):
+    # Point the indexes at missing files so the CLI fallbacks are exercised
+    return AptProvider(
+        dpkg_status=DpkgStatusIndex(str(tmp_path / "status")),
+        catalog=PackageCatalog(str(tmp_path / "lists")),
+    )
 
 
 def test_get_package_info_success(apt_provider):
@@ -45,3 +51,88 @@ def test_list_packages(apt_provider):
         mock_run.return_value = MagicMock(stdout=mock_output)
         packages = apt_provider.list_packages()
         assert packages == ["pkg1", "pkg2", "pkg3"]
+
+
+def test_is_installed_uses_dpkg_index(tmp_path):
+    status = tmp_path / "status"
+    status.write_text("Package: test-pkg\nStatus: install ok installed\nVersion: 1.0\n")
+    provider = AptProvider(
+        dpkg_status=DpkgStatusIndex(str(status)), catalog=PackageCatalog(str(tmp_path / "lists"))
+    )
+    with patch("subprocess.run") as mock_run:
+        assert provider.is_installed("test-pkg") is True
+        assert provider.is_installed("other-pkg") is False
+        mock_run.assert_not_called()
+
+
+def test_get_package_info_uses_catalog(tmp_path):
+    lists = tmp_path / "lists"
+    lists.mkdir()
+    (lists / "deb.example.org_dists_stable_main_binary-amd64_Packages").write_text(
+        "Package: test-pkg\nVersion: 2.0\nArchitecture: all\n"
+    )
+    provider = AptProvider(
+        dpkg_status=DpkgStatusIndex(str(tmp_path / "status")), catalog=PackageCatalog(str(lists))
+    )
+    with patch("subprocess.run") as mock_run:
+        assert provider.get_package_info("test-pkg")["Version"] == "2.0"
+        assert provider.get_package_info("unknown-pkg") is None
+        assert provider.list_packages("test") == ["test-pkg"]
+        mock_run.assert_not_called()
+
+
+def test_get_package_info_many_single_fork(apt_provider):
+    mock_output = "Package: pkg-a\nVersion: 2.0\n\nPackage: pkg-b\nVersion: 3.0\n"
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(stdout=mock_output)
+        infos = apt_provider.get_package_info_many(["pkg-a", "pkg-b", "pkg-missing"])
+
+        mock_run.assert_called_once()
+        assert mock_run.call_args[0][0] == ["apt-cache", "show", "pkg-a", "pkg-b", "pkg-missing"]
+        assert infos["pkg-a"]["Version"] == "2.0"
+        assert infos["pkg-b"]["Version"] == "3.0"
+        assert infos["pkg-missing"] is None
+
+
+def test_get_package_info_many_picks_the_policy_candidate(apt_provider):
+    show = (
+        "Package: pkg-a\nVersion: 1.0\n\n"
+        "Package: pkg-a\nVersion: 2.0\n\n"
+        "Package: pkg-b\nVersion: 3.0~rc1\n\n"
+        "Package: pkg-b\nVersion: 3.0\n"
+    )
+    # pkg-a is pinned to the older version; the policy knows nothing about pkg-b
+    policy = "pkg-a:\n  Installed: (none)\n  Candidate: 1.0\n  Version table:\n     2.0 100\n"
+    with patch("subprocess.run") as mock_run:
+        mock_run.side_effect = [MagicMock(stdout=show), MagicMock(stdout=policy)]
+        infos = apt_provider.get_package_info_many(["pkg-a", "pkg-b"])
+
+        assert mock_run.call_args[0][0] == ["apt-cache", "policy", "pkg-a", "pkg-b"]
+        assert infos["pkg-a"]["Version"] == "1.0"
+        assert infos["pkg-b"]["Version"] == "3.0"
+
+
+def test_is_installed_many_single_fork(apt_provider):
+    mock_output = "pkg-a\tinstall ok installed\npkg-b\tdeinstall ok config-files\n"
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(stdout=mock_output)
+        states = apt_provider.is_installed_many(["pkg-a", "pkg-b", "pkg-c"])
+
+        mock_run.assert_called_once()
+        assert states == {"pkg-a": True, "pkg-b": False, "pkg-c": False}
+
+
+def test_get_updates_cli_fallback(apt_provider):
+    mock_output = """Listing... Done
+bash/stable-updates 5.2.15-2+b3 amd64 [upgradable from: 5.2.15-2+b2]
+"""
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(stdout=mock_output)
+        assert apt_provider.get_updates() == [
+            {
+                "name": "bash",
+                "current_version": "5.2.15-2+b2",
+                "candidate_version": "5.2.15-2+b3",
+                "origin": "stable-updates",
+            }
+        ]
@@ -0,0 +1,69 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from providers.apt_simulator import AptSimulator, parse_simulation
+
+SIMULATION = """Reading package lists...
+Building dependency tree...
+The following packages will be REMOVED:
+  ctxos-desktop
+Remv ctxos-desktop [1.0.0]
+Inst libssl3 [3.0.11-1] (3.0.13-1 Debian:12.5/stable [amd64])
+Inst ctxos-server (1.0.0 CtxOS:stable [all])
+Conf libssl3 (3.0.13-1 Debian:12.5/stable [amd64])
+Conf ctxos-server (1.0.0 CtxOS:stable [all])
+"""
+
+
+@pytest.fixture
+def apt_provider():
+    provider = MagicMock()
+    provider.dpkg.current_stamp.return_value = ("status", 1)
+    provider.catalog.current_stamp.return_value = ("lists", 1)
+    return provider
+
+
+def test_parse_simulation():
+    assert parse_simulation(SIMULATION) == {
+        "install": [{"name": "ctxos-server", "version": "1.0.0"}],
+        "upgrade": [{"name": "libssl3", "version": "3.0.13-1", "from": "3.0.11-1"}],
+        "remove": ["ctxos-desktop"],
+        "configure": ["libssl3", "ctxos-server"],
+    }
+
+
+def test_simulate_is_cached_until_the_system_changes(apt_provider):
+    simulator = AptSimulator(apt_provider)
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(stdout=SIMULATION, stderr="", returncode=0)
+
+        first = simulator.simulate(install=["ctxos-server"], remove=["ctxos-desktop"])
+        again = simulator.simulate(install=["ctxos-server"], remove=["ctxos-desktop"])
+        assert mock_run.call_count == 1
+        assert again is first
+        assert first["success"]
+        assert mock_run.call_args[0][0] == [
+            "apt-get",
+            "-s",
+            "-q",
+            "install",
+            "ctxos-server",
+            "ctxos-desktop-",
+        ]
+
+        apt_provider.dpkg.current_stamp.return_value = ("status", 2)
+        simulator.simulate(install=["ctxos-server"], remove=["ctxos-desktop"])
+        assert mock_run.call_count == 2
+
+
+def test_simulate_reports_apt_errors(apt_provider):
+    simulator = AptSimulator(apt_provider)
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(
+            stdout="", stderr="E: Unable to locate package nothere\n", returncode=100
+        )
+        result = simulator.simulate(install=["nothere"])
+
+    assert not result["success"]
+    assert result["error"] == "Unable to locate package nothere"
+    assert result["install"] == []
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+from providers.asset_cache import AssetCache
+
+IMAGE = b"\x89PNG\r\n\x1a\n" + b"screenshot" * 1000
+
+
+class AssetHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connections can be reused
+    requests = []
+    connections = set()
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with AssetHandler.lock:
+            AssetHandler.requests.append((self.path, self.headers.get("If-None-Match")))
+            AssetHandler.connections.add(self.client_address)
+            AssetHandler.active += 1
+            AssetHandler.peak = max(AssetHandler.peak, AssetHandler.active)
+        try:
+            if self.path == "/moved.png":
+                self.send_response(301)
+                self.send_header("Location", "/shot.png")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif self.path == "/unsized.png":
+                self.send_response(200)
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.wfile.write(IMAGE)
+                self.close_connection = True
+            elif self.path == "/missing.png":
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+            else:
+                time.sleep(0.02)
+                self.send_response(200)
+                self.send_header("ETag", '"v1"')
+                self.send_header("Content-Length", str(len(IMAGE)))
+                self.end_headers()
+                self.wfile.write(IMAGE)
+        finally:
+            with AssetHandler.lock:
+                AssetHandler.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    AssetHandler.requests = []
+    AssetHandler.connections = set()
+    AssetHandler.peak = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), AssetHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def assets(tmp_path):
+    cache = AssetCache(cache_dir=str(tmp_path), max_downloads=2)
+    yield cache
+    cache.close()
+
+
+def test_assets_are_stored_by_content(server, assets):
+    first = assets.fetch(f"{server}/shot.png")
+    # Same bytes behind a redirect and another URL share one file
+    second = assets.fetch(f"{server}/moved.png")
+    third = assets.fetch(f"{server}/copy.png")
+
+    assert first == second == third
+    with open(first, "rb") as f:
+        assert f.read() == IMAGE
+    assert assets.fetch(f"{server}/missing.png") is None
+    # Downloads went over a single kept-alive connection
+    assert len(AssetHandler.connections) == 1
+
+
+def test_fresh_assets_are_not_refetched_and_stale_ones_revalidated(server, assets):
+    url = f"{server}/shot.png"
+    path = assets.fetch(url)
+    assert assets.fetch(url) == path
+    assert len(AssetHandler.requests) == 1
+
+    assert assets.fetch(url, revalidate=True) == path
+    assert AssetHandler.requests[-1] == ("/shot.png", '"v1"')
+
+
+def test_cached_copy_served_when_offline(server, assets):
+    url = f"{server}/shot.png"
+    path = assets.fetch(url)
+
+    with patch.object(assets.pool, "get", side_effect=OSError("offline")):
+        assert assets.fetch(url, revalidate=True) == path
+
+
+def test_prefetch_is_bounded_and_localizes_details(server, assets):
+    urls = [f"{server}/shot-{i}.png" for i in range(8)]
+
+    # Nothing cached yet: remote URLs are kept and a download is scheduled
+    assert assets.localize(urls[:1]) == urls[:1]
+    for future in assets.prefetch(urls):
+        future.result(timeout=10)
+
+    assert AssetHandler.peak <= 2
+    localized = assets.localize(urls)
+    assert all(uri.startswith("file://") for uri in localized)
+    assert os.path.exists(localized[0][len("file://") :])
+
+
+def test_oversized_assets_are_refused(server, tmp_path):
+    cache = AssetCache(cache_dir=str(tmp_path), max_bytes=len(IMAGE) - 1)
+    try:
+        assert cache.fetch(f"{server}/shot.png") is None
+        assert cache.fetch(f"{server}/unsized.png") is None
+    finally:
+        cache.close()
+    assert not os.listdir(tmp_path / "objects")
+
+
+def test_localized_assets_are_served_by_name(server, assets):
+    url = f"{server}/shot.png"
+    path = assets.fetch(url)
+
+    # HTTP frontends get a link under the asset route instead of a file path
+    (link,) = assets.localize([url], base_url="http://localhost:8000/api/v1/assets")
+    name = link.rpartition("/")[2]
+    assert link == f"http://localhost:8000/api/v1/assets/{name}"
+    assert assets.resolve(name) == (path, "image/png")
+
+    assert assets.resolve("../../etc/passwd") is None
+    assert assets.resolve("0" * 64) is None
+
+
+def test_thumbnail_workers_are_not_forked():
+    cache = AssetCache(cache_dir="/nonexistent")
+    try:
+        assert cache._thumbnail_pool()._mp_context.get_start_method() == "forkserver"
+    finally:
+        cache.close()
@@ -0,0 +1,76 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from common.cache import MetadataCache
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    cache = MetadataCache(max_entries=3, stripes=1)
+    for key in "abc":
+        cache.set(key, key.upper())
+    assert cache.get("a") == "A"  # a is now the most recently used
+
+    cache.set("d", "D")
+
+    assert "b" not in cache
+    assert [cache.get(key) for key in "acd"] == ["A", "C", "D"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_their_ttl():
+    cache = MetadataCache(ttl=10, negative_ttl=1)
+    with patch("common.cache.time.monotonic", return_value=100.0):
+        cache.set("found", {"name": "Found"})
+        cache.set("missing", None)
+    with patch("common.cache.time.monotonic", return_value=105.0):
+        assert cache.get("found") == {"name": "Found"}
+        assert "missing" not in cache
+    with patch("common.cache.time.monotonic", return_value=111.0):
+        assert cache.get("found") is None
+
+
+def test_negative_results_are_cached_and_counted():
+    cache = MetadataCache()
+    loader = MagicMock(return_value={})
+
+    assert cache.get_or_load("libc6", loader) == {}
+    assert cache.get_or_load("libc6", loader) == {}
+
+    loader.assert_called_once_with("libc6")
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["negative_hits"] == 1
+    # Negatives are not worth persisting
+    assert cache.items() == []
+
+
+def test_memory_pressure_shrinks_and_regrows_the_bound():
+    cache = MetadataCache(max_entries=64, min_entries=8, stripes=4)
+    cache.PRESSURE_INTERVAL = 0
+    with patch("common.cache.psutil.virtual_memory", return_value=MagicMock(percent=95)):
+        for i in range(64):
+            cache.set(i, i)
+
+    assert cache.stats()["limit"] == 8
+    assert len(cache) <= 8
+
+    with patch("common.cache.psutil.virtual_memory", return_value=MagicMock(percent=40)):
+        cache.set("calm", 1)
+    assert cache.stats()["limit"] == 16
+
+
+def test_concurrent_access_stays_bounded():
+    cache = MetadataCache(max_entries=128, stripes=8)
+
+    def worker(offset):
+        for i in range(2000):
+            cache.get_or_load((offset + i) % 500, lambda key: {"key": key})
+
+    threads = [threading.Thread(target=worker, args=(n * 50,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert len(cache) <= 128
+    assert stats["hits"] + stats["misses"] == 16000
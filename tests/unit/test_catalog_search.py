@@ -0,0 +1,161 @@
+import os
+from unittest.mock import MagicMock
+
+import pytest
+from providers.apt_catalog import PackageCatalog
+from providers.catalog_search import CatalogSearch
+from providers.meta import MetaProvider
+
+PACKAGES = """Package: aircrack-ng
+Version: 1.7
+Architecture: amd64
+Section: net
+Description: wireless WEP/WPA cracking utilities
+ aircrack-ng is an 802.11a/b/g WEP/WPA cracking program.
+
+Package: ctxos-desktop
+Version: 1.0
+Architecture: all
+Section: metapackages
+Description: CtxOS desktop profile
+
+Package: ctxos-tools-osint
+Version: 1.0
+Architecture: all
+Section: metapackages
+Description: CtxOS open source intelligence stack
+"""
+
+DESKTOP = """[Desktop Entry]
+Name=aircrack-ng
+Comment=Crack wireless keys
+Keywords=wifi;handshake;
+Type=Application
+Categories=06-wireless-attacks;
+X-Ctxos-Package=aircrack-ng
+"""
+
+
+def write_list(lists_dir, name, content):
+    tmp = lists_dir / (name + ".new")
+    tmp.write_text(content)
+    os.replace(tmp, lists_dir / name)
+
+
+@pytest.fixture
+def unbuilt(tmp_path):
+    lists = tmp_path / "lists"
+    lists.mkdir()
+    write_list(lists, "example.org_dists_stable_main_binary-amd64_Packages", PACKAGES)
+    applications = tmp_path / "applications"
+    applications.mkdir()
+    (applications / "ctxos-aircrack-ng.desktop").write_text(DESKTOP)
+
+    apt = MagicMock()
+    apt.catalog = PackageCatalog(str(lists))
+    flatpak = MagicMock()
+    flatpak.appstream.sources.return_value = [("flathub", "x86_64", "abc", "/x")]
+    flatpak.appstream.available.return_value = True
+    flatpak.appstream.entries.return_value = [
+        {
+            "id": "org.kismetwireless.Kismet",
+            "name": "Kismet",
+            "summary": "Wireless network detector",
+            "description": "",
+            "keywords": ["wifi"],
+            "categories": ["Network"],
+            "remote": "flathub",
+        }
+    ]
+    flatpak.list_apps.return_value = []
+    dep11 = MagicMock()
+    dep11.current_stamp.return_value = "dep11-1"
+    dep11.packages.return_value = {}
+
+    return CatalogSearch(apt, flatpak, MetaProvider(apt), dep11, desktop_dirs=[str(applications)])
+
+
+@pytest.fixture
+def search(unbuilt):
+    unbuilt.update()
+    return unbuilt
+
+
+def test_queries_do_not_wait_for_the_first_build(unbuilt):
+    assert unbuilt.search("wifi") == []
+    assert unbuilt.list_category("security") == []
+    unbuilt.dep11.packages.assert_not_called()
+
+    unbuilt.update()
+    assert unbuilt.search("wifi")
+
+
+def test_search_spans_every_source(search):
+    results = search.search("wifi")
+    # Desktop keywords count for the package they name
+    assert {(r["id"], r["type"]) for r in results} == {
+        ("aircrack-ng", "package"),
+        ("org.kismetwireless.Kismet", "flatpak"),
+        ("ctxos-tools-wireless", "profile"),
+    }
+    # Profiles come from the profile definitions, stacks from the archive
+    assert search.search("desktop")[0] == {
+        "id": "ctxos-desktop",
+        "name": "Desktop Environment",
+        "description": "A full-featured desktop environment with productivity tools.",
+        "type": "profile",
+        "repo": "ctxos",
+        "score": search.search("desktop")[0]["score"],
+    }
+    assert search.search("intelligence")[0]["type"] == "stack"
+
+
+def test_only_changed_sources_are_reindexed(search, tmp_path):
+    search.update()
+    search.index.update = MagicMock(wraps=search.index.update)
+
+    assert search.update() == 0
+    search.index.update.assert_not_called()
+
+    # New appstream data for one package re-reads only that package
+    search.dep11.current_stamp.return_value = "dep11-2"
+    search.dep11.packages.return_value = {
+        "aircrack-ng": {"name": "Aircrack-ng", "summary": "", "keywords": ["wpa2"]}
+    }
+    assert search.update() == 1
+    assert list(search.index.update.call_args[0][0]) == ["apt:aircrack-ng"]
+    assert search.search("wpa2")[0]["name"] == "Aircrack-ng"
+
+    # A rewritten list re-reads the packages it carries
+    write_list(
+        tmp_path / "lists",
+        "example.org_dists_stable_main_binary-amd64_Packages",
+        PACKAGES.replace("open source intelligence", "reconnaissance"),
+    )
+    search.update()
+    assert search.search("intelligence") == []
+    assert search.search("reconnaissance")[0]["id"] == "ctxos-tools-osint"
+
+
+def test_categories_list_applications_and_profiles(search, tmp_path):
+    security = search.list_category("security")
+    # aircrack-ng is filed through its menu entry; libraries without one are not listed
+    assert {app["id"] for app in security} == {
+        "aircrack-ng",
+        "ctxos-tools-automotive",
+        "ctxos-tools-forensics",
+        "ctxos-tools-osint",
+        "ctxos-tools-reversing",
+        "ctxos-tools-web",
+        "ctxos-tools-wireless",
+    }
+    assert [app["id"] for app in search.list_category("system")] == ["ctxos-desktop"]
+
+    # A rewritten list drops what left the archive
+    write_list(
+        tmp_path / "lists",
+        "example.org_dists_stable_main_binary-amd64_Packages",
+        PACKAGES.split("\n\n")[1],
+    )
+    search.update()
+    assert "aircrack-ng" not in {app["id"] for app in search.list_category("security")}
@@ -0,0 +1,91 @@
+import pytest
+from providers.apt_catalog import PackageCatalog
+from providers.catalog_snapshot import CatalogSnapshot
+from providers.dpkg_status import DpkgStatusIndex
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "cache" / "catalog.snap")
+
+
+def test_roundtrip_validates_stamps(snapshot_path):
+    snapshot = CatalogSnapshot(snapshot_path)
+    snapshot.put("dpkg", ("status", 1), {"pkg-a": {"Version": "1.0"}})
+    assert snapshot.save() is True
+
+    reloaded = CatalogSnapshot(snapshot_path)
+    assert reloaded.get("dpkg", ("status", 1)) == {"pkg-a": {"Version": "1.0"}}
+    assert reloaded.get("dpkg", ("status", 2)) is None
+    assert reloaded.get("packages", ("status", 1)) is None
+
+
+def test_save_keeps_untouched_sections(snapshot_path):
+    snapshot = CatalogSnapshot(snapshot_path)
+    snapshot.put("dpkg", "s1", [1, 2, 3])
+    snapshot.put("flatpak", "f1", [{"id": "org.example.App"}])
+    snapshot.save()
+
+    snapshot.put("dpkg", "s2", [4])
+    snapshot.save()
+
+    reloaded = CatalogSnapshot(snapshot_path)
+    assert reloaded.get("dpkg", "s2") == [4]
+    assert reloaded.get("flatpak", "f1") == [{"id": "org.example.App"}]
+
+
+def test_user_snapshot_falls_back_to_the_system_one(snapshot_path, tmp_path):
+    system_path = str(tmp_path / "system" / "catalog.snap")
+    system = CatalogSnapshot(system_path)
+    system.put("packages", "p1", {"from": "system"})
+    system.put("dpkg", "s1", {"from": "system"})
+    system.save()
+
+    user = CatalogSnapshot(snapshot_path, fallback_path=system_path)
+    assert user.get("packages", "p1") == {"from": "system"}
+
+    # Sections the user process rebuilt win over the system ones
+    user.put("dpkg", "s2", {"from": "user"})
+    user.save()
+    assert user.get("dpkg", "s2") == {"from": "user"}
+    assert user.get("dpkg", "s1") == {"from": "system"}
+    assert user.get("packages", "p2") is None
+
+
+def test_ignores_corrupt_or_foreign_files(snapshot_path, tmp_path):
+    (tmp_path / "cache").mkdir()
+    with open(snapshot_path, "wb") as f:
+        f.write(b"not a snapshot at all")
+
+    snapshot = CatalogSnapshot(snapshot_path)
+    assert snapshot.get("dpkg", "s1") is None
+
+    # A corrupt file is simply replaced on the next save
+    snapshot.put("dpkg", "s1", {"ok": True})
+    assert snapshot.save() is True
+    assert CatalogSnapshot(snapshot_path).get("dpkg", "s1") == {"ok": True}
+
+
+def test_catalog_and_dpkg_indexes_restore_from_snapshot(snapshot_path, tmp_path):
+    lists = tmp_path / "lists"
+    lists.mkdir()
+    (lists / "deb.example.org_dists_stable_main_binary-amd64_Packages").write_text(
+        "Package: tool-a\nVersion: 1.0\nArchitecture: all\n\nPackage: tool-b\nVersion: 2.0\n"
+    )
+    status = tmp_path / "status"
+    status.write_text("Package: tool-a\nStatus: install ok installed\nVersion: 1.0\n")
+
+    snapshot = CatalogSnapshot(snapshot_path)
+    snapshot.put("packages", *PackageCatalog(str(lists)).export_index())
+    snapshot.put("dpkg", *DpkgStatusIndex(str(status)).export())
+    snapshot.save()
+
+    catalog = PackageCatalog(str(lists))
+    dpkg = DpkgStatusIndex(str(status))
+    reloaded = CatalogSnapshot(snapshot_path)
+    lists_stamp = catalog.current_stamp()
+    assert catalog.restore_index(lists_stamp, reloaded.get("packages", lists_stamp))
+    dpkg.restore(dpkg.current_stamp(), reloaded.get("dpkg", dpkg.current_stamp()))
+
+    assert catalog.get("tool-b")["Version"] == "2.0"
+    assert dpkg.is_installed("tool-a") is True
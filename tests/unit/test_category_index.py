@@ -0,0 +1,31 @@
+from providers.category_index import CategoryIndex, classify
+
+
+def test_classify_maps_sections_appstream_and_menu_categories():
+    assert classify(["devel"]) == {"development"}
+    assert classify(["contrib/video", "AudioVideo"]) == {"media"}
+    assert classify(["Development", "IDE", "System"]) == {"development", "system"}
+    # CtxOS menu categories, top-level or nested
+    assert classify(["06-wireless-attacks"]) == {"security"}
+    assert classify(["01-01-dns-analysis", "01-info-gathering"]) == {"security"}
+    assert classify(["14-services"]) == {"server"}
+    assert classify(["net", "misc", "Network", "metapackages"]) == set()
+
+
+def test_members_follow_updates_and_removals():
+    index = CategoryIndex()
+    assert index.update({"apt:nmap": ["net", "01-04-network-scanners"], "apt:gdb": ["devel"]}) == 2
+    assert index.members("security") == {"apt:nmap"}
+    assert index.members("development") == {"apt:gdb"}
+    assert index.members("unknown") == set()
+
+    # Unchanged categories are no change; recategorized entries move
+    assert index.update({"apt:nmap": ["01-info-gathering"]}) == 0
+    index.update({"apt:gdb": ["debug", "Security"]})
+    assert index.categories("apt:gdb") == {"development", "security"}
+    assert index.members("security") == {"apt:nmap", "apt:gdb"}
+
+    index.update(removed=["apt:nmap", "apt:gdb"])
+    assert index.counts() == dict.fromkeys(
+        ["system", "development", "media", "server", "security"], 0
+    )
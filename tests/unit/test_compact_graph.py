@@ -0,0 +1,86 @@
+from providers.compact_graph import CompactGraph, GraphBuilder
+
+
+def build(packages):
+    builder = GraphBuilder()
+    for name, deps in packages.items():
+        builder.add_package(name, "1.0", [[(dep, None, None)] for dep in deps])
+    return builder.build()
+
+
+def names(graph, ids):
+    return sorted(graph.names[i] for i in ids)
+
+
+def test_adjacency_and_missing_nodes():
+    graph = build({"a": ["b", "c"], "b": ["c"], "c": []})
+    graph = graph.patched({"c": ("2.0", [[("d", ">=", "1.0"), ("e", None, None)]])})
+
+    a, c, d = graph.ids["a"], graph.ids["c"], graph.ids["d"]
+    assert names(graph, graph.successors(a)) == ["b", "c"]
+    assert names(graph, graph.predecessors(c)) == ["a", "b"]
+    e = graph.ids["e"]
+    assert list(graph.edges(c)) == [(d, ">=", "1.0"), (e, None, None)]
+    assert graph.groups(c) == [[(d, ">=", "1.0"), (e, None, None)]]
+    assert graph.groups(a) == [[(graph.ids["b"], None, None)], [(c, None, None)]]
+    assert graph.versions[c] == "2.0"
+    assert graph.versions[d] is None
+    assert graph.edge_count == 5
+
+
+def test_closures_report_levels():
+    graph = build({"a": ["b"], "b": ["c"], "c": [], "x": ["c"]})
+
+    order, levels = graph.closure([graph.ids["a"]])
+    assert [graph.names[i] for i in order] == ["a", "b", "c"]
+    assert levels == 3
+
+    order, levels = graph.reverse_closure([graph.ids["c"]])
+    assert names(graph, order) == ["a", "b", "c", "x"]
+    assert levels == 3
+
+
+def test_cycles_on_deep_chain():
+    depth = 5000
+    packages = {f"p{i}": [f"p{i + 1}"] for i in range(depth)}
+    packages[f"p{depth}"] = ["p0"]
+    packages["tail"] = []
+    graph = build(packages)
+
+    (cycle,) = graph.cycles()
+    assert len(cycle) == depth + 1
+
+
+def test_patched_drops_removed_packages():
+    graph = build({"a": ["b"], "b": []})
+    graph = graph.patched({"b": None})
+    assert graph.versions[graph.ids["b"]] is None
+
+    graph = graph.patched({"a": None})
+    assert len(graph) == 0
+    assert len(CompactGraph.empty()) == 0
+
+
+def test_patched_keeps_ids_and_leaves_the_original_untouched():
+    packages = {f"p{i}": [f"p{i + 1}"] for i in range(20)}
+    original = build(packages)
+    p5, p6, p7 = (original.ids[name] for name in ("p5", "p6", "p7"))
+
+    graph = original.patched({"p6": ("2.0", [[("new", None, None)]]), "p19": None})
+    assert (graph.ids["p5"], graph.ids["p6"], graph.ids["p7"]) == (p5, p6, p7)
+    assert names(graph, graph.successors(p6)) == ["new"]
+    assert names(graph, graph.predecessors(graph.ids["new"])) == ["p6"]
+    assert graph.predecessors(p7) == []
+    assert "p19" in graph  # still depended on by p18, so kept as a missing node
+    assert names(original, original.successors(p6)) == ["p7"]
+    assert names(original, original.predecessors(p7)) == ["p6"]
+
+
+def test_patched_compacts_once_many_slots_are_unused():
+    graph = build({f"p{i}": [] for i in range(16)})
+    graph = graph.patched({"p0": None, "p1": None})
+    assert len(graph.names) == 16 and len(graph) == 14
+
+    graph = graph.patched({"p2": None})
+    assert len(graph.names) == len(graph) == 13
+    assert sorted(graph.ids) == sorted(f"p{i}" for i in range(3, 16))
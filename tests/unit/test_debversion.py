@@ -0,0 +1,79 @@
+import random
+
+import pytest
+from common.deb822 import parse_relations
+from providers.debversion import (
+    compare_versions,
+    satisfies,
+    sort_versions,
+    split_version,
+    version_sort_key,
+)
+
+
+@pytest.mark.parametrize(
+    "a, b, expected",
+    [
+        ("1.0", "1.0", 0),
+        ("1.0", "1.0-0", 0),
+        ("0:1.0", "1.0", 0),
+        ("1.0", "1.00", 0),
+        ("1.0", "1.1", -1),
+        ("1.10", "1.9", 1),
+        ("1:0.1", "2.0", 1),
+        ("1.0~rc1", "1.0", -1),
+        ("1.0~~", "1.0~", -1),
+        ("1.0~", "1.0", -1),
+        ("1.0", "1.0a", -1),
+        ("1.0a", "1.0+", -1),
+        ("1.0+dfsg", "1.0.1", -1),
+        ("2.30-1ubuntu1", "2.30-1", 1),
+        ("1.2-3", "1.2-10", -1),
+        ("7.6p2-4", "7.6-0", 1),
+        ("1.0.0", "1.0", 1),
+        ("0.0.9", "0.0.10", -1),
+        ("1.2.3-1~deb12u1", "1.2.3-1", -1),
+    ],
+)
+def test_compare_versions_matches_dpkg(a, b, expected):
+    assert compare_versions(a, b) == expected
+    assert compare_versions(b, a) == -expected
+
+
+def test_split_version():
+    assert split_version("2:1.2-3-4") == (2, "1.2-3", "4")
+    assert split_version("1.2") == (0, "1.2", "")
+
+
+def test_sort_versions():
+    ordered = ["1.0~alpha", "1.0~beta", "1.0", "1.0-1", "1.0a", "1.0+b1", "1.1", "1:0.1"]
+    shuffled = list(ordered)
+    random.Random(4).shuffle(shuffled)
+    assert sort_versions(shuffled) == ordered
+
+
+def test_sort_key_is_memoized():
+    version = "".join(["3.14", "-2"])
+    assert version_sort_key(version) is version_sort_key("3.14-2")
+
+
+def test_satisfies():
+    assert satisfies("1.2", ">=", "1.0")
+    assert satisfies("1.0", "<<", "1.0.1")
+    assert not satisfies("1.0~rc1", ">=", "1.0")
+    assert satisfies("2:1.0", "=", "2:1.0-0")
+    assert satisfies("1.0", ">", "1.0")  # obsolete form of >=
+    with pytest.raises(ValueError):
+        satisfies("1.0", "!=", "1.0")
+
+
+def test_parse_relations():
+    groups = parse_relations("liba (>= 1.0), libb:any | libc [amd64], libd (<<2)")
+    assert [[alt["name"] for alt in group] for group in groups] == [
+        ["liba"],
+        ["libb", "libc"],
+        ["libd"],
+    ]
+    assert groups[0][0]["op"] == ">=" and groups[0][0]["version"] == "1.0"
+    assert groups[1][0]["arch"] == "any"
+    assert groups[2][0]["op"] == "<<" and groups[2][0]["version"] == "2"
@@ -0,0 +1,150 @@
+import gzip
+import logging
+import os
+from unittest.mock import patch
+
+import pytest
+from providers.appstream import AppStreamProvider
+from providers.dep11 import Dep11Index
+
+YAML_CATALOG = """---
+File: DEP-11
+Version: '0.16'
+Origin: debian-bookworm-main
+MediaBaseUrl: https://appstream.debian.org/media/pool
+---
+Type: desktop-application
+ID: org.wireshark.Wireshark
+Package: wireshark
+Name:
+  C: Wireshark
+  de: Wireshark
+Summary:
+  C: Network traffic analyzer
+Description:
+  C: >-
+    <p>Wireshark is a network "sniffer".</p>
+    <ul><li>Live capture</li><li>Offline analysis</li></ul>
+Categories:
+- Network
+- Monitor
+Keywords:
+  C:
+  - packet
+  - capture
+Icon:
+  cached:
+  - name: wireshark_org.wireshark.Wireshark.png
+    width: 64
+    height: 64
+  stock: org.wireshark.Wireshark
+Screenshots:
+- default: true
+  source-image:
+    url: org/wireshark/screenshot-1.png
+    width: 1280
+    height: 720
+ProjectLicense: GPL-2.0+
+Releases:
+- version: 4.0.11
+  unix-timestamp: 1700000000
+"""
+
+XML_CATALOG = """<?xml version="1.0" encoding="UTF-8"?>
+<components version="0.14" origin="ctxos-main">
+  <component type="desktop-application">
+    <id>nmap.desktop</id>
+    <pkgname>zenmap</pkgname>
+    <name>Zenmap</name>
+    <summary>Nmap frontend</summary>
+    <categories><category>Network</category></categories>
+  </component>
+</components>
+"""
+
+
+def write_catalog(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, "wt") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def catalogs(tmp_path):
+    yaml_dir = str(tmp_path / "app-info" / "yaml")
+    xml_dir = str(tmp_path / "app-info" / "xmls")
+    write_catalog(os.path.join(yaml_dir, "debian-bookworm-main.yml.gz"), YAML_CATALOG)
+    write_catalog(os.path.join(xml_dir, "ctxos-main.xml.gz"), XML_CATALOG)
+    return ((yaml_dir, ("*.yml.gz",)), (xml_dir, ("*.xml.gz",)))
+
+
+def test_lookup_by_package_and_component_id(catalogs, tmp_path):
+    index = Dep11Index(catalogs)
+
+    entry = index.get("wireshark")
+    assert entry == index.get("org.wireshark.Wireshark")
+    assert entry["name"] == "Wireshark"
+    assert entry["description"] == (
+        'Wireshark is a network "sniffer".\n\n- Live capture\n- Offline analysis'
+    )
+    assert entry["categories"] == ["Network", "Monitor"]
+    assert entry["keywords"] == ["packet", "capture"]
+    assert entry["screenshots"] == [
+        "https://appstream.debian.org/media/pool/org/wireshark/screenshot-1.png"
+    ]
+    assert entry["icon"] == str(
+        tmp_path
+        / "app-info"
+        / "icons"
+        / "debian-bookworm-main"
+        / "64x64"
+        / "wireshark_org.wireshark.Wireshark.png"
+    )
+    assert entry["version"] == "4.0.11"
+    assert index.get("zenmap")["id"] == "nmap"
+    assert index.get("not-a-package") is None
+
+
+def test_index_rebuilds_when_a_catalog_changes(catalogs):
+    index = Dep11Index(catalogs)
+    assert index.get("zenmap")["summary"] == "Nmap frontend"
+
+    xml_dir = catalogs[1][0]
+    write_catalog(
+        os.path.join(xml_dir, "ctxos-main.xml.gz"),
+        XML_CATALOG.replace("Nmap frontend", "Graphical Nmap frontend"),
+    )
+    # Catalogs are renamed into place, which bumps the directory stamp
+    os.utime(xml_dir, ns=(1, 1))
+
+    assert index.get("zenmap")["summary"] == "Graphical Nmap frontend"
+
+
+def test_yaml_catalogs_skipped_with_a_warning_without_pyyaml(catalogs, caplog):
+    index = Dep11Index(catalogs)
+
+    with patch("providers.dep11.HAS_YAML", False), caplog.at_level(logging.WARNING):
+        assert index.get("wireshark") is None
+        assert index.get("zenmap")["id"] == "nmap"
+        index.current_stamp()
+
+    warnings = [r.message for r in caplog.records if r.name == "ctxos.dep11"]
+    assert warnings == ["PyYAML is not installed; skipping 1 YAML DEP-11 catalogs"]
+
+
+def test_export_and_restore_round_trip(catalogs):
+    stamp, payload = Dep11Index(catalogs).export()
+
+    restored = Dep11Index(catalogs)
+    restored.restore(stamp, payload)
+
+    assert restored.get("wireshark")["name"] == "Wireshark"
+    assert restored._state[0] == stamp
+
+
+def test_appstream_metadata_served_from_index(catalogs):
+    provider = AppStreamProvider(debian_index=Dep11Index(catalogs))
+
+    assert provider.get_metadata("wireshark")["license"] == "GPL-2.0+"
+    # No placeholder text for packages without AppStream data
+    assert provider.get_metadata("libc6") == {}
@@ -0,0 +1,187 @@
+import os
+import threading
+
+import pytest
+from providers.apt_catalog import PackageCatalog
+from providers.dependency_graph import DependencyGraph
+from providers.relations import Relations
+
+MAIN = """Package: app
+Version: 1.0
+Architecture: all
+Depends: libfoo (>= 2.0), libbar
+
+Package: libfoo
+Version: 1.5
+Architecture: all
+Pre-Depends: libc6
+
+Package: libc6
+Version: 2.36
+Architecture: all
+"""
+
+EXTRA = """Package: libbar
+Version: 0.1
+Architecture: all
+"""
+
+
+def write_list(lists_dir, name, content):
+    tmp = lists_dir / (name + ".new")
+    tmp.write_text(content)
+    os.replace(tmp, lists_dir / name)
+
+
+@pytest.fixture
+def graph(tmp_path):
+    write_list(tmp_path, "example.org_dists_stable_main_binary-all_Packages", MAIN)
+    return DependencyGraph(PackageCatalog(str(tmp_path)))
+
+
+def test_resolve_from_catalog(graph):
+    result = graph.resolve("app")
+
+    assert sorted(result["dependencies"]) == ["libbar", "libfoo"]
+    assert result["total_packages"] == 4
+    assert result["missing"] == ["libbar"]
+    assert result["unsatisfied"] == [
+        {"package": "app", "dependency": "libfoo", "required": ">= 2.0", "available": "1.5"}
+    ]
+
+
+def test_unknown_package_is_missing(graph):
+    result = graph.resolve("nope")
+    assert result["missing"] == ["nope"]
+    assert result["total_packages"] == 1
+
+
+def test_patches_only_changed_lists(graph, tmp_path):
+    graph.resolve("app")
+    write_list(tmp_path, "example.org_dists_extra_main_binary-all_Packages", EXTRA)
+
+    read = []
+    original = graph._read
+    graph._read = lambda name: (read.append(name), original(name))[1]
+    result = graph.resolve("app")
+
+    assert read == ["libbar"]
+    assert result["missing"] == []
+
+    os.remove(tmp_path / "example.org_dists_extra_main_binary-all_Packages")
+    assert graph.resolve("app")["missing"] == ["libbar"]
+
+
+def test_reverse_dependencies(graph):
+    assert graph.reverse_dependencies("libc6") == ["app", "libfoo"]
+    assert graph.reverse_dependencies("app") == []
+
+
+def test_cycles(graph, tmp_path):
+    write_list(
+        tmp_path,
+        "example.org_dists_extra_main_binary-all_Packages",
+        "Package: libbar\nVersion: 0.1\nArchitecture: all\nDepends: app\n\n"
+        "Package: selfish\nVersion: 1\nArchitecture: all\nDepends: selfish\n",
+    )
+    assert graph.cycles() == [["app", "libbar"], ["selfish"]]
+
+
+def test_concurrent_resolves_agree(graph):
+    expected = graph.resolve("app")
+    results = []
+
+    def worker():
+        for _ in range(50):
+            results.append(graph.resolve("app"))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert all(r == expected for r in results)
+
+
+RELATIONS = """Package: newmta
+Version: 2.0
+Architecture: all
+Provides: mail-transport-agent
+Conflicts: mail-transport-agent
+Replaces: mail-transport-agent
+
+Package: tool
+Version: 1.0
+Architecture: all
+Depends: libx | libvirtual
+Breaks: oldtool (<< 2.0)
+
+Package: libprov
+Version: 1.0
+Architecture: all
+Provides: libvirtual
+"""
+
+INSTALLED = {
+    "exim": {"Version": "4.96", "Provides": "mail-transport-agent"},
+    "legacy": {"Version": "0.1", "Conflicts": "newmta"},
+    "oldtool": {"Version": "1.0"},
+}
+
+
+@pytest.fixture
+def relations_graph(tmp_path):
+    write_list(tmp_path, "example.org_dists_stable_main_binary-all_Packages", RELATIONS)
+    return DependencyGraph(PackageCatalog(str(tmp_path)))
+
+
+def test_conflicts_against_installed(relations_graph):
+    result = relations_graph.resolve("newmta", Relations(INSTALLED))
+
+    # Conflicts + Replaces on the virtual name means apt swaps the installed MTA out
+    assert result["replaces"] == ["exim"]
+    assert result["conflicts"] == [
+        {
+            "package": "legacy",
+            "conflicts_with": "newmta",
+            "relation": "Conflicts",
+            "installed": True,
+        }
+    ]
+
+
+def test_virtual_alternative_and_breaks(relations_graph, tmp_path):
+    result = relations_graph.resolve("tool", Relations(INSTALLED))
+
+    assert result["missing"] == []
+    assert result["total_packages"] == 2  # tool and libprov
+    assert result["conflicts"] == [
+        {"package": "tool", "conflicts_with": "oldtool", "relation": "Breaks", "installed": True}
+    ]
+
+    # Once a fixed oldtool is available apt upgrades it instead
+    write_list(
+        tmp_path,
+        "example.org_dists_updates_main_binary-all_Packages",
+        "Package: oldtool\nVersion: 2.1\nArchitecture: all\n",
+    )
+    assert relations_graph.resolve("tool", Relations(INSTALLED))["conflicts"] == []
+
+
+def test_conflicts_within_plan(relations_graph, tmp_path):
+    write_list(
+        tmp_path,
+        "example.org_dists_extra_main_binary-all_Packages",
+        "Package: suite\nVersion: 1\nArchitecture: all\nDepends: tool, clash\n\n"
+        "Package: clash\nVersion: 1\nArchitecture: all\nConflicts: libvirtual\n",
+    )
+    result = relations_graph.resolve("suite")
+    assert result["conflicts"] == [
+        {
+            "package": "clash",
+            "conflicts_with": "libprov",
+            "relation": "Conflicts",
+            "installed": False,
+        }
+    ]
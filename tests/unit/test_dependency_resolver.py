@@ -1,7 +1,9 @@
 from unittest.mock import MagicMock
 
 import pytest
+from providers.dependency_graph import dependency_groups
 from providers.dependency_resolver import DependencyResolver
+from providers.relations import Relations
 
 
 @pytest.fixture
@@ -20,6 +22,8 @@ def mock_apt():
         "pkg-d": {"Version": "3.0"},
     }
     provider.get_package_info.side_effect = lambda name: data.get(name)
+    provider.get_package_info_many.side_effect = lambda names: {n: data.get(n) for n in names}
+    provider.installed_relations.return_value = Relations()
     return provider
 
 
@@ -34,8 +38,90 @@ def test_resolve_graph(mock_apt):
     assert "pkg-e" in result["missing"]
 
 
+def test_resolve_batches_metadata_per_level(mock_apt):
+    resolver = DependencyResolver(apt_provider=mock_apt)
+    resolver.resolve("pkg-a")
+
+    # a | b, c | d, e -> three levels, three batched lookups
+    assert mock_apt.get_package_info_many.call_count == 3
+    mock_apt.get_package_info.assert_not_called()
+
+
 def test_parse_dependencies():
-    resolver = DependencyResolver(apt_provider=MagicMock())
     deps = "liba (>= 1.0), libb | libc, libd"
-    parsed = resolver._parse_dependencies(deps)
-    assert parsed == ["liba", "libb", "libd"]
+    assert dependency_groups({"Depends": deps, "Pre-Depends": "libe"}) == [
+        [("libe", None, None)],
+        [("liba", ">=", "1.0")],
+        [("libb", None, None), ("libc", None, None)],
+        [("libd", None, None)],
+    ]
+
+
+def test_resolve_reports_unsatisfied_constraints():
+    data = {
+        "app": {"Version": "1.0", "Depends": "libfoo (>= 2.0), libbar (<< 1.0)"},
+        "libfoo": {"Version": "2.0~rc1"},
+        "libbar": {"Version": "0.9"},
+    }
+    provider = MagicMock()
+    provider.get_package_info_many.side_effect = lambda names: {n: data.get(n) for n in names}
+    provider.installed_relations.return_value = Relations()
+
+    result = DependencyResolver(apt_provider=provider).resolve("app")
+
+    assert result["unsatisfied"] == [
+        {"package": "app", "dependency": "libfoo", "required": ">= 2.0", "available": "2.0~rc1"}
+    ]
+
+
+def test_resolve_deep_chain_is_iterative():
+    depth = 3000  # well past the default recursion limit
+    data = {f"pkg-{i}": {"Version": "1.0", "Depends": f"pkg-{i + 1}"} for i in range(depth)}
+    data[f"pkg-{depth}"] = {"Version": "1.0"}
+    provider = MagicMock()
+    provider.get_package_info_many.side_effect = lambda names: {n: data.get(n) for n in names}
+    provider.installed_relations.return_value = Relations()
+
+    result = DependencyResolver(apt_provider=provider).resolve("pkg-0")
+
+    assert result["total_packages"] == depth + 1
+    assert result["stats"]["levels"] == depth + 1
+    assert result["stats"]["lookups"] == depth + 1
+
+
+def test_resolve_splits_wide_levels():
+    width = DependencyResolver.BATCH_SIZE * 3
+    leaves = [f"leaf-{i}" for i in range(width)]
+    data = {"stack": {"Version": "1.0", "Depends": ", ".join(leaves)}}
+    data.update({leaf: {"Version": "1.0"} for leaf in leaves})
+    provider = MagicMock()
+    provider.get_package_info_many.side_effect = lambda names: {n: data.get(n) for n in names}
+    provider.installed_relations.return_value = Relations()
+
+    result = DependencyResolver(apt_provider=provider).resolve("stack")
+
+    assert result["missing"] == []
+    assert result["stats"]["nodes_visited"] == width + 1
+    assert result["stats"]["lookups"] == 4  # the root, then three chunks of leaves
+    assert result["stats"]["wall_time_ms"] >= 0
+
+
+def test_resolve_prefers_installed_alternatives_and_providers():
+    data = {
+        "app": {"Version": "1.0", "Depends": "editor-a | editor-b, mail-transport-agent"},
+        "editor-a": {"Version": "1.0"},
+        "editor-b": {"Version": "1.0"},
+        "postfix": {"Version": "3.7", "Provides": "mail-transport-agent"},
+    }
+    provider = MagicMock()
+    provider.get_package_info_many.side_effect = lambda names: {n: data.get(n) for n in names}
+    provider.installed_relations.return_value = Relations(
+        {"editor-b": {"Version": "1.0"}, "postfix": data["postfix"]}
+    )
+
+    result = DependencyResolver(apt_provider=provider).resolve("app")
+
+    assert result["missing"] == []
+    # Installed editor-b and postfix satisfy their groups, so only app is planned
+    assert result["total_packages"] == 1
+    assert result["conflicts"] == []
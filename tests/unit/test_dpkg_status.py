@@ -0,0 +1,72 @@
+import os
+
+import pytest
+from providers.dpkg_status import DpkgStatusIndex
+
+STATUS = """Package: pkg-a
+Status: install ok installed
+Installed-Size: 120
+Architecture: amd64
+Version: 1.0-1
+Description: first package
+ with a long description
+
+Package: pkg-b
+Status: deinstall ok config-files
+Architecture: amd64
+Version: 2.0
+
+Package: libmulti
+Status: deinstall ok not-installed
+Architecture: i386
+Version: 3.0
+
+Package: libmulti
+Status: install ok installed
+Installed-Size: 64
+Architecture: amd64
+Version: 3.0
+"""
+
+
+@pytest.fixture
+def status_file(tmp_path):
+    path = tmp_path / "status"
+    path.write_text(STATUS)
+    return path
+
+
+def test_installed_state_and_metadata(status_file):
+    index = DpkgStatusIndex(str(status_file))
+
+    assert index.is_installed("pkg-a") is True
+    assert index.get_version("pkg-a") == "1.0-1"
+    assert index.get_installed_size("pkg-a") == 120
+    assert index.is_installed("pkg-b") is False
+    assert index.get_version("pkg-b") is None
+    assert index.is_installed("libmulti") is True
+    assert "Description" not in index.get("pkg-a")
+
+
+def test_installed_states_bulk(status_file):
+    index = DpkgStatusIndex(str(status_file))
+    states = index.installed_states(["pkg-a", "pkg-b", "missing"])
+    assert states == {"pkg-a": True, "pkg-b": False, "missing": False}
+
+
+def test_reloads_when_status_changes(status_file):
+    index = DpkgStatusIndex(str(status_file))
+    assert index.is_installed("pkg-b") is False
+
+    status_file.write_text(STATUS.replace("deinstall ok config-files", "install ok installed"))
+    # Force a distinct mtime even on coarse-grained filesystems
+    st = os.stat(status_file)
+    os.utime(status_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    assert index.is_installed("pkg-b") is True
+
+
+def test_missing_status_file(tmp_path):
+    index = DpkgStatusIndex(str(tmp_path / "nope"))
+    assert index.available() is False
+    assert index.is_installed("pkg-a") is False
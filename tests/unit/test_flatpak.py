@@ -0,0 +1,136 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+from providers.flatpak import FlatpakProvider
+
+
+@pytest.fixture
+def provider(tmp_path):
+    flatpak = FlatpakProvider()
+    flatpak.SYSTEM_INSTALLATION = str(tmp_path / "system")
+    flatpak.user_installation = str(tmp_path / "user")
+    flatpak.has_flatpak = True
+    return flatpak
+
+
+METAINFO = """<?xml version="1.0" encoding="UTF-8"?>
+<component type="desktop-application">
+  <id>{app_id}</id>
+  <name>{name}</name>
+  <summary>Image editor</summary>
+  <project_license>GPL-3.0+</project_license>
+  <releases><release version="2.10.36"/></releases>
+</component>
+"""
+
+
+def deploy(base, app_id, name=None, remote="flathub"):
+    branch = os.path.join(base, "app", app_id, "x86_64", "stable")
+    active = os.path.join(branch, "0123abcd")
+    os.makedirs(os.path.join(active, "files", "share", "metainfo"))
+    os.symlink("0123abcd", os.path.join(branch, "active"))
+    os.symlink("x86_64/stable", os.path.join(base, "app", app_id, "current"))
+    with open(os.path.join(active, "metadata"), "w") as f:
+        f.write(f"[Application]\nname={app_id}\nruntime=org.gnome.Platform/x86_64/45\n")
+    if name:
+        path = os.path.join(active, "files", "share", "metainfo", f"{app_id}.metainfo.xml")
+        with open(path, "w") as f:
+            f.write(METAINFO.format(app_id=app_id, name=name))
+    ref = os.path.join(base, "repo", "refs", "remotes", remote, "app", app_id, "x86_64")
+    os.makedirs(ref)
+    open(os.path.join(ref, "stable"), "w").close()
+
+
+def test_installed_ids_read_from_installations(provider):
+    deploy(provider.SYSTEM_INSTALLATION, "org.mozilla.firefox")
+    deploy(provider.user_installation, "org.gimp.GIMP")
+    # Left behind without a deployment
+    os.makedirs(os.path.join(provider.SYSTEM_INSTALLATION, "app", "org.example.Gone"))
+
+    with patch("subprocess.run") as mock_run:
+        assert provider.installed_ids() == {"org.mozilla.firefox", "org.gimp.GIMP"}
+        assert provider.is_installed("org.gimp.GIMP")
+        mock_run.assert_not_called()
+
+
+def test_search_annotates_from_installed_set(provider):
+    deploy(provider.SYSTEM_INSTALLATION, "org.mozilla.firefox")
+    output = (
+        "org.mozilla.firefox\tFirefox\tWeb Browser\t122.0\tflathub\n"
+        "org.chromium.Chromium\tChromium\tWeb Browser\t121.0\tflathub\n"
+    )
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(stdout=output)
+        results = provider.search("browser")
+
+    # One search process regardless of the number of results
+    assert mock_run.call_count == 1
+    assert [(app["id"], app["installed"]) for app in results] == [
+        ("org.mozilla.firefox", True),
+        ("org.chromium.Chromium", False),
+    ]
+
+
+def test_installed_ids_refresh_on_change(provider):
+    assert provider.installed_ids() == frozenset()
+    # Installations exist on disk, so no CLI fallback is needed
+    os.makedirs(provider.SYSTEM_INSTALLATION)
+    deploy(provider.SYSTEM_INSTALLATION, "org.gimp.GIMP")
+
+    assert provider.installed_ids() == {"org.gimp.GIMP"}
+
+
+def test_list_apps_and_details_read_from_installations(provider):
+    deploy(provider.SYSTEM_INSTALLATION, "org.gimp.GIMP", name="GNU Image Manipulation Program")
+    deploy(provider.user_installation, "org.example.Bare", remote="user-remote")
+
+    with patch("subprocess.run") as mock_run:
+        apps = provider.list_apps()
+        details = provider.get_app_details("org.gimp.GIMP")
+        mock_run.assert_not_called()
+
+    assert apps == [
+        {
+            "id": "org.gimp.GIMP",
+            "name": "GNU Image Manipulation Program",
+            "version": "2.10.36",
+            "repo": "flathub",
+            "type": "flatpak",
+            "installed": True,
+        },
+        {
+            "id": "org.example.Bare",
+            "name": "org.example.Bare",
+            "version": "",
+            "repo": "user-remote",
+            "type": "flatpak",
+            "installed": True,
+        },
+    ]
+    assert details["Version"] == "2.10.36"
+    assert details["License"] == "GPL-3.0+"
+    assert details["Runtime"] == "org.gnome.Platform/x86_64/45"
+    assert details["Installation"] == "system"
+
+
+def test_installed_refs_and_remote_urls(provider):
+    deploy(provider.SYSTEM_INSTALLATION, "org.gimp.GIMP")
+    with open(os.path.join(provider.SYSTEM_INSTALLATION, "repo", "config"), "w") as f:
+        f.write(
+            '[core]\nmode=bare-user-only\n\n[remote "flathub"]\nurl=https://dl.flathub.org/repo/\n'
+        )
+
+    assert provider.installed_refs() == [
+        {
+            "ref": "app/org.gimp.GIMP/x86_64/stable",
+            "id": "org.gimp.GIMP",
+            "kind": "app",
+            "arch": "x86_64",
+            "branch": "stable",
+            "commit": "0123abcd",
+            "origin": "flathub",
+            "installation": "system",
+        }
+    ]
+    assert provider.remote_urls() == {("system", "flathub"): "https://dl.flathub.org/repo/"}
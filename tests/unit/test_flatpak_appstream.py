@@ -0,0 +1,134 @@
+import gzip
+import os
+from unittest.mock import patch
+
+import pytest
+from providers.flatpak import FlatpakProvider
+from providers.flatpak_appstream import FlatpakAppStreamIndex
+
+COLLECTION = """<?xml version="1.0" encoding="UTF-8"?>
+<components version="0.8" origin="flathub">
+  <component type="desktop-application">
+    <id>org.mozilla.firefox.desktop</id>
+    <name>Firefox</name>
+    <name xml:lang="de">Feuerfuchs</name>
+    <summary>Fast, Private &amp; Safe Web Browser</summary>
+    <description>
+      <p>Firefox is a  web browser.</p>
+      <p xml:lang="de">Firefox ist ein Webbrowser.</p>
+      <ul><li>Private browsing</li><li>Sync</li></ul>
+    </description>
+    <categories><category>Network</category><category>WebBrowser</category></categories>
+    <screenshots>
+      <screenshot type="default">
+        <image type="thumbnail">https://example.org/thumb.png</image>
+        <image type="source">https://example.org/full.png</image>
+      </screenshot>
+    </screenshots>
+    <icon type="cached" height="128" width="128">org.mozilla.firefox.png</icon>
+    <project_license>MPL-2.0</project_license>
+    <releases><release version="122.0" timestamp="1"/><release version="121.0"/></releases>
+  </component>
+  <component type="desktop-application">
+    <id>org.wireshark.Wireshark</id>
+    <name>Wireshark</name>
+    <summary>Network traffic analyzer</summary>
+    <keywords><keyword>packet</keyword><keyword>sniffer</keyword></keywords>
+    <releases><release version="4.2.0"/></releases>
+  </component>
+</components>
+"""
+
+
+def install_collection(base, commit, content=COLLECTION, remote="flathub"):
+    arch_dir = os.path.join(base, "appstream", remote, "x86_64")
+    os.makedirs(os.path.join(arch_dir, commit), exist_ok=True)
+    with gzip.open(os.path.join(arch_dir, commit, "appstream.xml.gz"), "wt") as f:
+        f.write(content)
+    active = os.path.join(arch_dir, "active")
+    if os.path.lexists(active):
+        os.remove(active)
+    os.symlink(commit, active)
+
+
+@pytest.fixture
+def index(tmp_path):
+    install_collection(str(tmp_path), "abc123")
+    return FlatpakAppStreamIndex([str(tmp_path), str(tmp_path / "user")])
+
+
+def test_get_reads_untranslated_metadata(index, tmp_path):
+    entry = index.get("org.mozilla.firefox")
+
+    assert entry["name"] == "Firefox"
+    assert entry["description"] == "Firefox is a web browser.\n\n- Private browsing\n- Sync"
+    assert entry["categories"] == ["Network", "WebBrowser"]
+    assert entry["screenshots"] == ["https://example.org/full.png"]
+    assert entry["version"] == "122.0"
+    assert entry["license"] == "MPL-2.0"
+    assert entry["remote"] == "flathub"
+    assert entry["icon"] == os.path.join(
+        str(tmp_path),
+        "appstream",
+        "flathub",
+        "x86_64",
+        "active",
+        "icons",
+        "128x128",
+        "org.mozilla.firefox.png",
+    )
+    assert index.get("org.example.Missing") is None
+
+
+def test_search_ranks_and_matches_prefixes(index):
+    assert [e["id"] for e in index.search("web browser")] == ["org.mozilla.firefox"]
+    # Keywords are searchable and the last term matches as a prefix
+    assert [e["id"] for e in index.search("sniff")] == ["org.wireshark.Wireshark"]
+    # A name match outranks a description or category match
+    assert [e["id"] for e in index.search("network")][0] == "org.wireshark.Wireshark"
+    assert index.search("nothing here") == []
+
+
+def test_index_rebuilds_only_when_commit_changes(index, tmp_path):
+    assert index.get("org.wireshark.Wireshark")
+    with patch("providers.flatpak_appstream.iter_components") as parse:
+        index.get("org.wireshark.Wireshark")
+        parse.assert_not_called()
+
+    updated = COLLECTION.replace("Wireshark</name>", "Wireshark Next</name>")
+    install_collection(str(tmp_path), "def456", updated)
+    assert index.get("org.wireshark.Wireshark")["name"] == "Wireshark Next"
+
+
+def test_sources_are_rescanned_only_when_a_directory_changes(index, tmp_path):
+    sources = index.sources()
+    with patch("providers.flatpak_appstream.os.listdir") as listdir:
+        assert index.sources() == sources
+        listdir.assert_not_called()
+
+    install_collection(str(tmp_path), "abc123", remote="fedora")
+    assert [source[0] for source in index.sources()] == ["fedora", "flathub"]
+
+
+def test_provider_search_served_from_index(tmp_path):
+    provider = FlatpakProvider()
+    install_collection(str(tmp_path), "abc123")
+    provider.SYSTEM_INSTALLATION = str(tmp_path)
+    provider.user_installation = str(tmp_path / "user")
+    provider.appstream = FlatpakAppStreamIndex([str(tmp_path)])
+
+    with patch("subprocess.run") as mock_run:
+        results = provider.search("firefox")
+        mock_run.assert_not_called()
+
+    assert results == [
+        {
+            "id": "org.mozilla.firefox",
+            "name": "Firefox",
+            "description": "Fast, Private & Safe Web Browser",
+            "version": "122.0",
+            "repo": "flathub",
+            "type": "flatpak",
+            "installed": False,
+        }
+    ]
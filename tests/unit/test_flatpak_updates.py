@@ -0,0 +1,121 @@
+import json
+import threading
+import urllib.error
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import MagicMock, patch
+
+import pytest
+from providers.flatpak_updates import FlatpakUpdateChecker
+
+SUMMARY = {
+    "app/org.gimp.GIMP/x86_64/stable": {
+        "commit": "bbbb",
+        "download_size": 90_000_000,
+        "installed_size": 300_000_000,
+    },
+    "runtime/org.gnome.Platform/x86_64/45": {
+        "commit": "cccc",
+        "download_size": 1,
+        "installed_size": 1,
+    },
+}
+
+
+class SummaryHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        SummaryHandler.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(SUMMARY).encode()
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def remote():
+    SummaryHandler.requests = []
+    server = HTTPServer(("127.0.0.1", 0), SummaryHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/repo/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def flatpak(remote):
+    provider = MagicMock()
+    provider.has_flatpak = True
+    provider.remote_urls.return_value = {("system", "flathub"): remote}
+    provider.installed_refs.return_value = [
+        {
+            "ref": "app/org.gimp.GIMP/x86_64/stable",
+            "id": "org.gimp.GIMP",
+            "commit": "aaaa",
+            "origin": "flathub",
+            "installation": "system",
+        },
+        {
+            "ref": "runtime/org.gnome.Platform/x86_64/45",
+            "id": "org.gnome.Platform",
+            "commit": "cccc",
+            "origin": "flathub",
+            "installation": "system",
+        },
+    ]
+    return provider
+
+
+@pytest.fixture(autouse=True)
+def summary_parser():
+    # GLib is not available here; the stand-in remote serves its summary as JSON
+    with patch("providers.flatpak_updates.HAS_GLIB", True), patch(
+        "providers.flatpak_updates.parse_summary", side_effect=lambda data: json.loads(data)
+    ):
+        yield
+
+
+def test_check_compares_installed_commits_with_summary(flatpak, tmp_path):
+    updates = FlatpakUpdateChecker(flatpak, cache_dir=str(tmp_path)).check()
+
+    assert updates == [
+        {
+            "id": "org.gimp.GIMP",
+            "ref": "app/org.gimp.GIMP/x86_64/stable",
+            "remote": "flathub",
+            "installation": "system",
+            "installed_commit": "aaaa",
+            "commit": "bbbb",
+            "download_size": 90_000_000,
+            "installed_size": 300_000_000,
+        }
+    ]
+    # One request per remote, not per installed ref
+    assert SummaryHandler.requests == [("/repo/summary", None)]
+
+
+def test_unchanged_summary_is_revalidated_not_refetched(flatpak, tmp_path):
+    FlatpakUpdateChecker(flatpak, cache_dir=str(tmp_path)).check()
+
+    # A second process starts from the on-disk copy and only revalidates it
+    again = FlatpakUpdateChecker(flatpak, cache_dir=str(tmp_path))
+    assert [u["id"] for u in again.check()] == ["org.gimp.GIMP"]
+    assert [u["id"] for u in again.check()] == ["org.gimp.GIMP"]
+    assert SummaryHandler.requests[1:] == [("/repo/summary", '"v1"'), ("/repo/summary", '"v1"')]
+
+
+def test_cached_summary_used_when_remote_unreachable(flatpak, tmp_path):
+    FlatpakUpdateChecker(flatpak, cache_dir=str(tmp_path)).check()
+
+    offline = FlatpakUpdateChecker(flatpak, cache_dir=str(tmp_path))
+    with patch("urllib.request.urlopen", side_effect=urllib.error.URLError("offline")):
+        assert [u["id"] for u in offline.check()] == ["org.gimp.GIMP"]
@@ -0,0 +1,128 @@
+from unittest.mock import MagicMock
+
+import pytest
+from providers.apt_catalog import PackageCatalog
+from providers.dependency_graph import DependencyGraph
+from providers.dependency_resolver import DependencyResolver
+from providers.footprint import FootprintCalculator
+from providers.meta import MetaProvider
+from providers.relations import Relations
+
+
+@pytest.fixture
+def archive():
+    # Two stacks sharing libcore; libcore and libloop form a cycle; coreutils is installed
+    return {
+        "ctxos-tools-forensics": {
+            "Version": "1.0",
+            "Depends": "sleuthkit, coreutils",
+            "Size": "100",
+            "Installed-Size": "1",
+        },
+        "ctxos-tools-reversing": {
+            "Version": "1.0",
+            "Depends": "radare2",
+            "Size": "200",
+            "Installed-Size": "2",
+        },
+        "sleuthkit": {
+            "Version": "4.12",
+            "Depends": "libcore",
+            "Size": "1000",
+            "Installed-Size": "10",
+        },
+        "radare2": {
+            "Version": "5.8",
+            "Depends": "libcore, libgone",
+            "Size": "2000",
+            "Installed-Size": "20",
+        },
+        "libcore": {
+            "Version": "1.0",
+            "Depends": "libloop",
+            "Size": "10000",
+            "Installed-Size": "100",
+        },
+        "libloop": {"Version": "1.0", "Depends": "libcore", "Size": "5", "Installed-Size": "1"},
+        "coreutils": {"Version": "9.1", "Depends": "libc6", "Size": "7", "Installed-Size": "7"},
+    }
+
+
+def make_calculator(archive, installed=None):
+    provider = MagicMock()
+    provider.get_package_info_many.side_effect = lambda names: {n: archive.get(n) for n in names}
+    provider.installed_relations.return_value = Relations(
+        installed or {"coreutils": {"Version": "9.1"}}
+    )
+    return FootprintCalculator(DependencyResolver(apt_provider=provider)), provider
+
+
+def test_footprint_counts_uninstalled_closure(archive):
+    calculator, _ = make_calculator(archive)
+
+    result = calculator.footprint("ctxos-tools-forensics")
+
+    # forensics + sleuthkit + libcore + libloop; coreutils is installed and not descended into
+    assert result == {
+        "package": "ctxos-tools-forensics",
+        "packages": 4,
+        "download_size": 100 + 1000 + 10000 + 5,
+        "installed_size": (1 + 10 + 100 + 1) * 1024,
+        "missing": [],
+    }
+
+
+def test_footprints_share_memoized_subtrees(archive):
+    calculator, provider = make_calculator(archive)
+
+    results = calculator.footprints(["ctxos-tools-forensics", "ctxos-tools-reversing"])
+    closures = calculator._state["closures"]
+
+    assert results["ctxos-tools-reversing"]["packages"] == 4
+    assert results["ctxos-tools-reversing"]["missing"] == ["libgone"]
+    # The libcore/libloop cycle is one component with one shared closure
+    assert (
+        closures[calculator._state["graph"].ids["libcore"]]
+        is closures[calculator._state["graph"].ids["libloop"]]
+    )
+
+    provider.get_package_info_many.reset_mock()
+    calculator.footprint("ctxos-tools-reversing")
+    provider.get_package_info_many.assert_not_called()
+
+
+def test_footprint_memo_follows_installed_set(archive):
+    calculator, provider = make_calculator(archive)
+    assert calculator.footprint("ctxos-tools-forensics")["packages"] == 4
+
+    provider.installed_relations.return_value = Relations(
+        {"coreutils": {"Version": "9.1"}, "libcore": {"Version": "1.0"}}
+    )
+    result = calculator.footprint("ctxos-tools-forensics")
+
+    assert result["packages"] == 2
+    assert result["download_size"] == 1100
+
+
+def test_list_profiles_never_waits_for_the_graph(archive, tmp_path):
+    packages = "\n".join(
+        f"Package: {name}\nArchitecture: all\n"
+        + "".join(f"{field}: {value}\n" for field, value in fields.items())
+        for name, fields in archive.items()
+    )
+    (tmp_path / "example.org_dists_stable_main_binary-all_Packages").write_text(packages)
+    graph = DependencyGraph(PackageCatalog(str(tmp_path)))
+    provider = MagicMock()
+    provider.is_installed_many.return_value = {}
+    provider.installed_relations.return_value = Relations({"coreutils": {"Version": "9.1"}})
+    calculator = FootprintCalculator(DependencyResolver(apt_provider=provider, graph=graph))
+    meta = MetaProvider(provider, calculator)
+
+    # Before the background build, profiles come without footprints and nothing is built
+    assert all("footprint" not in p for p in meta.list_profiles())
+    assert not graph.built()
+
+    graph.update()
+    profiles = {p["id"]: p for p in meta.list_profiles()}
+    assert profiles["ctxos-tools-forensics"]["footprint"]["packages"] == 4
+    assert profiles["ctxos-desktop"]["footprint"]["missing"] == ["ctxos-desktop"]
@@ -0,0 +1,72 @@
+import os
+import threading
+
+import pytest
+from providers.fs_watcher import CatalogWatcher, _load_inotify
+
+
+def _bump(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    dpkg = tmp_path / "dpkg"
+    lists = tmp_path / "lists"
+    dpkg.mkdir()
+    lists.mkdir()
+    (dpkg / "status").write_text("Package: a\n")
+    return {"dpkg": dpkg, "lists": lists}
+
+
+def test_polling_publishes_changed_topics(dirs):
+    watcher = CatalogWatcher(
+        watches={
+            CatalogWatcher.DPKG: [(str(dirs["dpkg"]), {"status"})],
+            CatalogWatcher.APT_LISTS: [(str(dirs["lists"]), None)],
+        }
+    )
+    events = []
+    watcher.subscribe(CatalogWatcher.DPKG, events.append)
+
+    assert watcher.poll() == set()  # baseline
+
+    (dirs["dpkg"] / "status").write_text("Package: a\n\nPackage: b\n")
+    _bump(dirs["dpkg"] / "status")
+    assert watcher.poll() == {CatalogWatcher.DPKG}
+    assert events == [{"topic": CatalogWatcher.DPKG, "names": [str(dirs["dpkg"] / "status")]}]
+
+
+def test_failing_subscriber_does_not_block_others(dirs):
+    watcher = CatalogWatcher(watches={})
+    seen = []
+
+    def broken(event):
+        raise RuntimeError("boom")
+
+    watcher.subscribe(CatalogWatcher.BRANDING, broken)
+    watcher.subscribe(CatalogWatcher.BRANDING, seen.append)
+    watcher.publish(CatalogWatcher.BRANDING, ["/etc/default/software-center-oem"])
+    assert len(seen) == 1
+
+
+@pytest.mark.skipif(_load_inotify() is None, reason="inotify not available")
+def test_inotify_detects_renamed_status_file(dirs):
+    watcher = CatalogWatcher(
+        watches={CatalogWatcher.DPKG: [(str(dirs["dpkg"]), {"status"})]},
+        poll_interval=0.2,
+        debounce=0.05,
+    )
+    fired = threading.Event()
+    watcher.subscribe(CatalogWatcher.DPKG, lambda event: fired.set())
+    watcher.start()
+    try:
+        # Give the thread time to install its watches
+        threading.Event().wait(0.3)
+        # dpkg writes status-new and renames it over status
+        (dirs["dpkg"] / "status-new").write_text("Package: a\n\nPackage: c\n")
+        os.replace(dirs["dpkg"] / "status-new", dirs["dpkg"] / "status")
+        assert fired.wait(5)
+    finally:
+        watcher.stop()
@@ -0,0 +1,45 @@
+import os
+from unittest.mock import MagicMock, patch
+
+from providers.offline_mirror import OfflineMirrorManager
+
+
+def test_prune_keeps_newest_versions(tmp_path):
+    mirror = OfflineMirrorManager(mirror_path=str(tmp_path))
+    for filename in [
+        "curl_7.88.1-10_amd64.deb",
+        "curl_7.88.1-10+deb12u5_amd64.deb",
+        "curl_7.88.1-9_amd64.deb",
+        "curl_7.88.1-9_arm64.deb",
+        "vim_2%3a9.0.1378-2_amd64.deb",
+        "vim_9.1.0-1_amd64.deb",
+    ]:
+        (tmp_path / "pool" / "main" / filename).write_text("deb")
+
+    removed = mirror.prune()
+
+    assert removed == [
+        "curl_7.88.1-10_amd64.deb",
+        "curl_7.88.1-9_amd64.deb",
+        "vim_9.1.0-1_amd64.deb",
+    ]
+    assert sorted(os.listdir(mirror.packages_dir)) == [
+        "curl_7.88.1-10+deb12u5_amd64.deb",
+        "curl_7.88.1-9_arm64.deb",
+        "vim_2%3a9.0.1378-2_amd64.deb",
+    ]
+
+
+def test_sync_prunes_only_when_asked(tmp_path):
+    mirror = OfflineMirrorManager(mirror_path=str(tmp_path))
+    for filename in ["curl_7.88.1-9_amd64.deb", "curl_7.88.1-10_amd64.deb"]:
+        (tmp_path / "pool" / "main" / filename).write_text("deb")
+
+    with patch("shutil.which", return_value="/usr/bin/tool"), patch(
+        "subprocess.run", return_value=MagicMock(returncode=0)
+    ), patch("subprocess.Popen", return_value=MagicMock(returncode=0)):
+        assert mirror.sync(["curl"])["pruned"] == []
+        assert len(os.listdir(mirror.packages_dir)) == 2
+
+        assert mirror.sync(["curl"], prune=True)["pruned"] == ["curl_7.88.1-9_amd64.deb"]
+        assert os.listdir(mirror.packages_dir) == ["curl_7.88.1-10_amd64.deb"]
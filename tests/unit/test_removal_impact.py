@@ -0,0 +1,76 @@
+import pytest
+from providers.dpkg_status import DpkgStatusIndex
+from providers.removal_impact import RemovalImpactIndex
+
+
+def stanza(name, **fields):
+    lines = [f"Package: {name}", "Status: install ok installed", "Version: 1.0"]
+    lines += [f"{key.replace('_', '-')}: {value}" for key, value in fields.items()]
+    return "\n".join(lines) + "\n"
+
+
+STATUS = "\n".join(
+    [
+        stanza("ctxos-desktop", Depends="xorg, lightdm | gdm3, firefox-esr"),
+        stanza("xorg", Depends="xserver-xorg"),
+        stanza("xserver-xorg", Depends="libc6"),
+        stanza("lightdm", Depends="libc6"),
+        stanza("gdm3", Depends="libc6"),
+        stanza("firefox-esr", Depends="libc6", Recommends="fonts-dejavu"),
+        stanza("fonts-dejavu"),
+        stanza("xterm", Depends="x-terminal-helper"),
+        stanza("helper-impl", Provides="x-terminal-helper"),
+        stanza("libc6", Essential="yes"),
+        stanza("old-lib"),
+    ]
+)
+
+EXTENDED_STATES = "\n".join(
+    f"Package: {name}\nArchitecture: amd64\nAuto-Installed: 1\n"
+    for name in ["xorg", "xserver-xorg", "lightdm", "firefox-esr", "fonts-dejavu", "old-lib"]
+)
+
+
+@pytest.fixture
+def index(tmp_path):
+    (tmp_path / "status").write_text(STATUS)
+    (tmp_path / "extended_states").write_text(EXTENDED_STATES)
+    dpkg = DpkgStatusIndex(str(tmp_path / "status"))
+    return RemovalImpactIndex(dpkg, str(tmp_path / "extended_states"))
+
+
+def test_removing_meta_package_orphans_its_dependencies(index):
+    impact = index.impact(["ctxos-desktop"])
+
+    assert impact["removed"] == ["ctxos-desktop"]
+    # old-lib was already orphaned before this removal
+    assert impact["autoremovable"] == [
+        "firefox-esr",
+        "fonts-dejavu",
+        "lightdm",
+        "xorg",
+        "xserver-xorg",
+    ]
+
+
+def test_removal_follows_reverse_dependencies(index):
+    assert index.impact(["xserver-xorg"])["removed"] == ["ctxos-desktop", "xorg", "xserver-xorg"]
+    assert index.impact(["helper-impl"])["removed"] == ["helper-impl", "xterm"]
+
+
+def test_installed_alternative_keeps_dependents(index):
+    impact = index.impact(["lightdm"])
+    assert impact["removed"] == ["lightdm"]
+    assert impact["autoremovable"] == []
+
+
+def test_keep_protects_dependencies(index):
+    impact = index.impact(["ctxos-desktop"], keep=["firefox-esr"])
+    assert "firefox-esr" not in impact["autoremovable"]
+    assert "fonts-dejavu" not in impact["autoremovable"]
+
+
+def test_not_installed_and_reverse_dependencies(index):
+    assert index.impact(["nope"])["not_installed"] == ["nope"]
+    assert index.reverse_dependencies("libc6") == ["firefox-esr", "gdm3", "lightdm", "xserver-xorg"]
+    assert index.reverse_dependencies("helper-impl") == ["xterm"]
@@ -0,0 +1,122 @@
+from providers import search_index
+from providers.search_index import SearchIndex
+
+
+def doc(id, name, summary="", **fields):
+    return dict({"id": id, "name": name, "summary": summary}, **fields)
+
+
+def test_ranking_prefers_name_matches_and_requires_every_term():
+    index = SearchIndex()
+    index.update(
+        {
+            "apt:wireshark": doc("wireshark", "Wireshark", "Network traffic analyzer"),
+            "apt:tcpdump": doc(
+                "tcpdump", "tcpdump", "Command-line network traffic analyzer", keywords=["sniffer"]
+            ),
+            "apt:nmap": doc("nmap", "Nmap", "Network exploration tool and security scanner"),
+            "apt:gimp": doc("gimp", "GIMP", "Image editor", description="Not about networks"),
+        }
+    )
+
+    # Both match in the summary; the shorter one ranks first
+    assert [r["id"] for r in index.search("network traffic")] == ["wireshark", "tcpdump"]
+    assert index.search("wireshark")[0]["id"] == "wireshark"
+    assert index.search("sniffer")[0]["id"] == "tcpdump"
+    assert index.search("network unicorn") == []
+
+
+def test_last_term_matches_as_prefix():
+    index = SearchIndex()
+    index.update(
+        {
+            "apt:wireshark": doc("wireshark", "Wireshark"),
+            "apt:wire": doc("wire", "Wire", "Messenger"),
+        }
+    )
+
+    assert [r["id"] for r in index.search("wire")] == ["wire", "wireshark"]
+    assert [r["id"] for r in index.search("wiresh")] == ["wireshark"]
+
+
+def test_prefix_expands_to_the_most_common_completions():
+    index = SearchIndex()
+    index.MAX_EXPANSIONS = 2
+    documents = {f"apt:tool{i}": doc(f"tool{i}", f"tool{i}", "network scanner") for i in range(3)}
+    documents["apt:netaa"] = doc("netaa", "netaa")
+    documents["apt:netab"] = doc("netab", "netab")
+    documents["apt:netsed"] = doc("netsed", "netsed", "network packet editor")
+    index.update(documents)
+
+    # Alphabetically the rare net* names come first; the common term still makes the cut
+    results = {r["id"] for r in index.search("net")}
+    assert {"tool0", "tool1", "tool2", "netsed"} <= results
+
+
+def test_incremental_updates_replace_and_remove_documents():
+    index = SearchIndex()
+    index.update({"apt:nmap": doc("nmap", "Nmap", "Port scanner")})
+    assert index.update({"apt:nmap": doc("nmap", "Nmap", "Port scanner")}) == 0
+
+    index.update({"apt:nmap": doc("nmap", "Nmap", "Network mapper")})
+    assert index.search("port") == []
+    assert index.search("mapper")[0]["id"] == "nmap"
+
+    index.update(removed=["apt:nmap"])
+    assert index.search("nmap") == []
+    assert len(index) == 0
+    assert index._postings == {}
+    assert index._vocabulary == []
+
+
+def test_scores_do_not_depend_on_insertion_order():
+    index = SearchIndex()
+    index.update({"apt:nmap": doc("nmap", "Nmap", "Network scanner")})
+    index.update({"apt:zenmap": doc("zenmap", "Zenmap", "Network scanner frontend")})
+    index.update({"apt:nmap-copy": doc("nmap", "Nmap", "Network scanner")})
+    fresh = SearchIndex()
+    fresh.update(
+        {
+            "apt:nmap-copy": doc("nmap", "Nmap", "Network scanner"),
+            "apt:zenmap": doc("zenmap", "Zenmap", "Network scanner frontend"),
+            "apt:nmap": doc("nmap", "Nmap", "Network scanner"),
+        }
+    )
+
+    results = [(r["id"], r["score"]) for r in index.search("network", unique=None)]
+    assert results == [(r["id"], r["score"]) for r in fresh.search("network", unique=None)]
+    assert results[0] == results[1]
+
+
+def test_vocabulary_stays_sorted_across_updates():
+    index = SearchIndex()
+    index.update({f"apt:{name}": doc(name, name) for name in ("nmap", "curl", "wget")})
+    index.update({"apt:aria2": doc("aria2", "aria2", "Download utility")}, removed=["apt:curl"])
+    index.update({"apt:zsh": doc("zsh", "zsh", "Shell")})
+
+    assert index._vocabulary == sorted(index._postings)
+    assert "curl" not in index._vocabulary
+    assert index.search("dow")[0]["id"] == "aria2"
+
+
+def test_prefix_scores_match_whether_probed_or_intersected(monkeypatch):
+    index = SearchIndex()
+    index.update(
+        {
+            "apt:python3-serial": doc("python3-serial", "python3-serial", "Serial port access"),
+            "apt:python3-setuptools": doc(
+                "python3-setuptools", "python3-setuptools", "Python packaging"
+            ),
+            "apt:setserial": doc("setserial", "setserial", "Serial port setup"),
+        }
+    )
+
+    def search(query):
+        return [(r["id"], r["score"]) for r in index.search(query)]
+
+    monkeypatch.setattr(search_index, "PROBE_COST", 0)
+    probed = search("python3 se"), search("serial port se")
+    monkeypatch.setattr(search_index, "PROBE_COST", 10**6)
+    assert (search("python3 se"), search("serial port se")) == probed
+    assert {id for id, _ in probed[0]} == {"python3-serial", "python3-setuptools"}
+    assert {id for id, _ in probed[1]} == {"python3-serial", "setserial"}
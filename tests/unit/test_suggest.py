@@ -0,0 +1,126 @@
+from unittest.mock import MagicMock
+
+import pytest
+from providers.compact_graph import GraphBuilder
+from providers.search_index import SearchIndex
+from providers.suggest import Suggester
+
+
+def doc(id, name, type="package"):
+    return {"id": id, "name": name, "summary": "", "type": type}
+
+
+@pytest.fixture
+def suggester():
+    index = SearchIndex()
+    index.update(
+        {
+            "apt:wireshark": doc("wireshark", "Wireshark"),
+            "apt:wireshark-common": doc("wireshark-common", "wireshark-common"),
+            "apt:wifite": doc("wifite", "wifite"),
+            "apt:nmap": doc("nmap", "Nmap"),
+            "apt:libpcap0.8": doc("libpcap0.8", "libpcap0.8"),
+            "flatpak:org.kismetwireless.Kismet": doc(
+                "org.kismetwireless.Kismet", "Kismet Wireless", "flatpak"
+            ),
+            "profile:ctxos-tools-wireless": doc(
+                "ctxos-tools-wireless", "Wireless Attacks", "profile"
+            ),
+        }
+    )
+    apt = MagicMock()
+    apt.dpkg.current_stamp.return_value = "dpkg-1"
+    apt.dpkg.installed_packages.return_value = {"wifite": {}}
+    flatpak = MagicMock()
+    flatpak.installation_stamp.return_value = "flatpak-1"
+    flatpak.installed_ids.return_value = set()
+    suggester = Suggester(index, apt, flatpak)
+    suggester.update()
+    return suggester
+
+
+def ids(results):
+    return [result["id"] for result in results]
+
+
+def test_prefix_completions_are_ranked_by_type_and_installed_state(suggester):
+    # The installed package outranks the others; every result completes the prefix
+    assert ids(suggester.suggest("wi")) == [
+        "wifite",
+        "ctxos-tools-wireless",
+        "org.kismetwireless.Kismet",
+        "wireshark",
+        "wireshark-common",
+    ]
+    assert suggester.suggest("wi", limit=1)[0] == {
+        "id": "wifite",
+        "name": "wifite",
+        "type": "package",
+        "installed": True,
+        "distance": 0,
+    }
+    # Later words of a display name complete too
+    assert ids(suggester.suggest("wirel"))[:2] == [
+        "ctxos-tools-wireless",
+        "org.kismetwireless.Kismet",
+    ]
+    assert [r["distance"] for r in suggester.suggest("wirel")][:3] == [0, 0, 1]
+    assert suggester.suggest("") == []
+
+
+def test_typos_are_tolerated_after_exact_matches(suggester):
+    assert ids(suggester.suggest("nmpa")) == ["nmap"]
+    assert suggester.suggest("nmpa")[0]["distance"] == 1
+    assert ids(suggester.suggest("wirshark")) == ["wireshark", "wireshark-common"]
+    assert suggester.suggest("wirshark")[0]["distance"] == 1
+    # Short input only completes, so two letters don't match half the catalog
+    assert suggester.suggest("nx") == []
+    assert suggester.suggest("zzzzzz") == []
+
+
+def test_popular_packages_rank_first():
+    index = SearchIndex()
+    index.update(
+        {"apt:libpcap0.8": doc("libpcap0.8", "libpcap0.8"), "apt:libpng": doc("libpng", "libpng")}
+    )
+    builder = GraphBuilder()
+    for name in ("tcpdump", "wireshark"):
+        builder.add_package(name, "1.0", [[("libpcap0.8", None, None)]])
+    builder.add_package("libpcap0.8", "1.0", [])
+    builder.add_package("libpng", "1.0", [])
+    graph = MagicMock()
+    graph.graph = builder.build()
+    apt = MagicMock()
+    apt.dpkg.installed_packages.return_value = {}
+    flatpak = MagicMock()
+    flatpak.installed_ids.return_value = set()
+
+    suggester = Suggester(index, apt, flatpak, graph=graph)
+    suggester.update()
+    assert ids(suggester.suggest("lib")) == [
+        "libpcap0.8",
+        "libpng",
+    ]
+
+
+def test_rebuilds_only_when_sources_change(suggester):
+    suggester.suggest("wi")
+    assert suggester.update() is False
+
+    suggester.apt.dpkg.current_stamp.return_value = "dpkg-2"
+    suggester.apt.dpkg.installed_packages.return_value = {"wireshark": {}}
+    assert suggester.update() is True
+    assert ids(suggester.suggest("wi"))[0] == "wireshark"
+
+    suggester.search_index.update(removed=["apt:wireshark"])
+    suggester.update()
+    assert "wireshark" not in ids(suggester.suggest("wires"))
+
+
+def test_suggestions_do_not_wait_for_the_first_build():
+    index = SearchIndex()
+    index.update({"apt:nmap": doc("nmap", "Nmap")})
+    suggester = Suggester(index, MagicMock(), MagicMock())
+
+    assert suggester.suggest("nm") == []
+    suggester.apt.dpkg.installed_packages.assert_not_called()
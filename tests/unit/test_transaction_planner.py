@@ -0,0 +1,164 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from api.profiles import ProfileSwitcher
+from providers.apt_simulator import AptSimulator
+from providers.dependency_resolver import DependencyResolver
+from providers.footprint import FootprintCalculator
+from providers.relations import Relations
+from providers.transaction_planner import TransactionPlanner
+
+SIMULATION = """Remv old-profile [1.0]
+Inst libcommon (1.0 CtxOS:stable [all])
+Inst new-profile (1.0 CtxOS:stable [all])
+"""
+
+
+def make_planner(archive, installed=None, removal=None):
+    installed = installed or {}
+    provider = MagicMock()
+    provider.get_package_info_many.side_effect = lambda names: {n: archive.get(n) for n in names}
+    provider.installed_relations.return_value = Relations(installed)
+    provider.dpkg.get_installed_size.side_effect = lambda name: (
+        int(installed[name]["Installed-Size"]) if name in installed else None
+    )
+    provider.get_removal_impact.return_value = removal or {"removed": [], "autoremovable": []}
+    return TransactionPlanner(DependencyResolver(apt_provider=provider)), provider
+
+
+@pytest.fixture
+def stacks():
+    # Eight profiles sharing a deep base stack, each with one tool of its own
+    archive = {f"base-{i}": {"Version": "1.0", "Depends": f"base-{i + 1}"} for i in range(20)}
+    archive["base-20"] = {"Version": "1.0"}
+    for i in range(8):
+        archive[f"profile-{i}"] = {"Version": "1.0", "Depends": f"base-0, tool-{i}"}
+        archive[f"tool-{i}"] = {"Version": "1.0", "Depends": "base-10"}
+    return archive
+
+
+def test_plan_shares_subgraphs_between_targets(stacks):
+    profiles = [f"profile-{i}" for i in range(8)]
+    planner, provider = make_planner(stacks)
+    single = planner.plan(install=profiles[:1])
+
+    provider.get_package_info_many.reset_mock()
+    combined = planner.plan(install=profiles)
+
+    # The shared base is visited once; only the per-profile packages add up
+    assert single["stats"]["nodes_visited"] == 23
+    assert combined["stats"]["nodes_visited"] == 21 + 16
+    assert combined["stats"]["levels"] == single["stats"]["levels"]
+    assert combined["stats"]["lookups"] == single["stats"]["lookups"]
+    assert len(combined["install"]) == 37
+    assert combined["missing"] == []
+
+
+def test_plan_sizes_removals_and_upgrades():
+    archive = {
+        "new-profile": {
+            "Version": "1.0",
+            "Depends": "libcommon (>= 2.0)",
+            "Size": "1000",
+            "Installed-Size": "10",
+        },
+        "libcommon": {"Version": "2.0", "Size": "500", "Installed-Size": "8"},
+    }
+    installed = {
+        "old-profile": {"Version": "1.0", "Installed-Size": "4"},
+        "libcommon": {"Version": "1.0", "Installed-Size": "6"},
+        "old-tool": {"Version": "1.0", "Installed-Size": "3"},
+    }
+    removal = {"removed": ["old-profile"], "autoremovable": ["old-tool"]}
+    planner, provider = make_planner(archive, installed, removal)
+
+    plan = planner.plan(install=["new-profile"], remove=["old-profile"])
+
+    provider.get_removal_impact.assert_called_once_with(["old-profile"], keep=["new-profile"])
+    assert plan["install"] == [
+        {"name": "libcommon", "version": "2.0", "action": "upgrade"},
+        {"name": "new-profile", "version": "1.0", "action": "install"},
+    ]
+    assert plan["remove"] == ["old-profile"]
+    assert plan["autoremovable"] == ["old-tool"]
+    assert plan["final_packages"] == ["libcommon", "new-profile", "old-tool"]
+    assert plan["download_size"] == 1500
+    # +10 +8 for the new versions, -6 for the old libcommon, -4 for old-profile
+    assert plan["installed_size_delta"] == 8 * 1024
+
+
+def test_migration_impact_takes_removals_from_the_plan():
+    archive = {
+        "new-profile": {"Version": "1.0", "Depends": "libcommon"},
+        "libcommon": {"Version": "1.0"},
+    }
+    installed = {
+        "old-profile": {"Version": "1.0", "Installed-Size": "4"},
+        "old-tool": {"Version": "1.0", "Installed-Size": "3"},
+    }
+    removal = {"removed": ["old-profile", "old-tool"], "autoremovable": []}
+    planner, provider = make_planner(archive, installed, removal)
+    provider.dpkg.current_stamp.return_value = ("status", 1)
+    provider.catalog.current_stamp.return_value = ("lists", 1)
+    provider.simulator = AptSimulator(provider)
+    meta = MagicMock()
+    meta.list_profiles.return_value = [{"id": "old-profile", "installed": True}]
+    switcher = ProfileSwitcher(provider, meta, planner=planner)
+
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(stdout=SIMULATION, stderr="", returncode=0)
+        impact = switcher.get_migration_impact("new-profile")
+        again = switcher.get_migration_impact("new-profile")
+
+    # One removal analysis per preview; apt's plan is simulated once and then cached
+    assert provider.get_removal_impact.call_count == 2
+    assert mock_run.call_count == 1
+    assert again["transaction"] is impact["transaction"]
+    assert impact["transaction"]["remove"] == ["old-profile"]
+    # apt's answer is reported next to the plan, not merged into it
+    assert impact["to_install"] == ["libcommon", "new-profile"]
+    assert impact["to_remove"] == ["old-profile", "old-tool"]
+    assert impact["risk"] == "medium"
+
+
+def test_plan_reports_conflicts_and_missing():
+    archive = {
+        "tool-a": {"Version": "1.0", "Depends": "libgone", "Conflicts": "tool-b"},
+        "tool-b": {"Version": "1.0"},
+    }
+    planner, _ = make_planner(archive)
+
+    plan = planner.plan(install=["tool-a", "tool-b", "unknown"])
+
+    assert [(c["package"], c["conflicts_with"]) for c in plan["conflicts"]] == [
+        ("tool-a", "tool-b")
+    ]
+    assert plan["missing"] == ["libgone", "unknown"]
+
+
+def test_installed_dependencies_are_only_upgraded_when_required():
+    archive = {
+        "tool": {"Version": "1.0", "Depends": "libold, libpinned (>= 2.0)", "Size": "100"},
+        "libold": {"Version": "1.1", "Size": "50", "Installed-Size": "5"},
+        "libpinned": {"Version": "2.0", "Size": "70", "Installed-Size": "9"},
+    }
+    installed = {
+        "libold": {"Version": "1.0", "Installed-Size": "4"},
+        "libpinned": {"Version": "1.0", "Installed-Size": "6"},
+    }
+    planner, _ = make_planner(archive, installed)
+
+    result = planner.plan(install=["tool"])
+
+    # libold satisfies an unversioned dependency and stays; libpinned is too old
+    assert result["install"] == [
+        {"name": "libpinned", "version": "2.0", "action": "upgrade"},
+        {"name": "tool", "version": "1.0", "action": "install"},
+    ]
+    assert result["download_size"] == 170
+    assert result["installed_size_delta"] == (9 - 6) * 1024
+
+    footprint = FootprintCalculator(planner.resolver).footprint("tool")
+    assert footprint["packages"] == len(result["install"])
+    assert footprint["download_size"] == result["download_size"]
+    assert footprint["installed_size"] == result["installed_size_delta"]